@@ -1,13 +1,18 @@
 import logging
 from pyexpat.errors import messages
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
 import re
 import json
-import requests
+from collections import deque
+from contextlib import aclosing
 import os
+import httpx
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
+from app.AI.ai_client import ai_client
+from app.app_configs.environment_config import config
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,125 @@ AI_EXAMPLE_RESPONSE :{
   "daily_time_minutes": 77
 }
 
+json_decoder = json.JSONDecoder()
+
+# fields a goal plan must have
+GOAL_FIELDS = [
+    "goal_name", "workout_type", "calories_to_burn",
+    "duration_days", "daily_target_calories", "daily_time_minutes"
+]
+
+
+class JsonObjectScanner:
+    """Finds the JSON objects in text fed to it in pieces, in a single pass.
+
+    Balanced {...} spans are tracked with a stack that ignores braces inside
+    strings, so prefixes like code fences or "json{" and prose around the
+    answer do not matter. Each outermost span is decoded once it closes; when
+    it is not valid JSON the spans nested in it are tried instead. Decoding is
+    capped at twice the length of the span, so adversarial text stays linear.
+    close() searches objects left open at the end (a truncated answer) the
+    same way.
+    """
+
+    _OBJECT_TOKENS = re.compile(r'[{}"]')
+    _STRING_TOKENS = re.compile(r'["\\]')
+    _OBJECT_START = re.compile(r'\{\s*["}]')
+
+    def __init__(self):
+        self._parts: list[str] = []  # text since the start of the outermost open span
+        self._origin = 0  # stream position of the start of self._parts
+        self._offset = 0  # stream position of the next text fed
+        self._stack: list[tuple[int, list]] = []  # (start, closed child spans) of every open brace
+        self._in_string = False
+        self._skip = 0  # characters to skip at the start of the next text, after a trailing backslash
+
+    def feed(self, text: str) -> list[dict]:
+        """The objects completed by `text`"""
+        found = []
+        segment = 0  # start in `text` of what belongs to the outermost open span
+        i, self._skip = self._skip, 0
+        while i < len(text):
+            if not self._stack:
+                # outside any object only an opening brace matters
+                i = text.find("{", i)
+                if i < 0:
+                    break
+                self._parts, self._origin, segment = [], self._offset + i, i
+                self._stack.append((self._offset + i, []))
+                i += 1
+                continue
+            match = (self._STRING_TOKENS if self._in_string else self._OBJECT_TOKENS).search(text, i)
+            if match is None:
+                break
+            char, i = match.group(), match.end()
+            if char == "\\":
+                # the escaped character may be in the next text
+                self._skip = max(0, i + 1 - len(text))
+                i += 1
+            elif char == '"':
+                self._in_string = not self._in_string
+            elif char == "{":
+                self._stack.append((self._offset + i - 1, []))
+            else:
+                start, children = self._stack.pop()
+                span = (start, self._offset + i, children)
+                if self._stack:
+                    self._stack[-1][1].append(span)
+                else:
+                    self._parts.append(text[segment:i])
+                    found.extend(self._decode("".join(self._parts), [span]))
+                    self._parts = []
+        if self._stack:
+            self._parts.append(text[segment:])
+        self._offset += len(text)
+        return found
+
+    def close(self) -> list[dict]:
+        """The objects found inside braces that never closed"""
+        spans = [span for _, children in self._stack for span in children]
+        text = "".join(self._parts)
+        self._stack, self._parts, self._in_string = [], [], False
+        return self._decode(text, spans)
+
+    def _decode(self, text: str, spans: list) -> list[dict]:
+        found = []
+        budget = 2 * len(text)
+        pending = spans[::-1]
+        while pending:
+            start, end, children = pending.pop()
+            if end - start > budget:
+                break
+            budget -= end - start
+            candidate = text[start - self._origin:end - self._origin]
+            value = None
+            # braces in prose are passed over without the cost of a JSONDecodeError
+            if self._OBJECT_START.match(candidate):
+                try:
+                    value = json.loads(candidate)
+                except json.JSONDecodeError:
+                    pass
+            if value is None:
+                pending.extend(children[::-1])
+            else:
+                found.append(value)
+        return found
+
+
+def find_goal_data(value) -> dict | None:
+    """The first object with every goal field, in `value` or nested in it"""
+    pending = deque([value])
+    while pending:
+        value = pending.popleft()
+        if isinstance(value, dict):
+            if all(field in value for field in GOAL_FIELDS):
+                return value
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return None
+
+
 def extract_fitness_goal(raw_response: str) -> dict:
     """
     Extract a structured fitness goal from the AI response.
@@ -42,36 +166,36 @@ def extract_fitness_goal(raw_response: str) -> dict:
 
     # First try direct JSON parsing
     try:
-        return json.loads(raw_response)
+        goal_data = json.loads(raw_response)
+        return find_goal_data(goal_data) or goal_data
     except json.JSONDecodeError:
         logger.debug("Direct JSON parsing failed, attempting to extract JSON from text")
 
-    # Try to extract JSON objects from the text response - common pattern with AI responses
-    json_pattern = r'(\{[\s\S]*?\})'
-    json_matches = re.findall(json_pattern, raw_response)
-
-    for potential_json in json_matches:
+    # Most answers are the object behind a prefix like "json" or a code fence
+    start = raw_response.find("{")
+    if start >= 0:
         try:
-            goal_data = json.loads(potential_json)
-
-            # Validate required fields
-            required_fields = [
-                "goal_name", "workout_type", "calories_to_burn",
-                "duration_days", "daily_target_calories", "daily_time_minutes"
-            ]
-
-            if all(field in goal_data for field in required_fields):
-                logger.debug(f"Successfully extracted JSON: {goal_data}")
+            goal_data = find_goal_data(json_decoder.raw_decode(raw_response, start)[0])
+            if goal_data is not None:
                 return goal_data
         except json.JSONDecodeError:
-            continue
+            pass
+
+    # Scan the text for JSON objects - common pattern with AI responses
+    scanner = JsonObjectScanner()
+    for candidate in scanner.feed(raw_response) + scanner.close():
+        goal_data = find_goal_data(candidate)
+        if goal_data is not None:
+            logger.debug(f"Successfully extracted JSON: {goal_data}")
+            return goal_data
 
     # If we get here, we couldn't extract valid JSON
     logger.error(f"Failed to extract valid JSON from response: {raw_response}")
     raise ValueError("Response is not valid JSON")
 
 
-def create_custom_agent(instruction_prompt: str,goal_description: str):
+def build_agent_request(instruction_prompt: str, goal_description: str, stream: bool = False):
+    """URL, payload and headers of a chat completion request to the AI service"""
     API_URL = os.environ.get("RAPIDAPI_URL")
     if API_URL is None:
         raise ValueError("RAPIDAPI_URL not found in environment variables")
@@ -86,32 +210,38 @@ def create_custom_agent(instruction_prompt: str,goal_description: str):
                 "content":f"{instruction_prompt} \n{goal_description} "
             }
         ],
-        "model": "gpt-4o-mini"
+        "model": config.AI_MODEL
     }
+    if stream:
+        payload["stream"] = True
     headers = {
         "x-rapidapi-key": API_KEY,
         "x-rapidapi-host": "chatgpt-42.p.rapidapi.com",
         "Content-Type": "application/json"
     }
+    return API_URL, payload, headers
+
+
+def extract_message_content(data: dict) -> str:
+    # Extract message content based on the API response structure
+    if 'choices' in data and len(data['choices']) > 0:
+        return data['choices'][0]['message']['content']
+
+    elif 'messages' in data and len(data['messages']) > 0:
+        return data['messages'][0]['content']
+    else:
+        logger.error(f"Unexpected API response format: {data}")
+        raise ValueError("Unable to extract content from API response")
+
+
+async def create_custom_agent(instruction_prompt: str,goal_description: str):
+    API_URL, payload, headers = build_agent_request(instruction_prompt, goal_description)
 
     try:
-        response = requests.post(API_URL, json=payload, headers=headers)
-        response.raise_for_status()
-
-        data = response.json()
-#TODO
-        # Extract message content based on the API response structure
-        if 'choices' in data and len(data['choices']) > 0:
-            print(data['choices'][0]['message']['content'])
-            return data['choices'][0]['message']['content']
-
-        elif 'messages' in data and len(data['messages']) > 0:
-            return data['messages'][0]['content']
-        else:
-            logger.error(f"Unexpected API response format: {data}")
-            raise ValueError("Unable to extract content from API response")
-
-    except requests.RequestException as e:
+        data = await ai_client.post_json(API_URL, payload, headers)
+        return extract_message_content(data)
+
+    except httpx.HTTPError as e:
         logger.error(f"API request failed: {str(e)}")
         raise HTTPException(status_code=503, detail="Failed to communicate with AI service")
     except Exception as e:
@@ -119,4 +249,32 @@ def create_custom_agent(instruction_prompt: str,goal_description: str):
         raise
 
 
+async def stream_custom_agent(instruction_prompt: str, goal_description: str) -> AsyncIterator[str]:
+    """create_custom_agent, yielding the answer in pieces as the AI writes it.
+
+    Reads the Server-Sent Events of a streamed chat completion. An upstream
+    that ignores "stream" and answers with plain JSON is yielded in one piece.
+    """
+    API_URL, payload, headers = build_agent_request(instruction_prompt, goal_description, stream=True)
 
+    try:
+        unstreamed = []
+        # closed together with this generator, so the response and the client slot are freed
+        async with aclosing(ai_client.stream_lines(API_URL, payload, headers)) as lines:
+            async for line in lines:
+                if not line.startswith("data:"):
+                    unstreamed.append(line)
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield text
+        if unstreamed:
+            yield extract_message_content(json.loads("\n".join(unstreamed)))
+
+    except httpx.HTTPError as e:
+        logger.error(f"API request failed: {str(e)}")
+        raise HTTPException(status_code=503, detail="Failed to communicate with AI service")
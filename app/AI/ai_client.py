@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import random
+from typing import AsyncIterator
+
+import httpx
+
+from app.app_configs.environment_config import config
+
+logger = logging.getLogger(__name__)
+
+# upstream answers worth another attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AIClient:
+    """Async HTTP client for the AI service.
+
+    One pooled httpx.AsyncClient is shared by every request of the worker, so
+    connections are kept alive between calls. At most `max_concurrency` calls
+    are outstanding at once, later ones wait for a slot. Connection errors,
+    timeouts, 429 and 5xx answers are retried `max_retries` times with full
+    jitter exponential backoff.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        backoff_seconds: float,
+        max_concurrency: int,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_concurrency = max_concurrency
+        self._transport = transport
+        # created on first use, inside the running event loop
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency
+                ),
+                transport=self._transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff_seconds * 2 ** attempt)
+
+    async def post_json(self, url: str, payload: dict, headers: dict) -> dict:
+        """POST `payload` and return the decoded JSON answer.
+
+        Raises httpx.HTTPError once the attempts are used up.
+        """
+        client = self._get_client()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    response = await client.post(url, json=payload, headers=headers)
+                    if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                        response.raise_for_status()
+                        return response.json()
+                    logger.warning(f"AI service answered {response.status_code}, attempt {attempt + 1}")
+                except httpx.TransportError as e:
+                    if last_attempt:
+                        raise
+                    logger.warning(f"AI request failed: {e!r}, attempt {attempt + 1}")
+                await asyncio.sleep(self.backoff(attempt))
+
+    async def stream_lines(self, url: str, payload: dict, headers: dict) -> AsyncIterator[str]:
+        """POST `payload` and yield the answer line by line as it arrives.
+
+        Failures before the answer starts are retried like in post_json, once
+        lines were yielded they are raised as they are.
+        """
+        client = self._get_client()
+        started = False
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    async with client.stream("POST", url, json=payload, headers=headers) as response:
+                        if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                started = True
+                                yield line
+                            return
+                    logger.warning(f"AI service answered {response.status_code}, attempt {attempt + 1}")
+                except httpx.TransportError as e:
+                    if last_attempt or started:
+                        raise
+                    logger.warning(f"AI request failed: {e!r}, attempt {attempt + 1}")
+                await asyncio.sleep(self.backoff(attempt))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+
+ai_client = AIClient(
+    connect_timeout=config.AI_CONNECT_TIMEOUT_SECONDS,
+    read_timeout=config.AI_READ_TIMEOUT_SECONDS,
+    max_retries=config.AI_MAX_RETRIES,
+    backoff_seconds=config.AI_RETRY_BACKOFF_SECONDS,
+    max_concurrency=config.AI_MAX_CONCURRENCY,
+)
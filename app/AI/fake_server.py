@@ -0,0 +1,88 @@
+"""
+Local stand-in for the AI chat completion API, for tests and load tests.
+
+Answers like the RapidAPI endpoint create_custom_agent talks to, with a goal
+plan built from the request, streamed as Server-Sent Events when the request
+asks for "stream". Latency and failures can be injected:
+
+    FAKE_AI_DELAY_SECONDS=2 FAKE_AI_FAILURE_RATE=0.1 FAKE_AI_TOKEN_DELAY_SECONDS=0.05 \
+        python -m app.AI.fake_server --port 8100
+    RAPIDAPI_URL=http://127.0.0.1:8100/chat RAPIDAPI_KEY=fake uvicorn app.main:app
+
+Tests can mount it without a port through httpx.ASGITransport(app=create_fake_ai_app()).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# characters per streamed token
+TOKEN_SIZE = 8
+
+
+def fake_goal_plan(goal_description: str) -> dict:
+    return {
+        "goal_name": goal_description.strip()[:100] or "stay fit",
+        "workout_type": "mixed",
+        "calories_to_burn": 38500,
+        "duration_days": 50,
+        "daily_target_calories": 770,
+        "daily_time_minutes": 77,
+    }
+
+
+def create_fake_ai_app(delay_seconds: float = 0, failure_rate: float = 0, token_delay_seconds: float = 0) -> FastAPI:
+    app = FastAPI(title="Fake AI service")
+    app.state.calls = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+
+    @app.post("/{path:path}")
+    async def chat(request: Request):
+        app.state.calls += 1
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+        body = await request.json()
+        try:
+            await asyncio.sleep(delay_seconds)
+        finally:
+            app.state.in_flight -= 1
+        if failure_rate and random.random() < failure_rate:
+            return JSONResponse({"message": "upstream overloaded"}, status_code=503)
+        # the goal description is the last line of the prompt
+        goal_description = body["messages"][-1]["content"].strip().splitlines()[-1]
+        content = "Here is your plan:\n```json\n" + json.dumps(fake_goal_plan(goal_description), indent=2) + "\n```"
+        if body.get("stream"):
+            return StreamingResponse(stream_tokens(content), media_type="text/event-stream")
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    async def stream_tokens(content: str):
+        for start in range(0, len(content), TOKEN_SIZE):
+            await asyncio.sleep(token_delay_seconds)
+            chunk = {"choices": [{"delta": {"content": content[start:start + TOKEN_SIZE]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_fake_ai_app(
+            float(os.getenv("FAKE_AI_DELAY_SECONDS", "0")),
+            float(os.getenv("FAKE_AI_FAILURE_RATE", "0")),
+            float(os.getenv("FAKE_AI_TOKEN_DELAY_SECONDS", "0")),
+        ),
+        host=args.host,
+        port=args.port,
+    )
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+import sqlalchemy
+
+from app.app_configs.environment_config import config
+from app.cache import TTLCache
+from app.db.database import database, ai_goal_plan_table
+from app.db.upsert import upsert
+from app.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# spellings folded together by normalize_goal
+WORD_ALIASES = {
+    "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "kms": "km", "kilometer": "km", "kilometers": "km", "kilometre": "km", "kilometres": "km",
+    "mins": "min", "minute": "min", "minutes": "min",
+    "days": "day", "weeks": "week", "months": "month", "years": "year",
+}
+
+
+def normalize_goal(goal_description: str) -> str:
+    """Fold the spelling of a goal so "Lose 5kg!" and "lose 5 KG" share a plan.
+
+    Only case, punctuation, spacing, number formatting and unit spellings are
+    folded, every word that could change the plan is kept.
+    """
+    text = unicodedata.normalize("NFKC", goal_description).lower()
+    tokens = []
+    for token in re.findall(r"\d+(?:\.\d+)?|[^\W\d_]+", text):
+        if token[0].isdigit() and "." in token:
+            token = token.rstrip("0").rstrip(".")
+        tokens.append(WORD_ALIASES.get(token, token))
+    return " ".join(tokens)
+
+
+def prompt_version(instruction_prompt: str) -> str:
+    """Plans made with another prompt are not reused"""
+    return hashlib.sha256(instruction_prompt.encode()).hexdigest()[:12]
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class GoalPlanCache:
+    """Two tier cache of AI goal plans: an in-memory LRU per worker in front of
+    the ai_goal_plans table shared by all workers.
+
+    Plans are keyed by prompt version and normalized goal and expire after
+    `ttl_seconds` in both tiers. Concurrent misses for the same key share one
+    database lookup and one AI call, so the AI sees at most one call per
+    distinct goal at a time.
+    """
+
+    def __init__(self, memory_size: int, ttl_seconds: float, timeout_seconds: float | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.memory = TTLCache(memory_size, ttl_seconds)
+        self.in_flight = SingleFlight()
+        self.database_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(version: str, normalized_goal: str) -> str:
+        return hashlib.sha256(f"{version}\n{normalized_goal}".encode()).hexdigest()
+
+    def _identify(self, goal_description: str, instruction_prompt: str) -> tuple[str, str, str]:
+        """(cache key, prompt version, normalized goal) of a goal"""
+        version = prompt_version(instruction_prompt)
+        normalized_goal = normalize_goal(goal_description)
+        return self.cache_key(version, normalized_goal), version, normalized_goal
+
+    async def get_stored(self, key: str) -> dict | None:
+        t = ai_goal_plan_table.c
+        row = await database.fetch_one(
+            sqlalchemy.select(t.plan, t.created_at).where(
+                t.cache_key == key, t.created_at > utc_now() - timedelta(seconds=self.ttl_seconds)
+            )
+        )
+        if row is None:
+            self.misses += 1
+            return None
+        self.database_hits += 1
+        remaining = self.ttl_seconds - (utc_now() - row["created_at"]).total_seconds()
+        self.memory.set(key, row["plan"], ttl_seconds=remaining)
+        return row["plan"]
+
+    async def put(self, key: str, version: str, normalized_goal: str, plan: dict) -> None:
+        values = {
+            "cache_key": key,
+            "prompt_version": version,
+            "normalized_goal": normalized_goal,
+            "plan": plan,
+            "created_at": utc_now(),
+        }
+        await database.execute(upsert(
+            ai_goal_plan_table, values, ["cache_key"],
+            update=lambda excluded: {"plan": excluded.plan, "created_at": excluded.created_at},
+        ))
+        # evict expired plans while we are writing anyway, through ix_ai_goal_plans_created_at
+        await database.execute(ai_goal_plan_table.delete().where(
+            ai_goal_plan_table.c.created_at <= utc_now() - timedelta(seconds=self.ttl_seconds)
+        ))
+        self.memory.set(key, plan)
+
+    async def get_or_create(
+        self, goal_description: str, instruction_prompt: str, create: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """The cached plan for the goal, or the one `create` makes, which is then cached.
+
+        Raises asyncio.TimeoutError when no plan is ready within `timeout_seconds`.
+        """
+        key, version, normalized_goal = self._identify(goal_description, instruction_prompt)
+        plan = self.memory.get(key)
+        if plan is not None:
+            logger.info(f"Goal plan cache hit for: {normalized_goal}")
+            return plan
+        if self.in_flight.in_flight(key):
+            logger.info(f"Waiting for the goal plan already requested for: {normalized_goal}")
+        return await self.in_flight.do(
+            key, lambda: self._load(key, version, normalized_goal, create), timeout=self.timeout_seconds
+        )
+
+    async def find(self, goal_description: str, instruction_prompt: str) -> dict | None:
+        """The cached plan for the goal, for callers that make the plan themselves on a miss"""
+        key, _, normalized_goal = self._identify(goal_description, instruction_prompt)
+        plan = self.memory.get(key)
+        if plan is None and self.ttl_seconds > 0:
+            if self.in_flight.in_flight(key):
+                # joins the get_or_create already making this plan
+                return await self.in_flight.do(key, lambda: self.get_stored(key), timeout=self.timeout_seconds)
+            plan = await self.get_stored(key)
+        if plan is not None:
+            logger.info(f"Goal plan cache hit for: {normalized_goal}")
+        return plan
+
+    async def store(self, goal_description: str, instruction_prompt: str, plan: dict) -> None:
+        if self.ttl_seconds > 0:
+            await self.put(*self._identify(goal_description, instruction_prompt), plan)
+
+    async def _load(self, key: str, version: str, normalized_goal: str, create: Callable[[], Awaitable[dict]]) -> dict:
+        if self.ttl_seconds <= 0:
+            return await create()
+        plan = await self.get_stored(key)
+        if plan is None:
+            plan = await create()
+            await self.put(key, version, normalized_goal, plan)
+        return plan
+
+    def stats(self) -> dict:
+        hits = self.memory.hits + self.in_flight.shared + self.database_hits
+        lookups = hits + self.misses
+        return {
+            "memory_size": len(self.memory),
+            "memory_hits": self.memory.hits,
+            "shared_in_flight": self.in_flight.shared,
+            "database_hits": self.database_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+goal_plan_cache = GoalPlanCache(
+    config.GOAL_PLAN_CACHE_MEMORY_SIZE, config.GOAL_PLAN_CACHE_TTL_SECONDS, config.GOAL_PLAN_TIMEOUT_SECONDS
+)
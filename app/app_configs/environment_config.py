@@ -26,14 +26,43 @@ class BaseConfig(BaseSettings):
 class GlobalConfig(BaseConfig):
     DATABASE_URL: str  # Required field
     DB_FORCE_ROLLBACK: bool = False
+    DB_SLOW_QUERY_MS: float = 200  # queries slower than this are logged with their SQL
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # one statement run this many times in a request is reported, 0 disables
+
+    # Database connection pool, per worker
+    DB_POOL_MIN_SIZE: int = 2  # connections opened and warmed up at startup
+    DB_POOL_MAX_SIZE: int = 10  # connections in use at once, later queries wait for one
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS: float = 5  # longest wait for a connection before answering 503
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements kept per PostgreSQL connection, 0 behind pgbouncer
+    DB_READY_MAX_ACQUIRE_WAIT_MS: float = 100  # /health/ready fails while recent connection waits exceed this
 
     # JWT Authentication settings
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_TTL_SECONDS: float = 60  # how long get_current_user trusts a resolved user, 0 disables the cache
+    USER_CACHE_MAX_SIZE: int = 10_000
+    PASSWORD_HASH_CONCURRENCY: int = 4  # bcrypt hashes run at once in worker threads, about the number of cores
 
-    #AI settings
+    # Progress summary settings
+    SUMMARY_DEBOUNCE_SECONDS: float = 0.25  # window in which summary refreshes of a user are coalesced
+    SUMMARY_CACHE_TTL_SECONDS: float = 300  # how long a served summary is kept in memory, checked against its version
+    SUMMARY_CACHE_MAX_SIZE: int = 10_000
 
+    # Responses
+    FAST_JSON_RESPONSES: bool = False  # encode trusted rows with orjson instead of validating them against the response model
+
+    #AI settings
+    # the endpoint and key come from RAPIDAPI_URL / RAPIDAPI_KEY, see app/AI/ai_agent.py
+    AI_MODEL: str = "gpt-4o-mini"
+    AI_CONNECT_TIMEOUT_SECONDS: float = 5
+    AI_READ_TIMEOUT_SECONDS: float = 30
+    AI_MAX_RETRIES: int = 2  # extra attempts after a connection error, timeout, 429 or 5xx
+    AI_RETRY_BACKOFF_SECONDS: float = 0.5  # base of the jittered exponential backoff
+    AI_MAX_CONCURRENCY: int = 16  # outstanding AI calls per worker, also the connection pool size
+    GOAL_PLAN_CACHE_TTL_SECONDS: float = 30 * 24 * 3600  # how long an AI goal plan is reused, 0 disables the cache
+    GOAL_PLAN_CACHE_MEMORY_SIZE: int = 1024  # plans kept in memory in front of the ai_goal_plans table
+    GOAL_PLAN_TIMEOUT_SECONDS: float = 90  # longest a request waits for a plan, shared or not
 
     @field_validator("DATABASE_URL")
     def validate_db_url(cls, v: str) -> str:
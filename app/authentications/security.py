@@ -4,8 +4,10 @@ from typing import Annotated
 from fastapi import HTTPException,status, Depends
 from fastapi.security import OAuth2PasswordBearer
 
+from anyio import CapacityLimiter, to_thread
 from jose import jwt, ExpiredSignatureError, JWTError
 
+from app.cache import TTLCache
 from app.db.database import database, user_table
 from passlib.context import CryptContext
 from app.app_configs.environment_config import config   # to get the secret key
@@ -28,6 +30,11 @@ def access_token_expire_minutes()-> int:
     return 30
 
 pwd_context = CryptContext(schemes=["bcrypt"])
+# bcrypt is slow on purpose (~100-300 ms), the async helpers below run it in worker threads
+password_hash_limiter = CapacityLimiter(config.PASSWORD_HASH_CONCURRENCY)
+
+# users resolved by get_current_user, keyed by the token subject (email)
+user_cache = TTLCache(config.USER_CACHE_MAX_SIZE, config.USER_CACHE_TTL_SECONDS)
 
 def create_access_token(email: str) -> str:
     logger.debug("Creating access token for email: %s", email)
@@ -42,6 +49,14 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    """hash_password without blocking the event loop"""
+    return await to_thread.run_sync(hash_password, password, limiter=password_hash_limiter)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password without blocking the event loop"""
+    return await to_thread.run_sync(verify_password, plain_password, hashed_password, limiter=password_hash_limiter)
+
 async def get_user_by_email(email: str):
     query = user_table.select().where(user_table.c.email == email)
     user = await database.fetch_one(query)
@@ -50,12 +65,17 @@ async def get_user_by_email(email: str):
     return user
 
 
+def invalidate_cached_user(email: str) -> None:
+    """Drop a user from the get_current_user cache, call after deleting a user or changing their password"""
+    user_cache.invalidate(email)
+
+
 ## Authenticate user by checking if the email exists and if the password is correct
 async def authenticate_user(email: str, password: str):
     user = await get_user_by_email(email)
     if not user:
        raise credentials_exception
-    if not verify_password(password, user["password"]):
+    if not await verify_password_async(password, user["password"]):
        raise credentials_exception
     return user
 
@@ -73,7 +93,11 @@ async def get_current_user(token:Annotated[str, Depends(oauth2_scheme)]):
         )
     except JWTError as e:
         raise credentials_exception
+    user = user_cache.get(email)
+    if user is not None:
+        return user
     user = await get_user_by_email(email=email)
     if user is None: # not found in the db
         raise credentials_exception
+    user_cache.set(email, user)
     return user
\ No newline at end of file
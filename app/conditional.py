@@ -0,0 +1,72 @@
+"""
+Conditional GET helpers.
+
+Read routes tag their response with an ETag built from a version that every
+write bumps, and a Last-Modified when the time of the last write is known. A
+client sending them back in If-None-Match (or If-Modified-Since) gets an empty
+304 when nothing changed, without the rows being read or serialized again.
+Last-Modified has a resolution of one second, the ETag is exact. A second
+write in the same second would not move Last-Modified, so If-Modified-Since
+is only honoured once the second of the last write is over.
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+# clients and proxies may store the response but must revalidate it before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag`, weak tags compare equal"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def http_date(moment: datetime) -> str:
+    """HTTP-date of a naive UTC datetime"""
+    return format_datetime(moment.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def second_is_over(moment: datetime, now: datetime | None = None) -> bool:
+    """Whether the second of a naive UTC datetime has passed, no write can land in it anymore"""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return moment.replace(microsecond=0) + timedelta(seconds=1) <= now
+
+
+def is_not_modified(
+    if_none_match: str | None, if_modified_since: str | None, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """Whether a 304 answers the request, If-Modified-Since only counts without If-None-Match"""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if not if_modified_since or last_modified is None or not second_is_over(last_modified):
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def set_etag(response: Response, etag: str, last_modified: datetime | None = None) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag, last_modified)
+    return response
@@ -0,0 +1,31 @@
+"""
+Per-user data version.
+
+Every write to the workouts or goals of a user bumps users.data_version and
+stamps users.data_modified_at, in the transaction of the write. Read routes
+derive their ETag and Last-Modified from the pair, one primary key lookup
+that runs before any of their rows are read.
+"""
+from datetime import datetime, timezone
+
+import sqlalchemy
+
+from app.conditional import make_etag
+from app.db.database import database, user_table
+
+
+async def bump_data_version(user_id: int) -> None:
+    query = user_table.update().where(user_table.c.id == user_id).values(
+        data_version=user_table.c.data_version + 1,
+        data_modified_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    await database.execute(query)
+
+
+async def data_version_validators(user_id: int, *scope) -> tuple[str, datetime | None]:
+    """ETag and Last-Modified of a read route, `scope` tells the routes of a user apart"""
+    query = sqlalchemy.select(user_table.c.data_version, user_table.c.data_modified_at).where(user_table.c.id == user_id)
+    row = await database.fetch_one(query)
+    if row is None:
+        return make_etag(*scope, user_id, 0), None
+    return make_etag(*scope, user_id, row["data_version"]), row["data_modified_at"]
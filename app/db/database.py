@@ -1,8 +1,9 @@
 import logging
-import databases
 import sqlalchemy
 from datetime import datetime
 from app.app_configs.environment_config import config
+from app.db.instrumentation import InstrumentedDatabase
+from app.db.pool import PooledDatabase, pool_options
 
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,9 @@ user_table = sqlalchemy.Table(
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("email", sqlalchemy.String(255), unique=True, index=True),
     sqlalchemy.Column("password", sqlalchemy.String(255)),
+    # bumped by every write to the workouts and goals of the user, see app.db.data_version
+    sqlalchemy.Column("data_version", sqlalchemy.Integer, nullable=False, server_default="0"),
+    sqlalchemy.Column("data_modified_at", sqlalchemy.DateTime, nullable=True),
 )
 
 # Define workout table
@@ -31,7 +35,10 @@ workout_table = sqlalchemy.Table(
     sqlalchemy.Column("notes", sqlalchemy.String),
     sqlalchemy.Column("workout_date", sqlalchemy.DateTime),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime),
-    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id",ondelete="CASCADE"), nullable=False)
+    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id",ondelete="CASCADE"), nullable=False),
+    # keyset pagination of GET /workout walks this index newest first
+    sqlalchemy.Index("ix_workouts_user_id_workout_date_id", "user_id", "workout_date", "id"),
+    sqlalchemy.Index("uq_workouts_user_id_workout_name", "user_id", "workout_name", unique=True),
 )
 
 goal_table = sqlalchemy.Table(
@@ -44,7 +51,10 @@ goal_table = sqlalchemy.Table(
     sqlalchemy.Column("daily_target_calories", sqlalchemy.Integer),
     sqlalchemy.Column("daily_time_minutes", sqlalchemy.Integer),
     sqlalchemy.Column("duration_days", sqlalchemy.Integer),
-    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id",ondelete="CASCADE"), nullable=False)
+    # first day of the goal window, it lasts duration_days from there
+    sqlalchemy.Column("start_date", sqlalchemy.Date, nullable=True),
+    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id",ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Index("uq_goals_user_id_goal_name", "user_id", "goal_name", unique=True),
 )
 
 
@@ -52,25 +62,55 @@ progress_summary_table =sqlalchemy.Table(
     "progress_summary",
     metadata,
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
-    sqlalchemy.Column("user_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id", ondelete="CASCADE")),
+    sqlalchemy.Column("user_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True),
     sqlalchemy.Column("total_workouts", sqlalchemy.Integer),
     sqlalchemy.Column("total_duration", sqlalchemy.Integer),
     sqlalchemy.Column("total_calories_burned", sqlalchemy.Integer),
     sqlalchemy.Column("remaining_duration_to_goal", sqlalchemy.Integer),
     sqlalchemy.Column("remaining_calories_to_goal", sqlalchemy.Integer),
-    sqlalchemy.Column("active_goals", sqlalchemy.JSON, nullable=True),
-    sqlalchemy.Column("workouts", sqlalchemy.JSON, nullable=True)
+    # goal totals are kept so the remaining_* columns can be derived from a delta
+    sqlalchemy.Column("goal_total_duration", sqlalchemy.Integer, server_default="0"),
+    sqlalchemy.Column("goal_total_calories", sqlalchemy.Integer, server_default="0"),
+    sqlalchemy.Column("total_goals", sqlalchemy.Integer, server_default="0"),
+    # bounded windows of the latest workout and goal ids, full lists are paginated by the routers
+    sqlalchemy.Column("recent_workout_ids", sqlalchemy.JSON, nullable=True),
+    sqlalchemy.Column("recent_goal_ids", sqlalchemy.JSON, nullable=True),
+    # bumped by every change of the row, the ETag of GET /workout-summary
+    sqlalchemy.Column("version", sqlalchemy.Integer, nullable=False, server_default="0"),
 )
 
+# workout totals per user, day and workout type, kept in step with the workouts by
+# app.db.rollup so range aggregations read one row per day instead of every workout
+workout_daily_rollup_table = sqlalchemy.Table(
+    "workout_daily_rollup",
+    metadata,
+    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("day", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("workout_type", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("workouts", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("duration", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("calories", sqlalchemy.Integer, nullable=False),
+)
 
+# goal plans returned by the AI, shared by every user submitting the same goal
+ai_goal_plan_table = sqlalchemy.Table(
+    "ai_goal_plans",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    # sha256 of the prompt version and the normalized goal, see app.AI.goal_plan_cache
+    sqlalchemy.Column("cache_key", sqlalchemy.String(64), nullable=False, unique=True, index=True),
+    sqlalchemy.Column("prompt_version", sqlalchemy.String(32), nullable=False),
+    sqlalchemy.Column("normalized_goal", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("plan", sqlalchemy.JSON, nullable=False),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, nullable=False, index=True),
+)
 
 
 
 
 
 
-#TODO
-
+# weekly targets of a goal, written when the goal is created
 weekly_plan_table = sqlalchemy.Table(
     "weekly_plans",
     metadata,
@@ -80,9 +120,11 @@ weekly_plan_table = sqlalchemy.Table(
     sqlalchemy.Column("nutrition_goal", sqlalchemy.String),
     sqlalchemy.Column("workout_goal", sqlalchemy.String),
     sqlalchemy.Column("habit_mindset_tip", sqlalchemy.String),
-    sqlalchemy.Column("goal_id", sqlalchemy.ForeignKey("goals.id"), nullable=False)
+    sqlalchemy.Column("goal_id", sqlalchemy.ForeignKey("goals.id"), nullable=False),
+    sqlalchemy.Index("uq_weekly_plans_goal_id_week", "goal_id", "week", unique=True),
 )
 
+# what was done towards a goal per week of its window, maintained by app.db.goal_progress
 goal_progress_table = sqlalchemy.Table(
     "goal_progress",
     metadata,
@@ -93,7 +135,13 @@ goal_progress_table = sqlalchemy.Table(
     sqlalchemy.Column("workout_completed", sqlalchemy.Boolean, default=False),
     sqlalchemy.Column("habit_completed", sqlalchemy.Boolean, default=False),
     sqlalchemy.Column("notes", sqlalchemy.String),
-    sqlalchemy.Column("updated_at", sqlalchemy.DateTime, default=sqlalchemy.func.now(), onupdate=sqlalchemy.func.now())
+    sqlalchemy.Column("updated_at", sqlalchemy.DateTime, default=sqlalchemy.func.now(), onupdate=sqlalchemy.func.now()),
+    # workouts matching the goal type during the week, and the calories the week should burn
+    sqlalchemy.Column("workouts", sqlalchemy.Integer),
+    sqlalchemy.Column("duration", sqlalchemy.Integer),
+    sqlalchemy.Column("calories_burned", sqlalchemy.Integer),
+    sqlalchemy.Column("target_calories", sqlalchemy.Integer),
+    sqlalchemy.Index("uq_goal_progress_goal_id_week", "goal_id", "week", unique=True),
 )
 
 
@@ -119,14 +167,16 @@ progress_table = sqlalchemy.Table(
 logger.info("Current DATABASE_URL database.py: %s", config.DATABASE_URL)
 engine = sqlalchemy.create_engine(config.DATABASE_URL)
 
-# Create all tables
-#TODO - delete drop_all when not needed
-#metadata.drop_all(engine)
-#logger.info("Dropping all tables in the database")
-metadata.create_all(engine)
+# The schema is managed by the Alembic migrations in app/db/migrations, keep the
+# tables above in sync with them. app.db.migrate.upgrade_database applies them.
+
+class Database(InstrumentedDatabase, PooledDatabase):
+    """Queries timed by app.db.instrumentation, connections handed out by app.db.pool"""
+
 
 # Database connection for async operations
-database = databases.Database(
+database = Database(
     config.DATABASE_URL,
-    force_rollback=config.DB_FORCE_ROLLBACK
+    force_rollback=config.DB_FORCE_ROLLBACK,
+    **pool_options(config.DATABASE_URL),
 )
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Per-goal progress.
+
+A goal runs for duration_days from its start_date and counts the workouts of
+its workout_type (any type for "mixed" goals). refresh_goal_progress computes
+every started week of the goals of a user in one pass over the daily rollup
+and upserts the weeks into goal_progress, so reads never rescan the workouts.
+It runs with the summary refresh after each write, for the goals running
+today and those whose window holds a day the write changed. Goals missing a
+start date, a duration or a calorie target have no weeks.
+"""
+import logging
+import math
+from collections.abc import Collection, Mapping
+from datetime import date, datetime, timedelta, timezone
+
+import sqlalchemy
+
+from app.db.database import (
+    database, goal_progress_table, goal_table, weekly_plan_table, workout_daily_rollup_table
+)
+from app.db.upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# goal workout types that count workouts of every type
+ANY_WORKOUT_TYPE = {"", "any", "all", "mixed"}
+# columns of goal_progress a refresh computes
+PROGRESS_COLUMNS = ("workouts", "duration", "calories_burned", "target_calories", "workout_completed")
+
+
+def tracks_progress(goal: Mapping) -> bool:
+    return bool(goal["start_date"] and goal["duration_days"] and goal["calories_to_burn"])
+
+
+def goal_end(goal: Mapping) -> date:
+    """Last day of the goal window"""
+    return goal["start_date"] + timedelta(days=goal["duration_days"] - 1)
+
+
+def goal_week(goal: Mapping, day: date) -> int:
+    """1-based week of the goal window holding `day`"""
+    return (day - goal["start_date"]).days // 7 + 1
+
+
+def started_weeks(goal: Mapping, today: date) -> int:
+    if not tracks_progress(goal) or today < goal["start_date"]:
+        return 0
+    return goal_week(goal, min(today, goal_end(goal)))
+
+
+def week_target_calories(goal: Mapping, week: int) -> int:
+    """Share of calories_to_burn falling on a week, the last week may be short"""
+    days = min(7, goal["duration_days"] - (week - 1) * 7)
+    return round(goal["calories_to_burn"] * days / goal["duration_days"])
+
+
+def counts_workout_type(goal: Mapping, workout_type: str) -> bool:
+    goal_type = (goal["workout_type"] or "").strip().lower()
+    return goal_type in ANY_WORKOUT_TYPE or goal_type == workout_type.strip().lower()
+
+
+def weekly_plan_rows(goal_id: int, goal: Mapping) -> list[dict]:
+    """The weekly_plans rows of a new goal"""
+    return [
+        {
+            "goal_id": goal_id,
+            "week": week,
+            "goal_focus": goal["goal_name"],
+            "workout_goal": f"Burn {week_target_calories(goal, week)} kcal with {goal['workout_type']}, "
+                            f"{goal['daily_time_minutes']} min per workout day",
+        }
+        for week in range(1, math.ceil(goal["duration_days"] / 7) + 1)
+    ]
+
+
+async def find_rollup_days(user_id: int, first_day: date, last_day: date):
+    r = workout_daily_rollup_table.c
+    query = sqlalchemy.select(r.day, r.workout_type, r.workouts, r.duration, r.calories).where(
+        r.user_id == user_id, r.day >= first_day, r.day <= last_day
+    )
+    return await database.fetch_all(query)
+
+
+async def compute_goal_progress(
+    user_id: int, today: date | None = None, days: Collection[date] | None = None
+) -> list[dict]:
+    """goal_progress rows of every started week of the goals of a user.
+
+    With `days`, only of the goals running today or whose window holds one of
+    them, the weeks of the other goals cannot have changed.
+    """
+    today = today or date.today()
+    query = goal_table.select().where(goal_table.c.user_id == user_id, goal_table.c.start_date <= today)
+    goals = [goal for goal in await database.fetch_all(query) if tracks_progress(goal)]
+    if days is not None:
+        goals = [
+            goal for goal in goals
+            if goal_end(goal) >= today or any(goal["start_date"] <= day <= goal_end(goal) for day in days)
+        ]
+    if not goals:
+        return []
+
+    progress = {}
+    for goal in goals:
+        for week in range(1, started_weeks(goal, today) + 1):
+            progress[(goal["id"], week)] = {
+                "goal_id": goal["id"], "week": week, "workouts": 0, "duration": 0, "calories_burned": 0,
+                "target_calories": week_target_calories(goal, week),
+            }
+
+    # one read of the rollup covers the windows of these goals
+    first_day = min(goal["start_date"] for goal in goals)
+    last_day = min(today, max(goal_end(goal) for goal in goals))
+    for row in await find_rollup_days(user_id, first_day, last_day):
+        for goal in goals:
+            if goal["start_date"] <= row["day"] <= min(today, goal_end(goal)) and counts_workout_type(goal, row["workout_type"]):
+                week = progress[(goal["id"], goal_week(goal, row["day"]))]
+                week["workouts"] += row["workouts"]
+                week["duration"] += row["duration"]
+                week["calories_burned"] += row["calories"]
+
+    for week in progress.values():
+        week["workout_completed"] = week["calories_burned"] >= week["target_calories"]
+    return list(progress.values())
+
+
+async def refresh_goal_progress(
+    user_id: int, today: date | None = None, days: Collection[date] | None = None
+) -> None:
+    rows = await compute_goal_progress(user_id, today, days)
+    if not rows:
+        return
+    logger.info(f"Refreshing progress of {len({row['goal_id'] for row in rows})} goals for user: {user_id}")
+    updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    await database.execute(upsert(
+        goal_progress_table, [{**row, "updated_at": updated_at} for row in rows], ["goal_id", "week"],
+        update=lambda excluded: {column: excluded[column] for column in (*PROGRESS_COLUMNS, "updated_at")},
+        # updated_at tags the progress, a refresh that changes nothing leaves it and the ETag alone
+        where=lambda excluded: sqlalchemy.or_(*(
+            goal_progress_table.c[column].is_distinct_from(excluded[column]) for column in PROGRESS_COLUMNS
+        )),
+    ))
+
+
+async def find_goal_progress(goal_id: int):
+    p = goal_progress_table.c
+    query = goal_progress_table.select().where(p.goal_id == goal_id).order_by(p.week)
+    return await database.fetch_all(query)
+
+
+async def find_goal_progress_updated_at(goal_id: int, user_id: int) -> datetime | None:
+    """When the refresh last wrote the weeks of a goal of the user, None before the first"""
+    p = goal_progress_table.c
+    query = (
+        sqlalchemy.select(sqlalchemy.func.max(p.updated_at).label("updated_at"))
+        .select_from(goal_progress_table.join(goal_table, goal_table.c.id == p.goal_id))
+        .where(p.goal_id == goal_id, goal_table.c.user_id == user_id)
+    )
+    return (await database.fetch_one(query))["updated_at"]
+
+
+async def find_weekly_plans(goal_id: int):
+    w = weekly_plan_table.c
+    query = sqlalchemy.select(w.week, w.workout_goal).where(w.goal_id == goal_id).order_by(w.week)
+    return await database.fetch_all(query)
@@ -0,0 +1,181 @@
+"""
+Query instrumentation of the databases.Database in app.db.database.
+
+InstrumentedDatabase times every query made through it into per-operation
+histograms and logs the ones slower than DB_SLOW_QUERY_MS with their compiled
+SQL. The app log filter tags those lines with the correlation ID of the
+request. While MetricsMiddleware handles a request, the queries are also
+collected in request_queries: their count goes into the route metrics and a
+statement repeated DB_N_PLUS_ONE_THRESHOLD times is reported as a likely
+N+1 pattern. SQL is only compiled for those reports, never per query.
+"""
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Optional
+
+import databases
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import ClauseElement
+
+from app.app_configs.environment_config import config
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the query latency histogram buckets, in seconds
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class RequestQueries:
+    """Queries made while handling one request"""
+
+    __slots__ = ("queries", "closed")
+
+    def __init__(self):
+        self.queries: list = []
+        # set once the request is reported, tasks it spawned may still query
+        self.closed = False
+
+
+request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+class OperationStats:
+    __slots__ = ("buckets", "total", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(QUERY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class QueryMetrics:
+    def __init__(self):
+        # fetch_all, fetch_one, fetch_val, execute, execute_many, iterate
+        self.operations: dict[str, OperationStats] = {}
+        self.slow_queries = 0
+
+    def observe(self, operation: str, elapsed: float) -> None:
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.buckets[bisect_left(QUERY_BUCKETS, elapsed)] += 1
+        stats.total += elapsed
+        stats.count += 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP db_query_duration_seconds Database query latency by databases.Database method.",
+            "# TYPE db_query_duration_seconds histogram",
+        ]
+        for operation, stats in sorted(self.operations.items()):
+            cumulative = 0
+            for bound, count in zip((*QUERY_BUCKETS, "+Inf"), stats.buckets):
+                cumulative += count
+                lines.append(f'db_query_duration_seconds_bucket{{operation="{operation}",le="{bound}"}} {cumulative}')
+            lines.append(f'db_query_duration_seconds_sum{{operation="{operation}"}} {stats.total}')
+            lines.append(f'db_query_duration_seconds_count{{operation="{operation}"}} {stats.count}')
+        lines += [
+            f"# HELP db_slow_queries_total Queries slower than {config.DB_SLOW_QUERY_MS:g} ms.",
+            "# TYPE db_slow_queries_total counter",
+            f"db_slow_queries_total {self.slow_queries}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+query_metrics = QueryMetrics()
+
+
+def statement_text(query: ClauseElement | str) -> str:
+    return str(query) if isinstance(query, ClauseElement) else query
+
+
+def compiled_sql(query: ClauseElement | str, dialect=None) -> str:
+    """SQL of a query with its parameters inlined where they can be"""
+    if not isinstance(query, ClauseElement):
+        return query
+    try:
+        return str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    except Exception:
+        compiled = query.compile(dialect=dialect)
+        return f"{compiled} {compiled.params}"
+
+
+def find_n_plus_one(queries: RequestQueries, label: str) -> bool:
+    """Report a statement repeated DB_N_PLUS_ONE_THRESHOLD times in one request"""
+    threshold = config.DB_N_PLUS_ONE_THRESHOLD
+    if not threshold or len(queries.queries) < threshold:
+        return False
+    statement, count = Counter(statement_text(query) for query in queries.queries).most_common(1)[0]
+    if count < threshold:
+        return False
+    logger.warning(f"Possible N+1 queries in {label}: {count} of {len(queries.queries)} queries run {statement}")
+    return True
+
+
+class InstrumentedDatabase(databases.Database):
+    def _observe(self, operation: str, query: ClauseElement | str, elapsed: float) -> None:
+        query_metrics.observe(operation, elapsed)
+        queries = request_queries.get()
+        if queries is not None and not queries.closed:
+            queries.queries.append(query)
+        if elapsed * 1000 >= config.DB_SLOW_QUERY_MS:
+            query_metrics.slow_queries += 1
+            dialect = postgresql.dialect() if self.url.dialect == "postgresql" else sqlite.dialect()
+            sql = compiled_sql(query, dialect)
+            logger.warning(f"Slow query, {elapsed * 1000:.1f} ms in {operation}: {sql}")
+
+    async def fetch_all(self, query: ClauseElement | str, values: Optional[dict] = None) -> list:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_all(query, values)
+        finally:
+            self._observe("fetch_all", query, time.perf_counter() - start)
+
+    async def fetch_one(self, query: ClauseElement | str, values: Optional[dict] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_one(query, values)
+        finally:
+            self._observe("fetch_one", query, time.perf_counter() - start)
+
+    async def fetch_val(self, query: ClauseElement | str, values: Optional[dict] = None, column: Any = 0) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_val(query, values, column=column)
+        finally:
+            self._observe("fetch_val", query, time.perf_counter() - start)
+
+    async def execute(self, query: ClauseElement | str, values: Optional[dict] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, values)
+        finally:
+            self._observe("execute", query, time.perf_counter() - start)
+
+    async def execute_many(self, query: ClauseElement | str, values: list) -> None:
+        start = time.perf_counter()
+        try:
+            return await super().execute_many(query, values)
+        finally:
+            self._observe("execute_many", query, time.perf_counter() - start)
+
+    async def iterate(self, query: ClauseElement | str, values: Optional[dict] = None) -> AsyncGenerator:
+        """Times the database side only, not the consumer between rows"""
+        elapsed = 0.0
+        rows = super().iterate(query, values)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    row = await rows.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield row
+        finally:
+            await rows.aclose()
+            self._observe("iterate", query, elapsed)
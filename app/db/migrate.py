@@ -0,0 +1,41 @@
+"""
+Apply the Alembic migrations once per deployment, before the app starts:
+
+    python -m app.db.migrate
+"""
+import logging
+import os
+
+import sqlalchemy
+from alembic import command
+from alembic.config import Config
+
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+# the schema metadata.create_all produced before migrations were introduced
+BASELINE_REVISION = "0001"
+# pg_advisory_xact_lock key, serializes deployments upgrading the same database
+MIGRATION_LOCK_KEY = 4_210_001
+
+
+def upgrade_database(bind: sqlalchemy.engine.Engine = engine) -> None:
+    """Bring the database schema up to the latest migration"""
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "migrations"))
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # held until the upgrade commits, a second deployment waits and then finds nothing to do
+            connection.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        alembic_config.attributes["connection"] = connection
+        inspector = sqlalchemy.inspect(connection)
+        if inspector.has_table("users") and not inspector.has_table("alembic_version"):
+            logger.info("Existing schema without migration history, stamping it as %s", BASELINE_REVISION)
+            command.stamp(alembic_config, BASELINE_REVISION)
+        command.upgrade(alembic_config, "head")
+
+
+if __name__ == "__main__":
+    upgrade_database()
@@ -0,0 +1,44 @@
+from logging.config import fileConfig
+
+import sqlalchemy
+from alembic import context
+
+from app.app_configs.environment_config import config as app_config
+from app.db.database import metadata
+
+config = context.config
+target_metadata = metadata
+
+# app.db.migrate hands over an open connection, the alembic CLI connects itself
+connection = config.attributes.get("connection")
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=app_config.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online(connection) -> None:
+    # batch mode lets the same migrations ALTER tables on SQLite
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    run_migrations_online(connection)
+else:
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    engine = sqlalchemy.create_engine(app_config.DATABASE_URL, poolclass=sqlalchemy.pool.NullPool)
+    with engine.begin() as cli_connection:
+        run_migrations_online(cli_connection)
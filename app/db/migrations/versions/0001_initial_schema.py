@@ -0,0 +1,98 @@
+"""initial schema, as created by metadata.create_all before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-10-30 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("email", sa.String(255)),
+        sa.Column("password", sa.String(255)),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "workouts",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("workout_name", sa.String),
+        sa.Column("workout_type", sa.String),
+        sa.Column("workout_duration", sa.Integer),
+        sa.Column("calories_burned", sa.Integer),
+        sa.Column("notes", sa.String),
+        sa.Column("workout_date", sa.DateTime),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    )
+    op.create_table(
+        "goals",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("goal_name", sa.String),
+        sa.Column("workout_type", sa.String),
+        sa.Column("calories_to_burn", sa.Integer),
+        sa.Column("daily_target_calories", sa.Integer),
+        sa.Column("daily_time_minutes", sa.Integer),
+        sa.Column("duration_days", sa.Integer),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    )
+    op.create_table(
+        "progress_summary",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("total_workouts", sa.Integer),
+        sa.Column("total_duration", sa.Integer),
+        sa.Column("total_calories_burned", sa.Integer),
+        sa.Column("remaining_duration_to_goal", sa.Integer),
+        sa.Column("remaining_calories_to_goal", sa.Integer),
+        sa.Column("active_goals", sa.JSON, nullable=True),
+        sa.Column("workouts", sa.JSON, nullable=True),
+    )
+    op.create_table(
+        "weekly_plans",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("week", sa.Integer),
+        sa.Column("goal_focus", sa.String),
+        sa.Column("nutrition_goal", sa.String),
+        sa.Column("workout_goal", sa.String),
+        sa.Column("habit_mindset_tip", sa.String),
+        sa.Column("goal_id", sa.Integer, sa.ForeignKey("goals.id"), nullable=False),
+    )
+    op.create_table(
+        "goal_progress",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("goal_id", sa.Integer, sa.ForeignKey("goals.id"), nullable=False),
+        sa.Column("week", sa.Integer),
+        sa.Column("nutrition_completed", sa.Boolean),
+        sa.Column("workout_completed", sa.Boolean),
+        sa.Column("habit_completed", sa.Boolean),
+        sa.Column("notes", sa.String),
+        sa.Column("updated_at", sa.DateTime),
+    )
+    op.create_table(
+        "progress",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("goal_id", sa.Integer, sa.ForeignKey("goals.id"), nullable=False),
+        sa.Column("analysis_date", sa.Date),
+        sa.Column("analysis_result", sa.Text),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+
+def downgrade() -> None:
+    for table in ("progress", "goal_progress", "weekly_plans", "progress_summary", "goals", "workouts"):
+        op.drop_table(table)
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,53 @@
+"""compact progress_summary rows and index workouts for keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-10-30 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column("goal_total_duration", sa.Integer, server_default="0"),
+    sa.Column("goal_total_calories", sa.Integer, server_default="0"),
+    sa.Column("total_goals", sa.Integer, server_default="0"),
+    sa.Column("recent_workout_ids", sa.JSON, nullable=True),
+    sa.Column("recent_goal_ids", sa.JSON, nullable=True),
+]
+
+
+def upgrade() -> None:
+    # databases that ran metadata.create_all after these columns were added already have some of them
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("progress_summary")}
+    with op.batch_alter_table("progress_summary") as batch:
+        for column in NEW_COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column)
+        for name in ("active_goals", "workouts"):
+            if name in existing:
+                batch.drop_column(name)
+
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("workouts")}
+    if "ix_workouts_user_id_workout_date_id" not in indexes:
+        op.create_index("ix_workouts_user_id_workout_date_id", "workouts", ["user_id", "workout_date", "id"])
+
+    # existing rows lack the new totals (and GET /workout-summary used to insert one per request),
+    # each user's summary is rebuilt by their next write or summary read
+    op.execute("DELETE FROM progress_summary")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workouts_user_id_workout_date_id", table_name="workouts")
+    with op.batch_alter_table("progress_summary") as batch:
+        batch.add_column(sa.Column("active_goals", sa.JSON, nullable=True))
+        batch.add_column(sa.Column("workouts", sa.JSON, nullable=True))
+        for column in NEW_COLUMNS:
+            batch.drop_column(column.name)
@@ -0,0 +1,29 @@
+"""index the per-user lookup columns, names are unique per user
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-10-30 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # one summary row per user, 0002 cleared the duplicates GET /workout-summary used to insert
+    op.create_index("ix_progress_summary_user_id", "progress_summary", ["user_id"], unique=True)
+    # both also serve plain user_id lookups through their leading column
+    op.create_index("uq_workouts_user_id_workout_name", "workouts", ["user_id", "workout_name"], unique=True)
+    op.create_index("uq_goals_user_id_goal_name", "goals", ["user_id", "goal_name"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_goals_user_id_goal_name", table_name="goals")
+    op.drop_index("uq_workouts_user_id_workout_name", table_name="workouts")
+    op.drop_index("ix_progress_summary_user_id", table_name="progress_summary")
@@ -0,0 +1,37 @@
+"""cache AI goal plans by normalized goal description
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-06 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_goal_plans",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("prompt_version", sa.String(length=32), nullable=False),
+        sa.Column("normalized_goal", sa.String(), nullable=False),
+        sa.Column("plan", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ai_goal_plans_cache_key", "ai_goal_plans", ["cache_key"], unique=True)
+    # expired plans are purged by age
+    op.create_index("ix_ai_goal_plans_created_at", "ai_goal_plans", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_goal_plans_created_at", table_name="ai_goal_plans")
+    op.drop_index("ix_ai_goal_plans_cache_key", table_name="ai_goal_plans")
+    op.drop_table("ai_goal_plans")
@@ -0,0 +1,41 @@
+"""roll workouts up per user, day and workout type
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-11-13 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "workout_daily_rollup",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("workout_type", sa.String(), nullable=False),
+        sa.Column("workouts", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("calories", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day", "workout_type"),
+    )
+    # backfill from the existing workouts, CAST(... AS DATE) yields the year alone on SQLite
+    day = "date(workout_date)" if op.get_bind().dialect.name == "sqlite" else "CAST(workout_date AS DATE)"
+    op.execute(
+        "INSERT INTO workout_daily_rollup (user_id, day, workout_type, workouts, duration, calories) "
+        f"SELECT user_id, {day}, COALESCE(workout_type, ''), count(*), "
+        "COALESCE(sum(workout_duration), 0), COALESCE(sum(calories_burned), 0) "
+        f"FROM workouts WHERE workout_date IS NOT NULL GROUP BY user_id, {day}, COALESCE(workout_type, '')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("workout_daily_rollup")
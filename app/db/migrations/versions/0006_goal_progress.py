@@ -0,0 +1,40 @@
+"""give goals a start date and track their progress per week
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-11-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("goals", sa.Column("start_date", sa.Date(), nullable=True))
+    # the day existing goals were set is unknown, their window starts now
+    op.execute("UPDATE goals SET start_date = CURRENT_DATE")
+
+    op.add_column("goal_progress", sa.Column("workouts", sa.Integer(), nullable=True))
+    op.add_column("goal_progress", sa.Column("duration", sa.Integer(), nullable=True))
+    op.add_column("goal_progress", sa.Column("calories_burned", sa.Integer(), nullable=True))
+    op.add_column("goal_progress", sa.Column("target_calories", sa.Integer(), nullable=True))
+    # one row per goal and week, upserted by app.db.goal_progress
+    op.create_index("uq_goal_progress_goal_id_week", "goal_progress", ["goal_id", "week"], unique=True)
+    op.create_index("uq_weekly_plans_goal_id_week", "weekly_plans", ["goal_id", "week"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_weekly_plans_goal_id_week", table_name="weekly_plans")
+    op.drop_index("uq_goal_progress_goal_id_week", table_name="goal_progress")
+    with op.batch_alter_table("goal_progress") as batch:
+        for column in ("target_calories", "calories_burned", "duration", "workouts"):
+            batch.drop_column(column)
+    with op.batch_alter_table("goals") as batch:
+        batch.drop_column("start_date")
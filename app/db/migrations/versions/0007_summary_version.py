@@ -0,0 +1,26 @@
+"""version the progress summary of each user
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-11-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # bumped by every change of the summary, GET /workout-summary derives its ETag from it
+    op.add_column("progress_summary", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("progress_summary") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,28 @@
+"""count the writes to the workouts and goals of each user
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-12-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ETag and Last-Modified of the read routes, see app.db.data_version
+    op.add_column("users", sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("users", sa.Column("data_modified_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("data_modified_at")
+        batch.drop_column("data_version")
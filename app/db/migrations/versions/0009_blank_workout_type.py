@@ -0,0 +1,27 @@
+"""store workouts without a type with a NULL workout_type
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-12-11 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # UserWorkoutIn turns a blank type into None, older rows may still hold ""
+    op.execute("UPDATE workouts SET workout_type = NULL WHERE TRIM(workout_type) = ''")
+    # the rollup already keeps NULL and "" under "", only types made of spaces
+    # had a group of their own: python -m app.db.rollup merges them
+
+
+def downgrade() -> None:
+    # both spellings meant no type, nothing to restore
+    pass
@@ -0,0 +1,19 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(workout_date: datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing after the (workout_date, id) of the last row of a page"""
+    payload = json.dumps([workout_date.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Reverse of encode_cursor, raises ValueError on anything it did not produce"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        workout_date, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(workout_date), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
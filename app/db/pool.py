@@ -0,0 +1,201 @@
+"""
+Database connection pool of the app.db.database connection.
+
+PooledDatabase meters the connections it hands out through Database.connection(),
+the public entry point of every query and transaction of `databases`. MeasuredPool
+caps them at DB_POOL_MAX_SIZE per worker, answers 503 after waiting
+DB_POOL_ACQUIRE_TIMEOUT_SECONDS for one and keeps the utilization and wait times
+that GET /health/ready and GET /metrics report. The asyncpg pool underneath gets
+its sizes from pool_options. The SQLite backend opens a connection per acquire,
+there the cap is the only bound.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Optional
+
+import databases
+from fastapi import HTTPException
+
+from app.app_configs.environment_config import config
+
+logger = logging.getLogger(__name__)
+
+
+def pool_options(database_url: str) -> dict:
+    """Settings of the asyncpg pool, the SQLite backend takes none"""
+    if not database_url.startswith("postgres"):
+        return {}
+    return {
+        "min_size": config.DB_POOL_MIN_SIZE,
+        "max_size": config.DB_POOL_MAX_SIZE,
+        "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+class MeasuredPool:
+    """Meters the connections of a Database.
+
+    At most max_size connections are held at once. acquire() waits up to
+    timeout seconds for one, then raises a 503 so requests fail fast instead
+    of queueing behind a saturated pool. A connection entered again by the
+    task holding it, as a transaction inside a query does, takes no second slot.
+    """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_size)
+        # how often each held connection is entered
+        self._depth: weakref.WeakKeyDictionary[databases.core.Connection, int] = weakref.WeakKeyDictionary()
+        self.in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # waits of the latest acquires, in seconds
+        self.recent_waits: deque[float] = deque(maxlen=256)
+
+    async def _acquire(self, connection: databases.core.Connection) -> None:
+        await self._slots.acquire()
+        try:
+            await connection.__aenter__()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def acquire(self, connection: databases.core.Connection) -> None:
+        """Enter `connection`, the first time it waits for a free slot"""
+        if connection in self._depth:
+            await connection.__aenter__()
+            self._depth[connection] += 1
+            return
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._acquire(connection), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"No database connection within {self.timeout} s, {self.in_use} of {self.max_size} in use")
+            raise HTTPException(status_code=503, detail="Database is busy, try again", headers={"Retry-After": "1"})
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - start
+        self._depth[connection] = 1
+        self.in_use += 1
+        self.acquired += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+
+    async def release(self, connection: databases.core.Connection, *exc_info) -> None:
+        """Exit `connection`, the last exit frees its slot"""
+        self._depth[connection] -= 1
+        try:
+            await connection.__aexit__(*exc_info)
+        finally:
+            if not self._depth[connection]:
+                del self._depth[connection]
+                self.in_use -= 1
+                self._slots.release()
+
+    def recent_wait_p95(self) -> float:
+        waits = sorted(self.recent_waits)
+        return waits[round(0.95 * (len(waits) - 1))] if waits else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "utilization": round(self.in_use / self.max_size, 3),
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "acquire_wait_avg_ms": round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "acquire_wait_max_ms": round(self.wait_max * 1000, 3),
+            "acquire_wait_recent_p95_ms": round(self.recent_wait_p95() * 1000, 3),
+        }
+
+    def render(self) -> str:
+        return "\n".join([
+            "# HELP db_pool_connections Database connections of this worker by state.",
+            "# TYPE db_pool_connections gauge",
+            f'db_pool_connections{{state="in_use"}} {self.in_use}',
+            f'db_pool_connections{{state="max"}} {self.max_size}',
+            "# HELP db_pool_waiting Queries waiting for a database connection.",
+            "# TYPE db_pool_waiting gauge",
+            f"db_pool_waiting {self.waiting}",
+            "# HELP db_pool_acquire_wait_seconds Time spent waiting for a database connection.",
+            "# TYPE db_pool_acquire_wait_seconds summary",
+            f"db_pool_acquire_wait_seconds_sum {self.wait_total}",
+            f"db_pool_acquire_wait_seconds_count {self.acquired}",
+            "# HELP db_pool_acquire_timeouts_total Queries answered 503 for lack of a database connection.",
+            "# TYPE db_pool_acquire_timeouts_total counter",
+            f"db_pool_acquire_timeouts_total {self.timeouts}",
+        ]) + "\n"
+
+
+class MeteredConnection:
+    """A Connection of `databases` entered through a MeasuredPool, everything else goes to the connection"""
+
+    def __init__(self, connection: databases.core.Connection, pool: MeasuredPool):
+        self.connection = connection
+        self.pool = pool
+
+    async def __aenter__(self) -> databases.core.Connection:
+        await self.pool.acquire(self.connection)
+        return self.connection
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.pool.release(self.connection, *exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class PooledDatabase(databases.Database):
+    # set while connected
+    pool: Optional[MeasuredPool] = None
+
+    async def connect(self) -> None:
+        if self.is_connected:
+            return
+        await super().connect()
+        self.pool = MeasuredPool(config.DB_POOL_MAX_SIZE, config.DB_POOL_ACQUIRE_TIMEOUT_SECONDS)
+
+    async def disconnect(self) -> None:
+        await super().disconnect()
+        self.pool = None
+
+    def connection(self) -> databases.core.Connection:
+        # queries, transactions and iterate() all enter the connection they get here
+        connection = super().connection()
+        if self.pool is None:
+            return connection
+        return MeteredConnection(connection, self.pool)
+
+    async def warm_up(self) -> None:
+        """Open DB_POOL_MIN_SIZE connections at once and run a query on each"""
+        start = time.perf_counter()
+        connections = max(1, min(config.DB_POOL_MIN_SIZE, config.DB_POOL_MAX_SIZE))
+        # each task holds a connection of its own
+        await asyncio.gather(*(self.fetch_val("SELECT 1") for _ in range(connections)))
+        logger.info(f"Warmed up {connections} database connections in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    async def readiness(self) -> dict:
+        """Round trip to the database and the state of the pool, for GET /health/ready"""
+        if self.pool is None:
+            return {"ready": False, "error": "not connected"}
+        error = None
+        start = time.perf_counter()
+        try:
+            await self.fetch_val("SELECT 1")
+        except Exception as e:
+            error = str(getattr(e, "detail", e))
+        round_trip = time.perf_counter() - start
+        pool = self.pool.stats()
+        ready = error is None and pool["acquire_wait_recent_p95_ms"] <= config.DB_READY_MAX_ACQUIRE_WAIT_MS
+        return {"ready": ready, "error": error, "round_trip_ms": round(round_trip * 1000, 3), "pool": pool}
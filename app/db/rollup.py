@@ -0,0 +1,120 @@
+"""
+Per-user daily workout rollup.
+
+workout_daily_rollup holds one row per user, day and workout type with the
+workout count, duration and calories of that day, workouts without a type
+under "" (the column is part of the key). The workout handlers fold
+every write into it through apply_rollup_changes, inside the transaction of
+the write. Rebuild it from the workouts after a backfill or to repair drift:
+
+    python -m app.db.rollup [--user-id ID]
+"""
+import argparse
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime
+
+import sqlalchemy
+
+from app.db.database import database, engine, workout_daily_rollup_table, workout_table
+from app.db.timeseries import day_bucket
+from app.db.upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+
+def workout_day(workout_date: date | datetime) -> date:
+    return workout_date.date() if isinstance(workout_date, datetime) else workout_date
+
+
+async def apply_rollup_changes(
+    user_id: int, added: Iterable[Mapping] = (), removed: Iterable[Mapping] = ()
+) -> set[date]:
+    """Fold workouts added and removed by a write into the rollup of a user.
+
+    Must be called inside the same transaction as the write. Each workout is
+    a mapping with workout_date, workout_type, workout_duration and
+    calories_burned, an update passes the old row as removed and the new one
+    as added. Returns the days whose totals changed.
+    """
+    changes = defaultdict(lambda: [0, 0, 0])
+    for sign, workouts in ((1, added), (-1, removed)):
+        for workout in workouts:
+            change = changes[(workout_day(workout["workout_date"]), workout["workout_type"] or "")]
+            change[0] += sign
+            change[1] += sign * (workout["workout_duration"] or 0)
+            change[2] += sign * (workout["calories_burned"] or 0)
+    values = [
+        {"user_id": user_id, "day": day, "workout_type": workout_type,
+         "workouts": workouts, "duration": duration, "calories": calories}
+        for (day, workout_type), (workouts, duration, calories) in changes.items()
+        if workouts or duration or calories
+    ]
+    if not values:
+        return set()
+
+    r = workout_daily_rollup_table.c
+    # one row per key in the statement, PostgreSQL refuses to update a row twice
+    await database.execute(upsert(
+        workout_daily_rollup_table, values, ["user_id", "day", "workout_type"],
+        update=lambda excluded: {
+            "workouts": r.workouts + excluded.workouts,
+            "duration": r.duration + excluded.duration,
+            "calories": r.calories + excluded.calories,
+        },
+    ))
+    if any(value["workouts"] < 0 for value in values):
+        await database.execute(workout_daily_rollup_table.delete().where(
+            r.user_id == user_id, r.day.in_({value["day"] for value in values}), r.workouts <= 0
+        ))
+    return {value["day"] for value in values}
+
+
+def rebuild_rollup_queries(user_id: int | None = None) -> list:
+    """DELETE and INSERT ... SELECT recomputing the rollup of a user, or of everyone"""
+    r = workout_daily_rollup_table.c
+    w = workout_table.c
+    day = day_bucket(w.workout_date)
+    workout_type = sqlalchemy.func.coalesce(w.workout_type, "")
+    select = (
+        sqlalchemy.select(
+            w.user_id,
+            day,
+            workout_type,
+            sqlalchemy.func.count(w.id),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(w.workout_duration), 0),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(w.calories_burned), 0),
+        )
+        .where(w.workout_date.is_not(None))
+        .group_by(w.user_id, day, workout_type)
+    )
+    delete = workout_daily_rollup_table.delete()
+    if user_id is not None:
+        select = select.where(w.user_id == user_id)
+        delete = delete.where(r.user_id == user_id)
+    insert = workout_daily_rollup_table.insert().from_select(
+        ["user_id", "day", "workout_type", "workouts", "duration", "calories"], select
+    )
+    return [delete, insert]
+
+
+async def rebuild_rollup(user_id: int | None = None) -> None:
+    logger.info(f"Rebuilding the daily workout rollup for user: {user_id if user_id is not None else 'all'}")
+    async with database.transaction():
+        for query in rebuild_rollup_queries(user_id):
+            await database.execute(query)
+
+
+def rebuild_rollup_sync(user_id: int | None = None, bind: sqlalchemy.engine.Engine = engine) -> None:
+    """rebuild_rollup through a sync engine, for scripts outside the event loop"""
+    with bind.begin() as connection:
+        for query in rebuild_rollup_queries(user_id):
+            connection.execute(query)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="only rebuild the rollup of this user")
+    args = parser.parse_args()
+    rebuild_rollup_sync(args.user_id)
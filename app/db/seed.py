@@ -0,0 +1,217 @@
+"""
+Synthetic users, workouts and goals for scale testing.
+
+Seeds --users users into the database of the current config (DATABASE_URL of
+ENV_STATE, SQLite or PostgreSQL) with bulk inserts through the sync engine.
+Workouts per user follow --distribution around --workouts, pareto gives the
+long tail of heavy users production has. Every user gets the daily rollup,
+summary and goal progress the app would have built, through the same
+rebuild paths. The same --seed always produces the same rows; seeded users
+log in as seed-<seed>-<n>@example.com with the password "seed-password".
+
+    python -m app.db.seed --users 1000 --workouts 500 --distribution pareto
+    DEV_DATABASE_URL=postgresql://... python -m app.db.seed --users 10000 --seed 7
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+
+import sqlalchemy
+
+from app.authentications.security import hash_password
+from app.db.database import database, engine, goal_table, user_table, weekly_plan_table, workout_table
+from app.db.goal_progress import weekly_plan_rows
+from app.db.rollup import rebuild_rollup_queries
+from app.db.summary_updater import refresh_summary
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "seed-password"
+# users inserted and committed together
+USER_CHUNK = 500
+# workout type: (share of workouts, calories per minute)
+WORKOUT_TYPES = {
+    "Running": (0.30, 10), "Walking": (0.20, 4), "Cycling": (0.20, 8),
+    "Strength": (0.15, 6), "Swimming": (0.10, 9), "Yoga": (0.05, 3),
+}
+GOAL_NAMES = ["lose 5 kg", "run a 10k", "build strength", "stay active", "cycle 100 km a week"]
+GOAL_DAYS = [30, 50, 90, 150]
+DISTRIBUTIONS = ("fixed", "uniform", "pareto")
+
+
+def user_email(seed: int, number: int) -> str:
+    return f"seed-{seed}-{number}@example.com"
+
+
+def workout_count(rng: random.Random, mean: int, distribution: str, maximum: int) -> int:
+    if distribution == "fixed":
+        count = mean
+    elif distribution == "uniform":
+        count = rng.randint(0, 2 * mean)
+    else:
+        # alpha 1.5 has a mean of 3 times its minimum
+        count = round(rng.paretovariate(1.5) * mean / 3)
+    return min(count, maximum)
+
+
+def generate_workouts(rng: random.Random, user_id: int, count: int, days: int, today: date) -> Iterator[dict]:
+    """`count` workouts spread over the `days` up to today, oldest first"""
+    first_day = today - timedelta(days=days - 1)
+    offsets = sorted(rng.randrange(days) for _ in range(count))
+    types, weights = list(WORKOUT_TYPES), [share for share, _ in WORKOUT_TYPES.values()]
+    for i, offset in enumerate(offsets):
+        workout_type = rng.choices(types, weights)[0]
+        duration = max(10, round(rng.gauss(45, 15)))
+        workout_date = datetime.combine(first_day + timedelta(days=offset), datetime.min.time())
+        yield {
+            "workout_name": f"{workout_type} {i + 1}",
+            "workout_type": workout_type,
+            "workout_duration": duration,
+            "calories_burned": round(duration * WORKOUT_TYPES[workout_type][1] * rng.uniform(0.8, 1.2)),
+            "notes": "felt great" if rng.random() < 0.1 else None,
+            "workout_date": workout_date,
+            "created_at": workout_date + timedelta(hours=rng.randrange(6, 22)),
+            "user_id": user_id,
+        }
+
+
+def generate_goals(rng: random.Random, user_id: int, mean: int, days: int, today: date) -> list[dict]:
+    goals = []
+    for i in range(rng.randint(0, 2 * mean)):
+        duration_days = rng.choice(GOAL_DAYS)
+        calories_to_burn = rng.randrange(5, 40) * 1000
+        daily_time_minutes = rng.randrange(20, 90, 5)
+        goals.append({
+            "goal_name": f"{rng.choice(GOAL_NAMES)} #{i + 1}",
+            "workout_type": rng.choice(["mixed", *WORKOUT_TYPES]),
+            "calories_to_burn": calories_to_burn,
+            "daily_target_calories": round(calories_to_burn / duration_days),
+            "daily_time_minutes": daily_time_minutes,
+            "duration_days": duration_days,
+            "start_date": today - timedelta(days=rng.randrange(days)),
+            "user_id": user_id,
+        })
+    return goals
+
+
+def insert_batches(connection, table: sqlalchemy.Table, rows: Iterator[dict], batch_size: int) -> int:
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            connection.execute(table.insert(), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+        inserted += len(batch)
+    return inserted
+
+
+def seed_users(
+    users: int,
+    workouts: int = 200,
+    distribution: str = "pareto",
+    goals: int = 1,
+    days: int = 730,
+    seed: int = 0,
+    max_workouts: int = 100_000,
+    batch_size: int = 10_000,
+    today: date | None = None,
+    bind: sqlalchemy.engine.Engine = engine,
+) -> list[int]:
+    """Insert the users, workouts, goals, weekly plans and daily rollup of a seed.
+
+    Returns the ids of the new users. Summaries and goal progress are left to
+    refresh_seeded_users, which runs on the async database.
+    """
+    today = today or date.today()
+    password = hash_password(PASSWORD)
+    user_ids = []
+    for first in range(0, users, USER_CHUNK):
+        numbers = range(first, min(first + USER_CHUNK, users))
+        emails = [user_email(seed, number) for number in numbers]
+        with bind.begin() as connection:
+            existing = connection.execute(
+                sqlalchemy.select(sqlalchemy.func.count()).where(user_table.c.email.in_(emails))
+            ).scalar()
+            if existing:
+                raise ValueError(f"Seed {seed} was already loaded into this database, pick another --seed")
+            connection.execute(user_table.insert(), [{"email": email, "password": password} for email in emails])
+            ids = dict(connection.execute(
+                sqlalchemy.select(user_table.c.email, user_table.c.id).where(user_table.c.email.in_(emails))
+            ).all())
+            chunk = [(ids[email], random.Random(f"{seed}:{number}")) for number, email in zip(numbers, emails)]
+
+            inserted = insert_batches(connection, workout_table, (
+                workout
+                for user_id, rng in chunk
+                for workout in generate_workouts(
+                    rng, user_id, workout_count(rng, workouts, distribution, max_workouts), days, today
+                )
+            ), batch_size)
+
+            new_goals = [goal for user_id, rng in chunk for goal in generate_goals(rng, user_id, goals, days, today)]
+            if new_goals:
+                connection.execute(goal_table.insert(), new_goals)
+                goal_ids = {
+                    (row.user_id, row.goal_name): row.id
+                    for row in connection.execute(
+                        sqlalchemy.select(goal_table.c.id, goal_table.c.user_id, goal_table.c.goal_name)
+                        .where(goal_table.c.user_id.in_(ids.values()))
+                    )
+                }
+                plans = [
+                    plan for goal in new_goals
+                    for plan in weekly_plan_rows(goal_ids[(goal["user_id"], goal["goal_name"])], goal)
+                ]
+                insert_batches(connection, weekly_plan_table, iter(plans), batch_size)
+
+            for user_id, _ in chunk:
+                for query in rebuild_rollup_queries(user_id):
+                    connection.execute(query)
+        user_ids.extend(user_id for user_id, _ in chunk)
+        logger.info(f"Seeded users {first + 1}-{numbers[-1] + 1} of {users}: {inserted} workouts, {len(new_goals)} goals")
+    return user_ids
+
+
+async def refresh_seeded_users(user_ids: list[int]) -> None:
+    """Build the summary and goal progress of seeded users like a write would"""
+    await database.connect()
+    try:
+        for user_id in user_ids:
+            await refresh_summary(user_id, rebuild=True)
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workouts", type=int, default=200, help="mean workouts per user")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="pareto",
+                        help="workouts per user: exactly the mean, uniform up to twice it, or a long tail")
+    parser.add_argument("--max-workouts", type=int, default=100_000, help="cap of a single user's history")
+    parser.add_argument("--goals", type=int, default=1, help="mean goals per user")
+    parser.add_argument("--days", type=int, default=730, help="days of history up to today")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10_000, help="rows per INSERT")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.INFO)
+    start = time.perf_counter()
+    try:
+        user_ids = seed_users(
+            args.users, args.workouts, args.distribution, args.goals, args.days, args.seed,
+            args.max_workouts, args.batch_size,
+        )
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    asyncio.run(refresh_seeded_users(user_ids))
+    logger.info(f"Seeded {len(user_ids)} users in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections.abc import Iterable
+from datetime import date
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+from app.app_configs.environment_config import config
+from app.db.summary_updater import refresh_summary
+
+logger = logging.getLogger(__name__)
+
+
+class UserRefresh:
+    """The refresh task of one user and what its waiters wait on"""
+
+    def __init__(self):
+        # created inside the running event loop
+        self.wake = asyncio.Event()
+        self.done = asyncio.Condition()
+        # request number covered by the last refresh of this task that succeeded
+        self.covered = 0
+        self.ended = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class SummaryScheduler:
+    """Coalesces summary refreshes per user and runs them off the request path.
+
+    schedule() only marks a user as pending. The first mark starts a background
+    task that waits `debounce_seconds` so a burst of writes is handled by a
+    single refresh; marks arriving while a refresh runs trigger one more run
+    afterwards. There is at most one refresh in flight per user. The refresh
+    gets the workout days written since the last one, None for a rebuild.
+    A failed refresh keeps its days (or rebuild) and is tried again after the
+    debounce window, up to `max_attempts` times in a row. The user then stays
+    pending until the next write or read starts a new task.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[int, bool, Optional[set[date]]], Awaitable],
+        debounce_seconds: float,
+        max_attempts: int = 3,
+    ):
+        self._refresh = refresh
+        self.debounce_seconds = debounce_seconds
+        self.max_attempts = max_attempts
+        # per user until nothing is pending
+        self._requested: dict[int, int] = {}  # bumped by every schedule()
+        self._completed: dict[int, int] = {}  # request number covered by the last successful refresh
+        self._rebuild = set()
+        self._days: dict[int, set[date]] = {}
+        # per user while a refresh task is alive
+        self._refreshes: dict[int, UserRefresh] = {}
+        self.runs = 0
+        self.failures = 0
+
+    def schedule(self, user_id: int, rebuild: bool = False, days: Iterable[date] = ()) -> None:
+        """Request a refresh (or a full rebuild) of the summary of a user after a write to `days`"""
+        self._requested[user_id] = self._requested.get(user_id, 0) + 1
+        self._days.setdefault(user_id, set()).update(days)
+        if rebuild:
+            self._rebuild.add(user_id)
+        if user_id not in self._refreshes:
+            self._start(user_id)
+
+    def pending(self, user_id: int) -> bool:
+        return self._completed.get(user_id, 0) < self._requested.get(user_id, 0)
+
+    async def wait_until_fresh(self, user_id: int, timeout: float | None = None) -> None:
+        """Wait until every refresh requested so far for the user has run.
+
+        Skips the rest of the debounce window, callers that need to read their
+        own writes should not pay for it. Raises a 503 when the refresh failed
+        every attempt, the summary would be stale.
+        """
+        target = self._requested.get(user_id, 0)
+        if self._completed.get(user_id, 0) >= target:
+            return
+        # a task that gave up or was cancelled left the user pending
+        refresh = self._refreshes.get(user_id) or self._start(user_id)
+        refresh.wake.set()
+        async with refresh.done:
+            await asyncio.wait_for(refresh.done.wait_for(lambda: refresh.ended or refresh.covered >= target), timeout)
+        if refresh.covered < target:
+            raise HTTPException(status_code=503, detail="Summary is being refreshed, try again", headers={"Retry-After": "1"})
+
+    async def drain(self) -> None:
+        """Run everything still pending now, used on shutdown"""
+        for refresh in self._refreshes.values():
+            refresh.wake.set()
+        if self._refreshes:
+            await asyncio.gather(*(refresh.task for refresh in self._refreshes.values()), return_exceptions=True)
+
+    def _start(self, user_id: int) -> UserRefresh:
+        refresh = self._refreshes[user_id] = UserRefresh()
+        refresh.task = asyncio.create_task(self._run(user_id, refresh))
+        return refresh
+
+    async def _run(self, user_id: int, refresh: UserRefresh) -> None:
+        failures = 0
+        try:
+            while self.pending(user_id):
+                try:
+                    await asyncio.wait_for(refresh.wake.wait(), self.debounce_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                refresh.wake.clear()
+                target = self._requested.get(user_id, 0)
+                rebuild = user_id in self._rebuild
+                self._rebuild.discard(user_id)
+                days = self._days.pop(user_id, set())
+                try:
+                    self.runs += 1
+                    await self._refresh(user_id, rebuild, None if rebuild else days)
+                except Exception:
+                    self.failures += 1
+                    failures += 1
+                    logger.exception(f"Summary refresh failed for user: {user_id}, attempt {failures} of {self.max_attempts}")
+                    # the next attempt covers these writes as well
+                    self._days.setdefault(user_id, set()).update(days)
+                    if rebuild:
+                        self._rebuild.add(user_id)
+                    if failures >= self.max_attempts:
+                        break
+                    # waiters may keep setting wake, the retry still waits a window
+                    await asyncio.sleep(self.debounce_seconds)
+                    continue
+                failures = 0
+                async with refresh.done:
+                    self._completed[user_id] = target
+                    refresh.covered = target
+                    refresh.done.notify_all()
+        finally:
+            if not self.pending(user_id):
+                self._requested.pop(user_id, None)
+                self._completed.pop(user_id, None)
+                self._days.pop(user_id, None)
+            del self._refreshes[user_id]
+            # waiters of a task that gave up or was cancelled stop waiting as well
+            refresh.ended = True
+            async with refresh.done:
+                refresh.done.notify_all()
+
+
+summary_scheduler = SummaryScheduler(refresh_summary, config.SUMMARY_DEBOUNCE_SECONDS)
@@ -1,19 +1,17 @@
 import logging
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
-from fastapi.encoders import jsonable_encoder
+from datetime import date
+from fastapi import HTTPException
+import sqlalchemy
 
-from app.models.users import User
-from app.authentications.security import get_current_user
 from app.db.database import database, workout_table, goal_table, progress_summary_table,user_table
-from app.routers.progress import convert_datetime_fields
+from app.db.goal_progress import refresh_goal_progress
+from app.db.upsert import upsert
 
 
 logger = logging.getLogger(__name__)
 
-
-
+# number of ids kept in the recent_workout_ids / recent_goal_ids windows
+RECENT_WINDOW = 10
 
 
 async def find_workout_by_user_id(user_id):
@@ -22,7 +20,141 @@ async def find_workout_by_user_id(user_id):
     return user
 
 
+async def find_summary_by_user_id(user_id):
+    query = progress_summary_table.select().where(progress_summary_table.c.user_id == user_id)
+    summary = await database.fetch_one(query)
+    return summary
+
+
+async def summary_exists(user_id) -> bool:
+    return await find_summary_version(user_id) is not None
+
+
+async def find_summary_version(user_id) -> int | None:
+    """Version of the summary of a user, None when they have none yet"""
+    query = sqlalchemy.select(progress_summary_table.c.version).where(progress_summary_table.c.user_id == user_id)
+    return await database.fetch_val(query)
+
+
+async def find_recent_ids(table, user_id, *order_by) -> list[int]:
+    query = (
+        sqlalchemy.select(table.c.id)
+        .where(table.c.user_id == user_id)
+        .order_by(*(order_by or [table.c.id.desc()]))
+        .limit(RECENT_WINDOW)
+    )
+    return [row[0] for row in await database.fetch_all(query)]
+
+
+async def find_recent_workout_ids(user_id) -> list[int]:
+    # same order as the first page of GET /workout, walks ix_workouts_user_id_workout_date_id
+    return await find_recent_ids(
+        workout_table, user_id, workout_table.c.workout_date.desc(), workout_table.c.id.desc()
+    )
+
+
+def _remaining(goal_total, done):
+    """SQL expression for max(goal_total - done, 0)"""
+    return sqlalchemy.case((goal_total > done, goal_total - done), else_=0)
+
+
+async def apply_workout_delta(user_id: int, workouts: int = 0, duration: int = 0, calories: int = 0):
+    """Apply the change caused by a single workout write to the stored summary totals.
+
+    Must be called inside the same transaction as the write. If the user has no
+    summary row yet, a full rebuild is inserted instead (it already sees the write).
+    The recent id windows are left to refresh_summary, run after the commit by
+    app.db.summary_scheduler.
+    """
+    if not await summary_exists(user_id) and await create_summary(user_id):
+        return
+
+    logger.info(f"Applying workout delta to summary for user: {user_id}")
+    s = progress_summary_table.c
+    total_duration = s.total_duration + duration
+    total_calories = s.total_calories_burned + calories
+    values = {
+        "version": s.version + 1,
+        "total_workouts": s.total_workouts + workouts,
+        "total_duration": total_duration,
+        "total_calories_burned": total_calories,
+        "remaining_duration_to_goal": _remaining(s.goal_total_duration, total_duration),
+        "remaining_calories_to_goal": _remaining(s.goal_total_calories, total_calories),
+    }
+    query = progress_summary_table.update().where(s.user_id == user_id).values(values)
+    await database.execute(query)
+
+
+async def apply_goal_delta(user_id: int, goals: int = 0, duration: int = 0, calories: int = 0):
+    """Apply the change caused by a single goal write to the stored summary.
+
+    Same contract as apply_workout_delta.
+    """
+    if not await summary_exists(user_id) and await create_summary(user_id):
+        return
+
+    logger.info(f"Applying goal delta to summary for user: {user_id}")
+    s = progress_summary_table.c
+    goal_duration = s.goal_total_duration + duration
+    goal_calories = s.goal_total_calories + calories
+    values = {
+        "version": s.version + 1,
+        "total_goals": s.total_goals + goals,
+        "goal_total_duration": goal_duration,
+        "goal_total_calories": goal_calories,
+        "remaining_duration_to_goal": _remaining(goal_duration, s.total_duration),
+        "remaining_calories_to_goal": _remaining(goal_calories, s.total_calories_burned),
+    }
+    query = progress_summary_table.update().where(s.user_id == user_id).values(values)
+    await database.execute(query)
+
+
+async def count_workout_totals(user_id: int) -> dict:
+    """Aggregate the summary totals of a user in the database"""
+    w = workout_table.c
+    g = goal_table.c
+    workout_totals = await database.fetch_one(
+        sqlalchemy.select(
+            sqlalchemy.func.count(w.id).label("total_workouts"),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(w.workout_duration), 0).label("total_duration"),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(w.calories_burned), 0).label("total_calories_burned"),
+        ).where(w.user_id == user_id)
+    )
+    goal_totals = await database.fetch_one(
+        sqlalchemy.select(
+            sqlalchemy.func.count(g.id).label("total_goals"),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(g.daily_time_minutes), 0).label("goal_total_duration"),
+            sqlalchemy.func.coalesce(sqlalchemy.func.sum(g.calories_to_burn), 0).label("goal_total_calories"),
+        ).where(g.user_id == user_id)
+    )
+    return {**dict(workout_totals._mapping), **dict(goal_totals._mapping)}
+
+
+async def build_summary(user_id: int) -> dict:
+    totals = await count_workout_totals(user_id)
+    return {
+        "user_id": user_id,
+        **totals,
+        "remaining_duration_to_goal": max(totals["goal_total_duration"] - totals["total_duration"], 0),
+        "remaining_calories_to_goal": max(totals["goal_total_calories"] - totals["total_calories_burned"], 0),
+        "recent_workout_ids": await find_recent_workout_ids(user_id),
+        "recent_goal_ids": await find_recent_ids(goal_table, user_id),
+    }
+
+
+async def create_summary(user_id: int) -> bool:
+    """Insert the first summary of a user, False when a concurrent write created it first"""
+    logger.info(f"Creating workout summary for user: {user_id}")
+    query = upsert(progress_summary_table, await build_summary(user_id), ["user_id"])
+    return await database.fetch_val(query.returning(progress_summary_table.c.user_id)) is not None
+
+
 async def update_workout_summary(user_id: int):
+    """Rebuild the summary of a user from all of their workouts and goals.
+
+    Writes keep the summary up to date through apply_workout_delta and
+    apply_goal_delta, this full rebuild is the repair path.
+    """
     logger.info(f"Updating workout with ID: {user_id}")
     # Check if workout exists
     existing_user = await find_workout_by_user_id(user_id)
@@ -33,52 +165,52 @@ async def update_workout_summary(user_id: int):
     logger.info(f"Updating workout and goal summary for user: {user_id}")
 
     try:
-        # Fetch workouts for the user
-        workout_query = workout_table.select().where(workout_table.c.user_id == user_id)
-        workouts = await database.fetch_all(workout_query)
-
-        # Fetch goals for the same user
-        goal_query = goal_table.select().where(goal_table.c.user_id == user_id)
-        goals = await database.fetch_all(goal_query)
-
-        # Calculate summary statistics
-        total_duration_user_workout = sum(w["workout_duration"] for w in workouts)
-        total_calories_user_workout = sum(w["calories_burned"] for w in workouts)
-        total_workouts = len(workouts)
-
-        # Process goals data
-        active_goals = [dict(goal) for goal in goals]
-        total_calories_user_goal = sum(g["calories_to_burn"] for g in goals)
-        total_duration_user_goal = sum(g["daily_time_minutes"] for g in goals)
-
-        remaining_duration_to_goal = max(total_duration_user_goal - total_duration_user_workout, 0)
-        remaining_calories_to_goal = max(total_calories_user_goal - total_calories_user_workout, 0)
-
-        # Prepare workouts list with serialized datetime fields
-        workouts_list = [convert_datetime_fields(dict(w)) for w in workouts]
-
-        # Construct the summary object
-        summary = {
-            "user_id": user_id,
-            "total_workouts": total_workouts,
-            "total_duration": total_duration_user_workout,
-            "total_calories_burned": total_calories_user_workout,
-            "remaining_duration_to_goal": remaining_duration_to_goal,
-            "remaining_calories_to_goal": remaining_calories_to_goal,
-            "active_goals": active_goals,
-            "workouts": workouts_list
-        }
-
-        # Save to the database
-        query = progress_summary_table.update().where(
-            progress_summary_table.c.user_id == user_id
-        ).values(summary)
+        summary = await build_summary(user_id)
+
+        # Save to the database, replacing the row a concurrent write may have created
+        query = upsert(
+            progress_summary_table, summary, ["user_id"],
+            update=lambda excluded: {
+                **{column: excluded[column] for column in summary if column != "user_id"},
+                "version": progress_summary_table.c.version + 1,
+            },
+        )
         logger.info(f"Saving workout summary to database for user: {user_id}")
         await database.execute(query)
 
-        return jsonable_encoder(summary)
+        return await find_summary_by_user_id(user_id)
 
+    except HTTPException:
+        # a 503 from the connection pool keeps its Retry-After
+        raise
     except Exception as e:
         logger.error(f"Error in updating_workout_progress_summary: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+async def refresh_summary(user_id: int, rebuild: bool = False, days: set[date] | None = None):
+    """Refresh the parts of the summary the write deltas leave out, or rebuild it all,
+    then the progress of the goals running today or over the written `days` (of every goal when None)"""
+    if rebuild or not await summary_exists(user_id):
+        await update_workout_summary(user_id)
+    else:
+        logger.info(f"Refreshing recent workouts and goals in the summary of user: {user_id}")
+        query = progress_summary_table.update().where(progress_summary_table.c.user_id == user_id).values(
+            version=progress_summary_table.c.version + 1,
+            recent_workout_ids=await find_recent_workout_ids(user_id),
+            recent_goal_ids=await find_recent_ids(goal_table, user_id),
+        )
+        await database.execute(query)
+    await refresh_goal_progress(user_id, days=days)
+
+
+async def verify_workout_summary(user_id: int) -> bool:
+    """Check the stored totals against a full recount and repair them on drift"""
+    stored = await find_summary_by_user_id(user_id)
+    expected = await count_workout_totals(user_id)
+    if stored and all(stored[key] == value for key, value in expected.items()):
+        return True
+
+    logger.warning(f"Summary for user {user_id} drifted from its workouts and goals, rebuilding")
+    await update_workout_summary(user_id)
+    return False
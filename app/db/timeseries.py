@@ -0,0 +1,83 @@
+from datetime import date
+
+import sqlalchemy
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from app.db.database import database, workout_daily_rollup_table
+
+
+class date_bucket(FunctionElement):
+    """First day of the day, week (from Monday) or month holding a datetime, as a DATE.
+
+    The unit is part of the class rather than a bound parameter, so the same
+    expression in SELECT and GROUP BY compiles to identical SQL.
+    """
+    type = sqlalchemy.Date()
+    inherit_cache = True
+    unit: str
+
+
+class day_bucket(date_bucket):
+    inherit_cache = True
+    unit = "day"
+
+
+class week_bucket(date_bucket):
+    inherit_cache = True
+    unit = "week"
+
+
+class month_bucket(date_bucket):
+    inherit_cache = True
+    unit = "month"
+
+
+BUCKETS = {bucket.unit: bucket for bucket in (day_bucket, week_bucket, month_bucket)}
+SQLITE_MODIFIERS = {"day": "", "week": ", 'weekday 0', '-6 days'", "month": ", 'start of month'"}
+
+
+@compiles(date_bucket)
+def compile_date_bucket(element, compiler, **kw):
+    return f"CAST(date_trunc('{element.unit}', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(date_bucket, "sqlite")
+def compile_date_bucket_sqlite(element, compiler, **kw):
+    return f"date({compiler.process(element.clauses, **kw)}{SQLITE_MODIFIERS[element.unit]})"
+
+
+async def find_workout_timeseries(
+    user_id: int,
+    bucket: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    workout_type: str | None = None,
+):
+    """Workout count, duration and calories per bucket and workout type, oldest bucket first.
+
+    Reads the daily rollup, so a range costs one row per active day and type
+    however many workouts it holds. Workouts without a type are one group
+    with workout_type None.
+    """
+    r = workout_daily_rollup_table.c
+    period_start = BUCKETS[bucket](r.day).label("period_start")
+    query = (
+        sqlalchemy.select(
+            period_start,
+            sqlalchemy.func.nullif(r.workout_type, "").label("workout_type"),
+            sqlalchemy.func.sum(r.workouts).label("workouts"),
+            sqlalchemy.func.sum(r.duration).label("total_duration"),
+            sqlalchemy.func.sum(r.calories).label("total_calories_burned"),
+        )
+        .where(r.user_id == user_id)
+        .group_by(period_start, r.workout_type)
+        .order_by(period_start, r.workout_type)
+    )
+    if date_from:
+        query = query.where(r.day >= date_from)
+    if date_to:
+        query = query.where(r.day <= date_to)
+    if workout_type:
+        query = query.where(r.workout_type == workout_type)
+    return await database.fetch_all(query)
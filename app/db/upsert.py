@@ -0,0 +1,31 @@
+from typing import Callable
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.database import database
+
+
+def upsert(
+    table: sqlalchemy.Table,
+    values: dict | list[dict],
+    index_elements: list[str],
+    update: Callable[[sqlalchemy.sql.expression.ColumnCollection], dict] | None = None,
+    where: Callable[[sqlalchemy.sql.expression.ColumnCollection], sqlalchemy.sql.ColumnElement] | None = None,
+):
+    """INSERT ... ON CONFLICT (index_elements) DO UPDATE for the dialect of `database`.
+
+    `update` gets the columns of the row that failed to insert (EXCLUDED) and
+    returns the values to set on the existing row. Without it the existing row
+    is left as it is (DO NOTHING). `where` gets them as well and returns the
+    condition under which the existing row is updated (DO UPDATE ... WHERE).
+    """
+    dialect_insert = postgresql.insert if database.url.dialect == "postgresql" else sqlite.insert
+    query = dialect_insert(table).values(values)
+    if update is None:
+        return query.on_conflict_do_nothing(index_elements=index_elements)
+    return query.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=update(query.excluded),
+        where=where(query.excluded) if where is not None else None,
+    )
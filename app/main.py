@@ -1,11 +1,17 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 from fastapi.exception_handlers import http_exception_handler
 from asgi_correlation_id import CorrelationIdMiddleware
+from app.AI.ai_client import ai_client
 from app.db.database import database
+from app.db.instrumentation import query_metrics
+from app.db.summary_scheduler import summary_scheduler
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
 from app.routers.workouts import router as workout_router
+from app.routers.workout_io import router as workout_io_router
 from app.routers.user import router as user_router
 from app.routers.goals import router as goal_router
 from app.routers.progress import router as summary_router
@@ -18,9 +24,14 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     configure_logging()
     """Lifespan context manager for the FastAPI application."""
+    # the schema is migrated once before the workers start, see entrypoint.sh
     await database.connect()
     logger.info("Connected to the databases...")
+    # open the first connections before the first requests wait on them
+    await database.warm_up()
     yield
+    await summary_scheduler.drain()
+    await ai_client.aclose()
     await database.disconnect()
 
 app = FastAPI(
@@ -31,6 +42,8 @@ app = FastAPI(
 )
 
 app.add_middleware(CorrelationIdMiddleware)
+# outermost, so the timing covers the other middleware as well
+app.add_middleware(MetricsMiddleware)
 
 # Health check endpoints for Render
 @app.get("/")
@@ -45,8 +58,23 @@ async def root():
 async def health_check():
     return {"status": "ok", "message": "Service is healthy"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """503 while the database is unreachable or queries wait too long for a connection"""
+    readiness = await database.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request and database query metrics of this worker in the Prometheus text format"""
+    text = metrics.render() + query_metrics.render()
+    if database.pool is not None:
+        text += database.pool.render()
+    return Response(text, media_type=CONTENT_TYPE)
+
 # Include routers
 app.include_router(workout_router, tags=["workouts"])
+app.include_router(workout_io_router, tags=["workouts"])
 app.include_router(user_router, tags=["user"])
 app.include_router(goal_router, tags=["goals"])
 app.include_router(summary_router, tags=["summary"])
@@ -0,0 +1,150 @@
+"""
+Request metrics in the Prometheus text format.
+
+MetricsMiddleware times every HTTP request and counts its response status
+and database queries under the route template it matched
+("/workout/{workout_id}"), requests no route matched share the "<unmatched>"
+label so the number of series stays bounded. It is a plain ASGI middleware:
+per request it reads the clock twice and bumps a few counters in structures
+allocated once per route. GET /metrics renders them with the query metrics
+of app.db.instrumentation. Each worker process keeps its own numbers.
+"""
+import time
+from bisect import bisect_left
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.instrumentation import RequestQueries, find_n_plus_one, request_queries
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RouteStats:
+    """Latency histogram and status counts of one route and method"""
+
+    __slots__ = ("method", "path", "buckets", "total", "count", "statuses", "queries", "n_plus_one")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        # one slot per bucket plus +Inf, not cumulative, render() adds them up
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.statuses: dict[int, int] = {}
+        self.queries = 0
+        self.n_plus_one = 0
+
+
+def label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        # route template -> method -> stats
+        self.routes: dict[str, dict[str, RouteStats]] = {}
+
+    def observe(
+        self, path: str, method: str, status: int, elapsed: float, queries: int = 0, n_plus_one: bool = False
+    ) -> None:
+        by_method = self.routes.get(path)
+        if by_method is None:
+            by_method = self.routes[path] = {}
+        stats = by_method.get(method)
+        if stats is None:
+            stats = by_method[method] = RouteStats(method, path)
+        stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        stats.total += elapsed
+        stats.count += 1
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.queries += queries
+        stats.n_plus_one += n_plus_one
+
+    def render(self) -> str:
+        stats = sorted(
+            (stats for by_method in list(self.routes.values()) for stats in list(by_method.values())),
+            key=lambda stats: (stats.path, stats.method),
+        )
+        lines = [
+            "# HELP http_requests_in_flight HTTP requests being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds HTTP request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for route in stats:
+            labels = f'method="{route.method}",route="{label(route.path)}"'
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), route.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {route.total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {route.count}")
+        lines += [
+            "# HELP http_responses_total HTTP responses by route template and status.",
+            "# TYPE http_responses_total counter",
+        ]
+        for route in stats:
+            labels = f'method="{route.method}",route="{label(route.path)}"'
+            for status, count in sorted(route.statuses.items()):
+                lines.append(f'http_responses_total{{{labels},status="{status}"}} {count}')
+        lines += [
+            "# HELP http_request_db_queries_total Database queries made by the requests of a route.",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for route in stats:
+            labels = f'method="{route.method}",route="{label(route.path)}"'
+            lines.append(f"http_request_db_queries_total{{{labels}}} {route.queries}")
+        lines += [
+            "# HELP http_request_n_plus_one_total Requests of a route that repeated one statement like an N+1 loop.",
+            "# TYPE http_request_n_plus_one_total counter",
+        ]
+        for route in stats:
+            labels = f'method="{route.method}",route="{label(route.path)}"'
+            lines.append(f"http_request_n_plus_one_total{{{labels}}} {route.n_plus_one}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: RequestMetrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        registry = self.registry
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = RequestQueries()
+        token = request_queries.set(queries)
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.in_flight -= 1
+            request_queries.reset(token)
+            queries.closed = True
+            # the router stores the matched route in the shared scope
+            route = scope.get("route")
+            path = UNMATCHED if route is None else route.path
+            n_plus_one = find_n_plus_one(queries, f"{scope['method']} {path}")
+            registry.observe(path, scope["method"], status, elapsed, len(queries.queries), n_plus_one)
@@ -3,8 +3,8 @@ from typing import Optional
 
 from pydantic import BaseModel,Field,ConfigDict
 
-# workout Create (POST request), it will be used to control the returned data
-class UserGoalIn(BaseModel):
+# goal plan made by the AI, validated before it is cached and shared between users
+class UserGoalPlan(BaseModel):
     model_config = ConfigDict(from_attributes=True) # make the pydantic to treat it as object as well as dict
     goal_name: str = Field(...,max_length=100,json_schema_extra={"example": "Lose 5 kg"})
     workout_type: str = Field(...,json_schema_extra={"example": "Running"})
@@ -12,7 +12,11 @@ class UserGoalIn(BaseModel):
     daily_target_calories: int = Field(100,gt=0,json_schema_extra={"example": 770})  # Calories burned must be positive
     daily_time_minutes: int = Field(15,gt=0,json_schema_extra={"example": 30})  # Duration in minutes and must be positive gt : greater than
     duration_days: int = Field(15,gt=0,json_schema_extra={"example": 90})  # Duration in days and must be positive gt : greater than
+
+# workout Create (POST request), it will be used to control the returned data
+class UserGoalIn(UserGoalPlan):
     user_id: int
+    start_date: Optional[date] = Field(None,json_schema_extra={"example": "2025-06-02"})  # first day of the goal window
    # created_at: datetime
 
 #Workout response (GET request)
@@ -21,3 +25,22 @@ class UserGoalOut(UserGoalIn):
     #user_id: int  # Ensure workouts belong to a specific user
 
 
+# Goal progress (GET /goal/{goal_id}/progress)
+class GoalWeekProgress(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    week: int  # 1-based week of the goal window
+    week_start: date
+    workouts: int = 0
+    duration: int = 0
+    calories_burned: int = 0
+    target_calories: int
+    workout_completed: bool = False
+    workout_goal: Optional[str] = None
+
+class GoalProgressOut(BaseModel):
+    goal_id: int
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    calories_to_burn: Optional[int] = None
+    calories_burned: int = 0
+    weeks: list[GoalWeekProgress] = []
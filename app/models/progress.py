@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field,ConfigDict
-from typing import Dict, List, Any, Optional, Union
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Literal, Optional, Union
+from datetime import date, datetime, timedelta
 
 
 
 class OverallSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
     id: int
     user_id: int
     total_workouts: int
@@ -12,5 +13,21 @@ class OverallSummary(BaseModel):
     total_calories_burned: int
     remaining_duration_to_goal: int
     remaining_calories_to_goal: int
-    active_goals: Optional[Dict] = None
-    workouts: Optional[List[Dict]] = None
\ No newline at end of file
+    total_goals: int = 0
+    # ids of the latest workouts (by workout date) and goals, the full lists are paginated
+    # by GET /workout and GET /goal
+    recent_workout_ids: List[int] = Field(default_factory=list)
+    recent_goal_ids: List[int] = Field(default_factory=list)
+
+class WorkoutTimeseries(BaseModel):
+    """Workout totals per period and workout type, as parallel columns.
+
+    Entry i of every list describes the same (period_start, workout_type) group,
+    periods are in ascending order.
+    """
+    bucket: Literal["day", "week", "month"]
+    period_start: List[date] = Field(default_factory=list)
+    workout_type: List[Optional[str]] = Field(default_factory=list)
+    workouts: List[int] = Field(default_factory=list)
+    total_duration: List[int] = Field(default_factory=list)
+    total_calories_burned: List[int] = Field(default_factory=list)
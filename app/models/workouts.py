@@ -1,13 +1,13 @@
 from datetime import datetime, date
 from typing import Optional
 
-from pydantic import BaseModel,Field,ConfigDict
+from pydantic import BaseModel,Field,ConfigDict,field_validator
 
 # workout Create (POST request), it will be used to control the returned data
 class UserWorkoutIn(BaseModel):
     model_config = ConfigDict(from_attributes=True) # make the pydantic to treat it as object as well as dict
     workout_name: str = Field(...,max_length=100,json_schema_extra={"example": "Morning Run"})
-    workout_type: str = Field(...,json_schema_extra={"example": "Running"})
+    workout_type: Optional[str] = Field(...,json_schema_extra={"example": "Running"})  # null or blank: no type
     workout_date: date = Field(...,json_schema_extra={"example": "2025-06-02"})  # Date in YYYY-MM-DD format
     workout_duration: int = Field(15,gt=0,json_schema_extra={"example": 30})  # Duration in minutes and must be positive gt : greater than
     calories_burned: int = Field(100,gt=0,json_schema_extra={"example": 350})  # Calories burned must be positive
@@ -15,9 +15,23 @@ class UserWorkoutIn(BaseModel):
     user_id: int
    # created_at: datetime
 
+    @field_validator("workout_type")
+    def blank_workout_type_is_none(cls, v: Optional[str]) -> Optional[str]:
+        # "" and null would otherwise be two kinds of untyped workouts
+        return v if v and v.strip() else None
+
 #Workout response (GET request)
 class UserWorkoutOut(UserWorkoutIn):
     id: int
     #user_id: int  # Ensure workouts belong to a specific user
 
 
+# Bulk import (POST /workouts/bulk)
+class BulkRowError(BaseModel):
+    row: int  # 1-based position of the workout in the uploaded body
+    error: str
+
+class BulkWorkoutResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[BulkRowError] = []
@@ -1,22 +1,41 @@
+import asyncio
 import logging
-from typing import Dict, Any
+from contextlib import aclosing
+from datetime import date, timedelta
+from typing import AsyncIterator, Dict, Any, Optional
 import json
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Annotated
 
-from app.AI.ai_agent import create_custom_agent, extract_fitness_goal
-from app.db.summary_updater import update_workout_summary
-from app.models.goals import UserGoalIn,UserGoalOut
+from app.AI.ai_agent import (
+    JsonObjectScanner, create_custom_agent, extract_fitness_goal, find_goal_data, stream_custom_agent
+)
+from app.AI.goal_plan_cache import goal_plan_cache
+from app.conditional import is_not_modified, make_etag, not_modified, set_etag
+from app.db.data_version import bump_data_version, data_version_validators
+from app.db.goal_progress import (
+    find_goal_progress, find_goal_progress_updated_at, find_weekly_plans, goal_end, started_weeks,
+    week_target_calories, weekly_plan_rows,
+)
+from app.db.summary_scheduler import summary_scheduler
+from app.db.summary_updater import apply_goal_delta
+from app.db.upsert import upsert
+from app.models.goals import GoalProgressOut, GoalWeekProgress, UserGoalIn, UserGoalOut, UserGoalPlan
 from app.models.users import User
+from app.serialization import RowEncoder
 from app.authentications.security import get_current_user,oauth2_scheme
 
-from app.db.database import database, goal_table
+from app.db.database import database, goal_table, weekly_plan_table
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# rows of goal_table as UserGoalOut, see app.serialization
+goal_encoder = RowEncoder(UserGoalOut)
+
 instruction_prompt="You are a fitness goal planner assistant. Based on the user's goal description below, return a JSON object with a detailed breakdown of their workout target. Use this format: goal_name: string, workout_type: string, calories_to_burn: integer, duration_days: integer, daily_target_calories: integer, daily_time_minutes: integer. Use these rules: 1 kg of fat = 7700 kcal. Estimate calorie burn rate based on the activity (e.g., Running ≈ 10 kcal/min, Walking ≈ 4 kcal/min, Cycling ≈ 8 kcal/min). Assume 5 workout days per week unless specified otherwise. Only return the JSON object, no explanation"
 
 
@@ -25,65 +44,202 @@ async def find_goal_by_id(goal_id):
     query = goal_table.select().where(goal_table.c.id == goal_id)
     goal = await database.fetch_one(query)
     return goal
-async def find_goal_by_name(goal_name):
-    query = goal_table.select().where(goal_table.c.goal_name == goal_name)
+async def find_goal_by_name(goal_name, user_id):
+    query = goal_table.select().where(goal_table.c.user_id == user_id, goal_table.c.goal_name == goal_name)
     goal = await database.fetch_one(query)
     return goal
 
+async def plan_goal(goal: str) -> dict:
+    """Ask the AI for the plan of a goal"""
+    # Get raw response from AI agent
+    raw_response = await create_custom_agent(instruction_prompt, goal_description=goal)
+
+    # Log the raw response for debugging
+    logger.info(f"Raw AI response: {raw_response}")
+
+    # Extract structured data, validated before it is cached for other users
+    goal_data = extract_fitness_goal(raw_response)
+    return UserGoalPlan.model_validate(goal_data).model_dump()
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def save_goal(goal_data: dict, current_user: User) -> dict:
+    """Store a goal plan as a new goal of the user and update their summary"""
+    # Create a UserGoalIn instance with the extracted data
+    goal_obj = UserGoalIn(
+        goal_name=goal_data["goal_name"],
+        workout_type=goal_data["workout_type"],
+        calories_to_burn=goal_data["calories_to_burn"],
+        daily_target_calories=goal_data["daily_target_calories"],
+        daily_time_minutes=goal_data["daily_time_minutes"],
+        duration_days=goal_data["duration_days"],
+        user_id=current_user.id,
+        start_date=date.today(),
+    )
+
+    # Check if the goal already exists
+    existing_goal = await find_goal_by_name(goal_obj.goal_name, current_user.id)
+    if existing_goal:
+        raise HTTPException(status_code=400, detail="Your goal already exists")
+
+    # Convert Pydantic model to dictionary before inserting
+    goal_dict = goal_obj.model_dump()
+
+    # Insert into database, a concurrent request may have added the same goal since the check
+    query = upsert(goal_table, goal_dict, ["user_id", "goal_name"]).returning(goal_table.c.id)
+    async with database.transaction():
+        last_record_id = await database.fetch_val(query)
+        if last_record_id is None:
+            raise HTTPException(status_code=400, detail="Your goal already exists")
+        await database.execute(weekly_plan_table.insert().values(weekly_plan_rows(last_record_id, goal_dict)))
+        await bump_data_version(current_user.id)
+        await apply_goal_delta(
+            current_user.id, goals=1, duration=goal_obj.daily_time_minutes, calories=goal_obj.calories_to_burn
+        )
+    summary_scheduler.schedule(current_user.id)
+    # Return the created goal with its ID
+    return {**goal_dict, "id": last_record_id}
+
 #create a goal
 @router.post("/goal", response_model=UserGoalOut, status_code=201, description="add a new goal")
 async def add_goal(goal: str, current_user: Annotated[User, Depends(get_current_user)]):
     logger.info("Adding a new goal: %s", goal)
     try:
-        # Get raw response from AI agent (no await since it's not async)
-#TODO
-       # raw_response = create_custom_agent(instruction_prompt, goal_description=goal)
-        raw_response = """json{
-  "goal_name": "lose 5 kg",
-  "workout_type": "mixed",
-  "calories_to_burn": 38500,
-  "duration_days": 50,
-  "daily_target_calories": 770,
-  "daily_time_minutes": 77
-}
-"""
-
-        # Log the raw response for debugging
-        logger.info(f"Raw AI response: {raw_response}")
-
-        # Extract structured data
-        goal_data = extract_fitness_goal(raw_response)
-
-        # Create a UserGoalIn instance with the extracted data
-        goal_obj = UserGoalIn(
-            goal_name=goal_data["goal_name"],
-            workout_type=goal_data["workout_type"],
-            calories_to_burn=goal_data["calories_to_burn"],
-            daily_target_calories=goal_data["daily_target_calories"],
-            daily_time_minutes=goal_data["daily_time_minutes"],
-            duration_days=goal_data["duration_days"],
-            user_id=current_user.id
-        )
-
-        # Check if the goal already exists
-        existing_goal = await find_goal_by_name(goal_obj.goal_name)
-        if existing_goal:
-            raise HTTPException(status_code=400, detail="Your goal already exists")
-
-        # Convert Pydantic model to dictionary before inserting
-        goal_dict = goal_obj.model_dump()
-
-        # Insert into database
-        query = goal_table.insert().values(goal_dict)
-        last_record_id = await database.execute(query)
+        # Same goals share a plan, the AI is only asked on a cache miss
+        goal_data = await goal_plan_cache.get_or_create(goal, instruction_prompt, lambda: plan_goal(goal))
+        return await save_goal(goal_data, current_user)
+
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out waiting for the plan of goal: {goal}")
+        raise HTTPException(status_code=504, detail="AI service timed out")
+    except ValueError as e:
+        logger.error(f"Error processing goal: {str(e)}")
+        raise HTTPException(status_code=422, detail=f"Invalid response from AI: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-        await update_workout_summary(current_user.id)
-        # Return the created goal with its ID
-        return {**goal_dict, "id": last_record_id}
 
+async def stream_goal_events(goal: str, current_user: User) -> AsyncIterator[str]:
+    """Events of POST /goal/stream: token* plan goal, or error at any point"""
+    try:
+        goal_data = await goal_plan_cache.find(goal, instruction_prompt)
+        if goal_data is None:
+            # forward the answer while it is written, until the plan object is complete
+            scanner = JsonObjectScanner()
+            # closed on break, which frees the upstream stream and the AI client slot right away
+            async with aclosing(stream_custom_agent(instruction_prompt, goal_description=goal)) as texts:
+                async for text in texts:
+                    yield sse_event("token", {"text": text})
+                    goal_data = next(filter(None, map(find_goal_data, scanner.feed(text))), None)
+                    if goal_data is not None:
+                        break
+                else:
+                    goal_data = next(filter(None, map(find_goal_data, scanner.close())), None)
+            if goal_data is None:
+                raise ValueError("Response is not valid JSON")
+            goal_data = UserGoalPlan.model_validate(goal_data).model_dump()
+            await goal_plan_cache.store(goal, instruction_prompt, goal_data)
+        yield sse_event("plan", goal_data)
+
+        saved_goal = await save_goal(goal_data, current_user)
+        yield sse_event("goal", UserGoalOut.model_validate(saved_goal).model_dump())
+
+    # the response has started already, errors are reported as an event
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
     except ValueError as e:
         logger.error(f"Error processing goal: {str(e)}")
-        raise HTTPException(status_code=422, detail=f"Invalid response from AI: {str(e)}")
+        yield sse_event("error", {"status_code": 422, "detail": f"Invalid response from AI: {str(e)}"})
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        yield sse_event("error", {"status_code": 500, "detail": f"Internal server error: {str(e)}"})
+
+
+@router.post("/goal/stream", description="add a new goal, streaming the AI answer as Server-Sent Events")
+async def add_goal_stream(goal: str, current_user: Annotated[User, Depends(get_current_user)]):
+    logger.info("Adding a new goal with a streamed plan: %s", goal)
+    return StreamingResponse(
+        stream_goal_events(goal, current_user),
+        media_type="text/event-stream",
+        # proxies must pass the events on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Get the goals of the current user, a page at a time
+@router.get("/goal", response_model=list[UserGoalOut], description="Get the goals of the current user")
+async def get_goals(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: Annotated[int, Query(gt=0, le=500)] = 50,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
+):
+    logger.info(f"Getting goals for user: {current_user.id}")
+    etag, last_modified = await data_version_validators(current_user.id, "goals")
+    if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_etag(response, etag, last_modified)
+    query = (
+        goal_table.select()
+        .where(goal_table.c.user_id == current_user.id)
+        .order_by(goal_table.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return goal_encoder.response(await database.fetch_all(query), response)
+
+
+# Get the progress of a goal, week by week
+@router.get("/goal/{goal_id}/progress", response_model=GoalProgressOut, description="Get the weekly progress of a goal")
+async def get_goal_progress(
+    goal_id: int,
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    logger.info(f"Getting progress of goal with ID: {goal_id}")
+    today = date.today()
+    # progress is computed with the summary refresh after each write
+    await summary_scheduler.wait_until_fresh(current_user.id)
+    # tagged by the refresh that stored the weeks, a write only changes them once its refresh ran (in any
+    # worker, or never if it failed), and by the day, which starts new weeks. No Last-Modified for that reason
+    updated_at = await find_goal_progress_updated_at(goal_id, current_user.id)
+    etag = make_etag("goal-progress", goal_id, f"{updated_at:%Y%m%d%H%M%S%f}" if updated_at else 0, today.isoformat())
+    if updated_at is not None and is_not_modified(if_none_match, None, etag):
+        return not_modified(etag)
+    goal = await find_goal_by_id(goal_id)
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    if goal["user_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this goal")
+
+    stored = {row["week"]: dict(row._mapping) for row in await find_goal_progress(goal_id)}
+    plans = {row["week"]: row["workout_goal"] for row in await find_weekly_plans(goal_id)}
+
+    # weeks started since the last refresh have nothing done yet
+    weeks = [
+        GoalWeekProgress.model_validate({
+            "target_calories": week_target_calories(goal, week),
+            **(stored[week] if week in stored else {}),
+            "week": week,
+            "week_start": goal["start_date"] + timedelta(weeks=week - 1),
+            "workout_goal": plans.get(week),
+        })
+        for week in range(1, started_weeks(goal, today) + 1)
+    ]
+    set_etag(response, etag)
+    return GoalProgressOut(
+        goal_id=goal_id,
+        start_date=goal["start_date"],
+        end_date=goal_end(goal) if goal["start_date"] and goal["duration_days"] else None,
+        calories_to_burn=goal["calories_to_burn"],
+        calories_burned=sum(week.calories_burned for week in weeks),
+        weeks=weeks,
+    )
@@ -1,76 +1,75 @@
 import logging
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
-from fastapi.encoders import jsonable_encoder
+from datetime import date
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from typing import Annotated, Literal, Optional
 
-from app.models.progress import OverallSummary
+from app.app_configs.environment_config import config
+from app.cache import TTLCache
+from app.conditional import etag_matches, is_not_modified, make_etag, not_modified, set_etag
+from app.db.data_version import data_version_validators
+from app.db.summary_scheduler import summary_scheduler
+from app.db.summary_updater import find_summary_by_user_id, find_summary_version, update_workout_summary
+from app.db.timeseries import find_workout_timeseries
+from app.models.progress import OverallSummary, WorkoutTimeseries
 from app.models.users import User
+from app.serialization import RowEncoder, json_response
 from app.authentications.security import get_current_user
-from app.db.database import database, workout_table, goal_table, progress_summary_table
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-def convert_datetime_fields(data: dict) -> dict:
-    """Convert datetime objects to ISO format strings"""
-    for key, value in data.items():
-        if isinstance(value, datetime):
-            data[key] = value.isoformat()
-        elif isinstance(value, list):
-            data[key] = [convert_datetime_fields(item) if isinstance(item, dict) else item for item in value]
-        elif isinstance(value, dict):
-            data[key] = convert_datetime_fields(value)
-    return data
+# summaries last served, keyed by user id, only reused while their version is current
+summary_cache = TTLCache(config.SUMMARY_CACHE_MAX_SIZE, config.SUMMARY_CACHE_TTL_SECONDS)
+summary_encoder = RowEncoder(OverallSummary)
 
-@router.get("/workout-summary",response_model=OverallSummary, description="Get combined workout and goal data for the current user")
-async def get_workout_progress_summary(current_user: Annotated[User, Depends(get_current_user)]):
-    logger.info(f"Generating workout and goal summary for user: {current_user.id}")
-
-    try:
-        # Fetch workouts for the user
-        workout_query = workout_table.select().where(workout_table.c.user_id == current_user.id)
-        workouts = await database.fetch_all(workout_query)
-
-        # Fetch goals for the same user
-        goal_query = goal_table.select().where(goal_table.c.user_id == current_user.id)
-        goals = await database.fetch_all(goal_query)
-
-        # Calculate summary statistics
-        total_duration_user_workout = sum(w["workout_duration"] for w in workouts)
-        total_calories_user_workout = sum(w["calories_burned"] for w in workouts)
-        total_workouts = len(workouts)
-
-        # Process goals data
-        active_goals = [dict(goal) for goal in goals]
-        total_calories_user_goal = sum(g["calories_to_burn"] for g in goals)
-        total_duration_user_goal = sum(g["daily_time_minutes"] for g in goals)
 
-        remaining_duration_to_goal = max(total_duration_user_goal - total_duration_user_workout, 0)
-        remaining_calories_to_goal = max(total_calories_user_goal - total_calories_user_workout, 0)
-
-        # Prepare workouts list with serialized datetime fields
-        workouts_list = [convert_datetime_fields(dict(w)) for w in workouts]
-
-        # Construct the summary object
-        summary = {
-            "user_id": current_user.id,
-            "total_workouts": total_workouts,
-            "total_duration": total_duration_user_workout,
-            "total_calories_burned": total_calories_user_workout,
-            "remaining_duration_to_goal": remaining_duration_to_goal,
-            "remaining_calories_to_goal": remaining_calories_to_goal,
-            "active_goals": active_goals,
-            "workouts": workouts_list
-        }
-
-        # Save to the database
-        query = progress_summary_table.insert().values(summary)
-        logger.info(f"Saving workout summary to database for user: {current_user.id}")
-        await database.execute(query)
+@router.get("/workout-summary",response_model=OverallSummary, description="Get combined workout and goal data for the current user. "
+            "Send the ETag back in If-None-Match to get a 304 while it did not change")
+async def get_workout_progress_summary(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    logger.info(f"Generating workout and goal summary for user: {current_user.id}")
+    # the totals are current, the recent ids may still wait for their refresh
+    await summary_scheduler.wait_until_fresh(current_user.id)
+    version = await find_summary_version(current_user.id)
+    if version is not None and etag_matches(if_none_match, etag := make_etag("summary", current_user.id, version)):
+        return not_modified(etag)
 
-        return jsonable_encoder(summary)
+    summary = summary_cache.get(current_user.id)
+    if summary is None or version is None or summary["version"] != version:
+        summary = await find_summary_by_user_id(current_user.id)
+        if summary is None:
+            summary = await update_workout_summary(current_user.id)
+        summary = dict(summary._mapping)
+        summary_cache.set(current_user.id, summary)
+    set_etag(response, make_etag("summary", current_user.id, summary["version"]))
+    return summary_encoder.response(summary, response)
 
-    except Exception as e:
-        logger.error(f"Error in get_workout_progress_summary: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+@router.get(
+    "/workout-summary/timeseries",
+    response_model=WorkoutTimeseries,
+    description="Get workout totals per day, week or month and workout type for the current user",
+)
+async def get_workout_timeseries(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    bucket: Literal["day", "week", "month"] = "week",
+    date_from: Annotated[Optional[date], Query(alias="from", description="first workout date included")] = None,
+    date_to: Annotated[Optional[date], Query(alias="to", description="last workout date included")] = None,
+    workout_type: Annotated[Optional[str], Query(alias="type")] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
+):
+    logger.info(f"Getting the {bucket} workout timeseries for user: {current_user.id}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    etag, last_modified = await data_version_validators(current_user.id, "timeseries")
+    if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_etag(response, etag, last_modified)
+    # grouped by the database, only one row per period and workout type comes back
+    rows = await find_workout_timeseries(current_user.id, bucket, date_from, date_to, workout_type)
+    columns = WorkoutTimeseries.model_fields.keys() - {"bucket"}
+    return json_response({"bucket": bucket, **{column: [row[column] for row in rows] for column in columns}}, response)
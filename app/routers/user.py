@@ -2,7 +2,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException,status
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
-from app.authentications.security import get_user_by_email, hash_password, verify_password, create_access_token,authenticate_user
+from app.authentications.security import get_user_by_email, hash_password_async, create_access_token,authenticate_user
 from app.db.database import user_table, database
 from app.models.users import UserIn
 
@@ -14,7 +14,7 @@ router = APIRouter()
 async def register_user(user: UserIn):
     if await get_user_by_email(user.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Email already registered")
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     query = user_table.insert().values(email=user.email,password=hashed_password)
     logger.debug("Inserting user into database: %s", user.email)
 
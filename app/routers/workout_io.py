@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from typing import Annotated, AsyncIterator, Literal, Optional
+
+import sqlalchemy
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.authentications.security import get_current_user
+from app.conditional import is_not_modified, not_modified, set_etag
+from app.db.data_version import bump_data_version, data_version_validators
+from app.db.database import database, workout_table
+from app.db.rollup import apply_rollup_changes
+from app.db.summary_scheduler import summary_scheduler
+from app.db.summary_updater import apply_workout_delta
+from app.db.upsert import upsert
+from app.models.users import User
+from app.models.workouts import BulkRowError, BulkWorkoutResult, UserWorkoutIn
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# rows validated and inserted per multi-row INSERT, 7 bound columns each
+BULK_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+# columns written by GET /workouts/export, in order
+EXPORT_COLUMNS = [
+    workout_table.c.id,
+    workout_table.c.workout_name,
+    workout_table.c.workout_type,
+    workout_table.c.workout_date,
+    workout_table.c.workout_duration,
+    workout_table.c.calories_burned,
+    workout_table.c.notes,
+    workout_table.c.created_at,
+]
+# bytes collected before a chunk is handed to the response
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Lines of the request body without their line breaks, read as it arrives"""
+    # pieces of a line spread over several chunks, each chunk is only searched once
+    partial = []
+    async for chunk in request.stream():
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            partial.append(chunk[start:end])
+            yield b"".join(partial).rstrip(b"\r")
+            partial = []
+            start = end + 1
+        if start < len(chunk):
+            partial.append(chunk[start:])
+    if partial:
+        yield b"".join(partial).rstrip(b"\r")
+
+
+async def iter_csv_records(request: Request) -> AsyncIterator[str]:
+    """Records of a CSV body, a quoted field may hold line breaks"""
+    lines, quotes = [], 0
+    async for line in iter_lines(request):
+        try:
+            text = line.decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid CSV: the body is not UTF-8")
+        lines.append(text)
+        # doubled quotes inside a field keep the count even, an odd count leaves a field open
+        quotes += text.count('"')
+        if quotes % 2 == 0:
+            yield "\n".join(lines)
+            lines, quotes = [], 0
+    if lines:
+        yield "\n".join(lines)
+
+
+async def iter_rows(request: Request) -> AsyncIterator[tuple[int, dict | str]]:
+    """(row number, workout fields) pairs of a JSON array, NDJSON or CSV body.
+
+    A row that cannot be parsed comes back as its error message instead of a dict.
+    CSV bodies start with a header record naming the workout fields.
+    """
+    media_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if media_type == "application/json":
+        try:
+            rows = json.loads(await request.body())
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of workouts")
+        for row_number, row in enumerate(rows, start=1):
+            yield row_number, row if isinstance(row, dict) else "Expected a JSON object"
+    elif media_type in NDJSON_MEDIA_TYPES:
+        row_number = 0
+        async for line in iter_lines(request):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line.decode("utf-8"))
+                yield row_number, row if isinstance(row, dict) else "Expected a JSON object"
+            except UnicodeDecodeError:
+                yield row_number, "Invalid JSON: the line is not UTF-8"
+            except json.JSONDecodeError as e:
+                yield row_number, f"Invalid JSON: {e}"
+    elif media_type == "text/csv":
+        header = None
+        row_number = 0
+        async for record in iter_csv_records(request):
+            if not record.strip():
+                continue
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # empty cells fall back to the field defaults
+            yield row_number, {name: value for name, value in zip(header, values) if value != ""}
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {media_type}")
+
+
+def describe_validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+
+
+def validate_batch(batch: list[tuple[int, dict | str]], user_id: int, seen_names: set[str], result: BulkWorkoutResult) -> list[tuple[int, UserWorkoutIn]]:
+    """(row number, workout) pairs of the valid rows of a batch, the others are reported in `result`"""
+    candidates = []
+    for row_number, row in batch:
+        if isinstance(row, str):
+            result.errors.append(BulkRowError(row=row_number, error=row))
+            continue
+        try:
+            workout = UserWorkoutIn.model_validate({**row, "user_id": user_id})
+        except ValidationError as e:
+            result.errors.append(BulkRowError(row=row_number, error=describe_validation_error(e)))
+            continue
+        if workout.workout_name in seen_names:
+            result.errors.append(BulkRowError(row=row_number, error="Workout already exists"))
+            continue
+        seen_names.add(workout.workout_name)
+        candidates.append((row_number, workout))
+    return candidates
+
+
+async def insert_batch(candidates: list[tuple[int, UserWorkoutIn]], result: BulkWorkoutResult) -> list[UserWorkoutIn]:
+    """Insert validated workouts with one statement, names the user already has are reported in `result`"""
+    # a name taken before or while the import runs is skipped by the unique index instead of failing the statement
+    query = upsert(
+        workout_table, [workout.model_dump() for _, workout in candidates], ["user_id", "workout_name"]
+    ).returning(workout_table.c.workout_name)
+    inserted_names = {row[0] for row in await database.fetch_all(query)}
+    workouts = []
+    for row_number, workout in candidates:
+        if workout.workout_name in inserted_names:
+            workouts.append(workout)
+        else:
+            result.errors.append(BulkRowError(row=row_number, error="Workout already exists"))
+    return workouts
+
+
+@router.post("/workouts/bulk", response_model=BulkWorkoutResult, description="Import many workouts at once from a JSON array, "
+             "NDJSON (application/x-ndjson) or CSV (text/csv, header line first) body. Valid rows are inserted, the others are reported")
+async def bulk_add_workouts(request: Request, current_user: Annotated[User, Depends(get_current_user)]):
+    logger.info(f"Bulk importing workouts for user: {current_user.id}")
+    result = BulkWorkoutResult(inserted=0, failed=0)
+    seen_names = set()
+    days = set()
+
+    async def flush(batch):
+        candidates = validate_batch(batch, current_user.id, seen_names, result)
+        if not candidates:
+            return
+        # a short transaction per batch, the body is never read while one is open
+        async with database.transaction():
+            inserted = await insert_batch(candidates, result)
+            if not inserted:
+                return
+            added = await apply_rollup_changes(current_user.id, added=[workout.model_dump() for workout in inserted])
+            await apply_workout_delta(
+                current_user.id,
+                workouts=len(inserted),
+                duration=sum(workout.workout_duration for workout in inserted),
+                calories=sum(workout.calories_burned for workout in inserted),
+            )
+            await bump_data_version(current_user.id)
+        result.inserted += len(inserted)
+        days.update(added)
+
+    try:
+        batch = []
+        async for row in iter_rows(request):
+            batch.append(row)
+            if len(batch) >= BULK_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+    finally:
+        # the batches committed so far stay, also when the body breaks off
+        if result.inserted:
+            summary_scheduler.schedule(current_user.id, days=days)
+    result.failed = len(result.errors)
+    result.errors.sort(key=lambda error: error.row)
+    logger.info(f"Bulk import for user {current_user.id}: {result.inserted} inserted, {result.failed} failed")
+    return result
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+async def iter_export_lines(user_id: int, export_format: str) -> AsyncIterator[str]:
+    """Rows of a user's workouts as NDJSON or CSV lines, streamed from a database cursor"""
+    names = [column.name for column in EXPORT_COLUMNS]
+    query = (
+        sqlalchemy.select(*EXPORT_COLUMNS)
+        .where(workout_table.c.user_id == user_id)
+        .order_by(workout_table.c.workout_date, workout_table.c.id)
+    )
+    if export_format == "csv":
+        line = io.StringIO()
+        writer = csv.writer(line)
+        writer.writerow(names)
+        yield line.getvalue()
+        async for row in database.iterate(query):
+            line.seek(0)
+            line.truncate()
+            writer.writerow([export_value(row[name]) for name in names])
+            yield line.getvalue()
+    else:
+        async for row in database.iterate(query):
+            yield json.dumps({name: export_value(row[name]) for name in names}) + "\n"
+
+
+async def iter_export_chunks(lines: AsyncIterator[str], compress: bool) -> AsyncIterator[bytes]:
+    """Group lines into chunks of about EXPORT_CHUNK_SIZE bytes, gzipped on the fly when asked"""
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    parts, size = [], 0
+    async for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            chunk = b"".join(parts)
+            parts, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(parts)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+@router.get("/workouts/export", description="Stream the full workout history of the current user as NDJSON or CSV, "
+            "oldest first. With gzip=true the body is gzip-compressed (Content-Encoding: gzip)")
+async def export_workouts(
+    current_user: Annotated[User, Depends(get_current_user)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
+):
+    logger.info(f"Exporting workouts of user {current_user.id} as {format}")
+    etag, last_modified = await data_version_validators(current_user.id, "export", format, int(gzip))
+    if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return not_modified(etag, last_modified)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="workouts.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    chunks = iter_export_chunks(iter_export_lines(current_user.id, format), compress=gzip)
+    response = StreamingResponse(chunks, media_type=media_type, headers=headers)
+    set_etag(response, etag, last_modified)
+    return response
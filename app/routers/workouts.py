@@ -1,14 +1,22 @@
 import logging
-
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
-
-from app.db.summary_updater import update_workout_summary
+from datetime import date, datetime, time, timedelta
+
+import sqlalchemy
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from typing import Annotated, Optional
+
+from app.conditional import is_not_modified, not_modified, set_etag
+from app.db.data_version import bump_data_version, data_version_validators
+from app.db.rollup import apply_rollup_changes
+from app.serialization import RowEncoder
+from app.db.summary_scheduler import summary_scheduler
+from app.db.summary_updater import apply_workout_delta
 from app.models.workouts import UserWorkoutIn, UserWorkoutOut
 from app.models.users import User
 from app.authentications.security import get_current_user,oauth2_scheme
 
 from app.db.database import database, workout_table
+from app.db.pagination import decode_cursor, encode_cursor
 #from app.db.queries import update_progress_summary
 
 
@@ -19,14 +27,24 @@ router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+# rows of workout_table as UserWorkoutOut, see app.serialization
+workout_encoder = RowEncoder(UserWorkoutOut)
 
 
 async def find_workout_by_id(workout_id):
     query = workout_table.select().where(workout_table.c.id == workout_id)
     workout = await database.fetch_one(query)
     return workout
-async def find_workout_by_name(workout_name):
-    query = workout_table.select().where(workout_table.c.workout_name == workout_name)
+async def find_workout_for_write(workout_id, user_id):
+    """The workout of a user, locked against other writes until the transaction ends on PostgreSQL"""
+    query = workout_table.select().where(
+        workout_table.c.id == workout_id, workout_table.c.user_id == user_id
+    ).with_for_update()
+    return await database.fetch_one(query)
+async def find_workout_by_name(workout_name, user_id):
+    query = workout_table.select().where(
+        workout_table.c.user_id == user_id, workout_table.c.workout_name == workout_name
+    )
     workout = await database.fetch_one(query)
     return workout
 
@@ -36,35 +54,84 @@ async def add_workout(workout: UserWorkoutIn,current_user:Annotated[User, Depend
     logger.info("Adding a new workout: %s", workout.workout_name)
     # user need to be registered in order to add a workout
     # Check if the workout already exists
-    existing_workout = await find_workout_by_name(workout.workout_name)
+    existing_workout = await find_workout_by_name(workout.workout_name, current_user.id)
     if existing_workout:
         raise HTTPException(status_code=400, detail="Workout already exists")
     data = {**workout.model_dump(),"user_id":current_user.id}  # Convert the Pydantic model to a dictionary
     query = workout_table.insert().values(data)
     logger.debug(query)
-    last_record_id = await database.execute(query)
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        days = await apply_rollup_changes(current_user.id, added=[data])
+        await bump_data_version(current_user.id)
+        # update the workout summary
+        await apply_workout_delta(
+            current_user.id, workouts=1, duration=workout.workout_duration, calories=workout.calories_burned
+        )
+    summary_scheduler.schedule(current_user.id, days=days)
     generated_workout = {**data, "id": last_record_id}
-    # update the workout summary
-    await update_workout_summary(current_user.id)
 
     return generated_workout
 
 
 
 
-# Get all workouts
-@router.get("/workout", response_model=list[UserWorkoutOut], description="Get all workouts for current user")
-async def get_all_workouts(current_user: Annotated[User, Depends(get_current_user)]):
+# Get the workouts of the current user, newest first, a page at a time
+@router.get("/workout", response_model=list[UserWorkoutOut], description="Get the workouts of the current user, newest first. "
+            "When more workouts exist, the X-Next-Cursor response header holds the cursor of the next page")
+async def get_all_workouts(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: Annotated[int, Query(gt=0, le=500)] = 50,
+    cursor: Annotated[Optional[str], Query(description="X-Next-Cursor of the previous page")] = None,
+    date_from: Annotated[Optional[date], Query(description="first workout date included")] = None,
+    date_to: Annotated[Optional[date], Query(description="last workout date included")] = None,
+    workout_type: Optional[str] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
+):
     logger.info(f"Getting all workouts for user: {current_user.id}")
-    query = workout_table.select().where(workout_table.c.user_id == current_user.id)
+    etag, last_modified = await data_version_validators(current_user.id, "workouts")
+    if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_etag(response, etag, last_modified)
+    c = workout_table.c
+    query = workout_table.select().where(c.user_id == current_user.id)
+    if date_from:
+        query = query.where(c.workout_date >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.where(c.workout_date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if workout_type:
+        query = query.where(c.workout_type == workout_type)
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(sqlalchemy.tuple_(c.workout_date, c.id) < after)
+    # one extra row tells whether there is a next page
+    query = query.order_by(c.workout_date.desc(), c.id.desc()).limit(limit + 1)
     logger.debug(query)
     workouts = await database.fetch_all(query)
-    return workouts
+    if len(workouts) > limit:
+        workouts = workouts[:limit]
+        last = workouts[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last["workout_date"], last["id"])
+    return workout_encoder.response(workouts, response)
 
 # Get a specific workout by ID
 @router.get("/workout/{workout_id}", response_model=UserWorkoutOut, description="Get a specific workout")
-async def get_workout_by_id(workout_id: int, current_user: Annotated[User, Depends(get_current_user)]):
+async def get_workout_by_id(
+    workout_id: int,
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
+):
     logger.info(f"Getting workout with ID: {workout_id}")
+    etag, last_modified = await data_version_validators(current_user.id, "workout", workout_id)
+    if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return not_modified(etag, last_modified)
 
     # Check if workout exists
     existing_workout = await find_workout_by_id(workout_id)
@@ -75,7 +142,8 @@ async def get_workout_by_id(workout_id: int, current_user: Annotated[User, Depen
     if existing_workout["user_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this workout")
 
-    return existing_workout
+    set_etag(response, etag, last_modified)
+    return workout_encoder.response(existing_workout, response)
 
 # Update a workout
 @router.put("/workout/{workout_id}", response_model=UserWorkoutOut, description="Update a workout")
@@ -90,15 +158,33 @@ async def update_workout(workout_id: int, workout_update: UserWorkoutIn, current
     if existing_workout["user_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this workout")
 
+    # Names are unique per user
+    same_name = await find_workout_by_name(workout_update.workout_name, current_user.id)
+    if same_name and same_name["id"] != workout_id:
+        raise HTTPException(status_code=400, detail="Workout already exists")
+
     # Update the workout
     data = {**workout_update.model_dump(), "user_id": current_user.id}
     query = workout_table.update().where(
         workout_table.c.id == workout_id
     ).values(**data)
 
-    await database.execute(query)
-    # update the workout summary
-    await update_workout_summary(current_user.id)
+    async with database.transaction():
+        # a write first, SQLite takes its write lock here instead of failing to upgrade a read lock below
+        await bump_data_version(current_user.id)
+        # the deltas come from the row as it is now, PostgreSQL holds it until the commit
+        existing_workout = await find_workout_for_write(workout_id, current_user.id)
+        if not existing_workout:
+            raise HTTPException(status_code=404, detail="Workout not found")
+        await database.execute(query)
+        days = await apply_rollup_changes(current_user.id, added=[data], removed=[existing_workout])
+        # update the workout summary
+        await apply_workout_delta(
+            current_user.id,
+            duration=workout_update.workout_duration - existing_workout["workout_duration"],
+            calories=workout_update.calories_burned - existing_workout["calories_burned"],
+        )
+    summary_scheduler.schedule(current_user.id, days=days)
 
     # Return the updated workout
     return {**data, "id": workout_id}
@@ -118,11 +204,25 @@ async def delete_workout(workout_id: int, current_user: Annotated[User, Depends(
     if existing_workout["user_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this workout")
 
-    # Delete the workout
-    query = workout_table.delete().where(workout_table.c.id == workout_id)
-    await database.execute(query)
-    # update the workout summary
-    await update_workout_summary(current_user.id)
+    # Delete the workout, the deltas come from the row it removed
+    query = workout_table.delete().where(
+        workout_table.c.id == workout_id, workout_table.c.user_id == current_user.id
+    ).returning(*workout_table.c)
+    async with database.transaction():
+        existing_workout = await database.fetch_one(query)
+        # a concurrent delete got there first, its deltas are applied already
+        if not existing_workout:
+            raise HTTPException(status_code=404, detail="Workout not found")
+        days = await apply_rollup_changes(current_user.id, removed=[existing_workout])
+        await bump_data_version(current_user.id)
+        # update the workout summary
+        await apply_workout_delta(
+            current_user.id,
+            workouts=-1,
+            duration=-existing_workout["workout_duration"],
+            calories=-existing_workout["calories_burned"],
+        )
+    summary_scheduler.schedule(current_user.id, days=days)
 
     return None
 
@@ -0,0 +1,102 @@
+"""
+Fast JSON responses for rows read from our own tables.
+
+Routes returning plain rows let FastAPI validate every row against their
+response_model, turn it into JSON-compatible Python and encode that with the
+standard json module. The rows come straight from our tables, which only ever
+hold validated data, so RowEncoder copies the fields of the response model
+and hands them to orjson instead. Routes return RowEncoder.response(...),
+which takes the fast path with FAST_JSON_RESPONSES=true and the validating
+path the tests compare against otherwise, the default.
+"""
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Any, Iterable, Mapping, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.app_configs.environment_config import config
+
+# field types the database drivers return as they are
+SCALARS = (int, float, str, bool, date, datetime)
+
+
+def response_headers(response: Response | None) -> dict[str, str]:
+    """Headers a route set on its injected Response, they are lost when it returns its own"""
+    if response is None:
+        return {}
+    return {key: value for key, value in response.headers.items() if key != "content-length"}
+
+
+def json_response(content: Any, response: Response | None = None, status_code: int = 200) -> Response:
+    """Content made of dicts, lists, scalars and dates, encoded with orjson"""
+    if not config.FAST_JSON_RESPONSES:
+        return JSONResponse(jsonable_encoder(content), status_code=status_code, headers=response_headers(response))
+    return ORJSONResponse(content, status_code=status_code, headers=response_headers(response))
+
+
+class RowEncoder:
+    """Encodes rows in the shape of a response model without validating them again.
+
+    Fields typed as date are stored in DateTime columns at midnight, they are
+    cut to their date like the model does.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self.date_fields = tuple(
+            name for name, field in model.model_fields.items()
+            if field.annotation is date or field.annotation == Optional[date]
+        )
+        # only read through the Record, which parses the JSON columns the PostgreSQL driver returns as text
+        self.processed_fields = frozenset(
+            name for name, field in model.model_fields.items()
+            if field.annotation not in {kind for scalar in SCALARS for kind in (scalar, Optional[scalar])}
+        )
+        # the validating path, built once instead of per request
+        self.adapter = TypeAdapter(model)
+        self.list_adapter = TypeAdapter(list[model])
+
+    def field_getter(self, row: Any) -> Optional[itemgetter]:
+        """Reads the fields of a databases Record by position from the driver row behind it.
+
+        Record.__getitem__ resolves every key in Python code, most of the cost
+        of a large list. The rows of one query share their columns, so the
+        positions are looked up once. None when the record lacks a field or a
+        field needs the Record to read it.
+        """
+        if not hasattr(row, "_mapping") or self.processed_fields or len(self.fields) < 2:
+            return None
+        positions = {key: index for index, key in enumerate(row.keys())}
+        if any(name not in positions for name in self.fields):
+            return None
+        return itemgetter(*(positions[name] for name in self.fields))
+
+    def encode(self, row: Mapping, fields: Optional[itemgetter] = None) -> dict:
+        if fields is None:
+            data = {name: row[name] for name in self.fields}
+        else:
+            data = dict(zip(self.fields, fields(tuple(row._mapping))))
+        for name in self.date_fields:
+            if isinstance(data[name], datetime):
+                data[name] = data[name].date()
+        return data
+
+    def response(self, rows: Mapping | Iterable[Mapping], response: Response | None = None) -> Response:
+        """A row or a list of rows as the JSON response of a route"""
+        single = isinstance(rows, Mapping) or hasattr(rows, "_mapping")
+        if not config.FAST_JSON_RESPONSES:
+            adapter = self.adapter if single else self.list_adapter
+            content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+            return JSONResponse(content, headers=response_headers(response))
+        if single:
+            content = self.encode(rows)
+        else:
+            rows = list(rows)
+            fields = self.field_getter(rows[0]) if rows else None
+            content = [self.encode(row, fields) for row in rows]
+        return json_response(content, response)
@@ -0,0 +1,49 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key.
+
+    The first do() for a key starts `fn` in its own task, every do() for the
+    same key made while it runs waits for that task instead of starting
+    another. All of them get its result or its exception. A caller giving up
+    (timeout or cancellation) does not affect the others, the shared call is
+    only cancelled once nobody waits for it any more.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self.started = 0
+        self.shared = 0  # do() calls that joined one already in flight
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: float | None = None) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.create_task(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -1,11 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
+import httpx
 import json
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 from app.main import app
 from app.models.users import User
+from app.AI import ai_agent
 from app.AI.ai_agent import extract_fitness_goal
+from app.AI.ai_client import AIClient
+from app.AI.fake_server import create_fake_ai_app
+from app.AI.goal_plan_cache import GoalPlanCache
+from app.routers import goals
 
 client = TestClient(app)
 
@@ -99,4 +106,27 @@ def test_extract_fitness_goal():
 
     # Missing required field
     with pytest.raises(KeyError):
-        extract_fitness_goal('{"goal_name": "Test Goal"}')
\ No newline at end of file
+        extract_fitness_goal('{"goal_name": "Test Goal"}')
+@pytest.mark.anyio
+async def test_stream_goal_events(monkeypatch):
+    """Test that tokens are streamed before the plan and the stored goal"""
+    async def fake_save_goal(goal_data, current_user):
+        return {**goal_data, "user_id": current_user.id, "id": 7}
+
+    monkeypatch.setenv("RAPIDAPI_URL", "http://fake-ai/chat")
+    monkeypatch.setenv("RAPIDAPI_KEY", "fake")
+    transport = httpx.ASGITransport(app=create_fake_ai_app())
+    monkeypatch.setattr(ai_agent, "ai_client", AIClient(1, 1, 0, 0, 1, transport=transport))
+    monkeypatch.setattr(goals, "goal_plan_cache", GoalPlanCache(memory_size=10, ttl_seconds=0))
+    monkeypatch.setattr(goals, "save_goal", fake_save_goal)
+
+    current_user = SimpleNamespace(id=1)
+    events = [event async for event in goals.stream_goal_events("Swim 2 km", current_user)]
+    names = [event.split("\n")[0].removeprefix("event: ") for event in events]
+    assert names[0] == "token"
+    assert names[-2:] == ["plan", "goal"]
+    goal = json.loads(events[-1].split("data: ")[1])
+    assert goal["goal_name"] == "Swim 2 km"
+    assert goal["id"] == 7
+    # the AI stream was closed when the plan was complete, not later by the garbage collector
+    assert not ai_agent.ai_client._semaphore.locked()
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+
+from app.tests.routers.test_workouts import TEST_WORKOUT, add_workout, format_payload
+
+
+@pytest.fixture
+async def summary_workout(async_client, registered_user: dict, logged_in_token: str):
+    """Fixture providing a pre-added workout of the logged in user."""
+    payload = format_payload({**TEST_WORKOUT, "user_id": registered_user["id"]})
+    return await add_workout(payload, async_client, logged_in_token)
+
+
+@pytest.mark.anyio
+async def test_workout_summary_is_compact(async_client, summary_workout, logged_in_token: str):
+    """Test that the summary carries totals and recent ids instead of full lists"""
+    response = await async_client.get(
+        "/workout-summary",
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["total_workouts"] == 1
+    assert summary["recent_workout_ids"] == [summary_workout["id"]]
+    assert "workouts" not in summary
+    assert "active_goals" not in summary
+
+
+@pytest.mark.anyio
+async def test_workout_timeseries(async_client, registered_user: dict, logged_in_token: str):
+    """Test that workouts are totalled per week and workout type, in columns"""
+    workouts = [
+        ("Running", date(2025, 9, 29), 30, 300),
+        ("Running", date(2025, 10, 5), 20, 200),
+        ("Cycling", date(2025, 10, 1), 40, 350),
+        ("Running", date(2025, 10, 6), 10, 100),
+    ]
+    for workout_type, workout_date, duration, calories in workouts:
+        payload = format_payload({
+            **TEST_WORKOUT, "workout_type": workout_type, "workout_date": workout_date,
+            "workout_duration": duration, "calories_burned": calories, "user_id": registered_user["id"],
+        })
+        await add_workout(payload, async_client, logged_in_token)
+
+    response = await async_client.get(
+        "/workout-summary/timeseries",
+        params={"bucket": "week", "from": "2025-09-01", "to": "2025-10-31"},
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "bucket": "week",
+        "period_start": ["2025-09-29", "2025-09-29", "2025-10-06"],
+        "workout_type": ["Cycling", "Running", "Running"],
+        "workouts": [1, 2, 1],
+        "total_duration": [40, 50, 10],
+        "total_calories_burned": [350, 500, 100],
+    }
+
+    response = await async_client.get(
+        "/workout-summary/timeseries",
+        params={"bucket": "month", "type": "Running", "from": "2025-10-01"},
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.json()["period_start"] == ["2025-10-01"]
+    assert response.json()["total_duration"] == [30]
+
+
+@pytest.mark.anyio
+async def test_workout_summary_not_modified(async_client, registered_user: dict, summary_workout, logged_in_token: str):
+    """Test that the summary ETag answers 304 until a write changes the summary"""
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    response = await async_client.get("/workout-summary", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = await async_client.get("/workout-summary", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    payload = format_payload({**TEST_WORKOUT, "user_id": registered_user["id"]})
+    await add_workout(payload, async_client, logged_in_token)
+    response = await async_client.get("/workout-summary", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["total_workouts"] == 2
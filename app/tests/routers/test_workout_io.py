@@ -0,0 +1,169 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException, Request
+from httpx import AsyncClient
+
+from app.routers.workout_io import iter_rows
+
+
+def bulk_rows(count: int) -> list[dict]:
+    prefix = uuid.uuid4().hex[:6]
+    return [
+        {
+            "workout_name": f"Bulk-{prefix}-{i}",
+            "workout_type": "Running",
+            "workout_date": "2025-10-01",
+            "workout_duration": 30,
+            "calories_burned": 300,
+        }
+        for i in range(count)
+    ]
+
+
+def body_request(chunks: list[bytes], content_type: str) -> Request:
+    """A request whose body arrives in the given chunks"""
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"content-type", content_type.encode())]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+async def parse_rows(chunks: list[bytes], content_type: str) -> list:
+    return [row async for row in iter_rows(body_request(chunks, content_type))]
+
+
+@pytest.mark.anyio
+async def test_csv_quoted_fields_span_lines_and_chunks():
+    body = (
+        b'workout_name,notes\r\n'
+        b'Run,"first line\r\nsecond, with ""quotes"""\r\n'
+        b'Ride,\r\n'
+    )
+    # split mid-line and mid-field
+    rows = await parse_rows([body[:7], body[7:30], body[30:]], "text/csv")
+    assert rows == [
+        (1, {"workout_name": "Run", "notes": 'first line\nsecond, with "quotes"'}),
+        (2, {"workout_name": "Ride"}),
+    ]
+
+
+@pytest.mark.anyio
+async def test_bodies_that_are_not_utf8():
+    rows = await parse_rows([b'{"workout_name": "Run"}\n{"workout_name": "\xff"}\n'], "application/x-ndjson")
+    assert rows == [(1, {"workout_name": "Run"}), (2, "Invalid JSON: the line is not UTF-8")]
+
+    for body, content_type in ((b'[{"workout_name": "\xff"}]', "application/json"),
+                               (b"workout_name\n\xff\n", "text/csv")):
+        with pytest.raises(HTTPException) as exc_info:
+            await parse_rows([body], content_type)
+        assert exc_info.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_bulk_add_workouts_json(async_client: AsyncClient, logged_in_token: str):
+    rows = bulk_rows(3)
+    rows[1]["workout_duration"] = -5
+    response = await async_client.post(
+        "/workouts/bulk",
+        json=rows,
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+
+
+@pytest.mark.anyio
+async def test_bulk_add_workouts_ndjson_updates_summary(async_client: AsyncClient, logged_in_token: str):
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    body = "\n".join(json.dumps(row) for row in bulk_rows(5))
+    response = await async_client.post(
+        "/workouts/bulk",
+        content=body,
+        headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 5
+
+    summary = (await async_client.get("/workout-summary", headers=headers)).json()
+    assert summary["total_workouts"] == 5
+    assert summary["total_duration"] == 150
+
+
+@pytest.mark.anyio
+async def test_bulk_add_workouts_csv_duplicates(async_client: AsyncClient, logged_in_token: str):
+    name = f"Bulk-{uuid.uuid4().hex[:6]}"
+    body = (
+        "workout_name,workout_type,workout_date,workout_duration,calories_burned,notes\n"
+        f"{name},Cycling,2025-10-02,45,400,\"steady, flat\"\n"
+        f"{name},Cycling,2025-10-03,45,400,\n"
+    )
+    response = await async_client.post(
+        "/workouts/bulk",
+        content=body,
+        headers={"Authorization": f"Bearer {logged_in_token}", "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "inserted": 1,
+        "failed": 1,
+        "errors": [{"row": 2, "error": "Workout already exists"}],
+    }
+
+
+@pytest.mark.anyio
+async def test_concurrent_bulk_imports_of_the_same_names(async_client: AsyncClient, logged_in_token: str):
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    rows = bulk_rows(20)
+    responses = await asyncio.gather(*(
+        async_client.post("/workouts/bulk", json=rows, headers=headers) for _ in range(2)
+    ))
+    assert [response.status_code for response in responses] == [200, 200]
+    results = [response.json() for response in responses]
+    # every name is inserted once, the other import reports it as a row error
+    assert sum(result["inserted"] for result in results) == 20
+    assert sum(result["failed"] for result in results) == 20
+    assert all(error["error"] == "Workout already exists" for result in results for error in result["errors"])
+
+    summary = (await async_client.get("/workout-summary", headers=headers)).json()
+    assert summary["total_workouts"] == 20
+
+
+@pytest.mark.anyio
+async def test_bulk_add_workouts_unsupported_type(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.post(
+        "/workouts/bulk",
+        content="workouts",
+        headers={"Authorization": f"Bearer {logged_in_token}", "Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.anyio
+async def test_export_workouts(async_client: AsyncClient, logged_in_token: str):
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    rows = bulk_rows(3)
+    rows[0]["notes"] = "easy, then \"fast\""
+    await async_client.post("/workouts/bulk", json=rows, headers=headers)
+
+    response = await async_client.get("/workouts/export", params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["workout_name"] for row in exported][-3:] == [row["workout_name"] for row in rows]
+
+    response = await async_client.get("/workouts/export", params={"format": "csv", "gzip": True}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx decodes the body already
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,workout_name")
+    assert any('"easy, then ""fast"""' in line for line in lines)
@@ -1,9 +1,11 @@
+import asyncio
 import uuid
 from datetime import datetime, date
 import pytest
 from httpx import AsyncClient
 
 from app.authentications import security
+from app.db.summary_updater import find_summary_by_user_id, verify_workout_summary
 
 # Test data
 RAW_WORKOUT_DATE = date(2025, 10, 1)
@@ -186,4 +188,99 @@ async def test_get_specific_workout(async_client: AsyncClient, added_workout, lo
     assert response.status_code == 200
     workout = response.json()
     assert workout["id"] == workout_id
-    assert workout["workout_name"] == added_workout["workout_name"]
\ No newline at end of file
+    assert workout["workout_name"] == added_workout["workout_name"]
+
+@pytest.mark.anyio
+async def test_workout_writes_keep_summary_in_sync(async_client: AsyncClient, registered_user: dict, added_workout, logged_in_token: str):
+    """Test that the summary deltas applied on write match a full recount."""
+    summary = await find_summary_by_user_id(registered_user["id"])
+    assert summary["total_workouts"] == 1
+    assert summary["total_duration"] == added_workout["workout_duration"]
+    assert summary["total_calories_burned"] == added_workout["calories_burned"]
+
+    response = await async_client.delete(
+        f"/workout/{added_workout['id']}",
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == 204
+
+    summary = await find_summary_by_user_id(registered_user["id"])
+    assert summary["total_workouts"] == 0
+    assert summary["total_duration"] == 0
+    assert await verify_workout_summary(registered_user["id"])
+
+
+@pytest.mark.anyio
+async def test_deleting_a_workout_twice_counts_it_once(async_client: AsyncClient, registered_user: dict, added_workout, logged_in_token: str):
+    """Test that concurrent deletes of one workout subtract it from the summary once."""
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    workout_data = format_payload(TEST_WORKOUT)
+    workout_data["user_id"] = registered_user["id"]
+    await add_workout(workout_data, async_client, logged_in_token)
+
+    responses = await asyncio.gather(*(
+        async_client.delete(f"/workout/{added_workout['id']}", headers=headers) for _ in range(2)
+    ))
+    assert sorted(response.status_code for response in responses) == [204, 404]
+    response = await async_client.delete(f"/workout/{added_workout['id']}", headers=headers)
+    assert response.status_code == 404
+
+    summary = await find_summary_by_user_id(registered_user["id"])
+    assert summary["total_workouts"] == 1
+    assert summary["total_duration"] == workout_data["workout_duration"]
+    assert summary["total_calories_burned"] == workout_data["calories_burned"]
+    assert await verify_workout_summary(registered_user["id"])
+
+
+@pytest.mark.anyio
+async def test_get_all_workouts_paginated(async_client: AsyncClient, registered_user: dict, logged_in_token: str):
+    """Test walking the workouts page by page with the next cursor."""
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    added_ids = []
+    for _ in range(3):
+        workout_data = format_payload(TEST_WORKOUT)
+        workout_data["user_id"] = registered_user["id"]
+        added_ids.append((await add_workout(workout_data, async_client, logged_in_token))["id"])
+
+    seen_ids, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await async_client.get("/workout", params=params, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen_ids += [workout["id"] for workout in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    # same date, so newest id first
+    assert seen_ids == sorted(added_ids, reverse=True)
+
+
+@pytest.mark.anyio
+async def test_get_all_workouts_invalid_cursor(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.get(
+        "/workout",
+        params={"cursor": "not-a-cursor"},
+        headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_get_all_workouts_not_modified(async_client: AsyncClient, registered_user: dict, added_workout, logged_in_token: str):
+    """Test that workout reads answer 304 until the next write"""
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    response = await async_client.get("/workout", headers=headers)
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    response = await async_client.get("/workout", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    workout_data = format_payload(TEST_WORKOUT)
+    workout_data["user_id"] = registered_user["id"]
+    await add_workout(workout_data, async_client, logged_in_token)
+    response = await async_client.get("/workout", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from app.AI.ai_agent import JsonObjectScanner, extract_fitness_goal
+
+GOAL = {
+    "goal_name": "lose 5 kg",
+    "workout_type": "mixed",
+    "calories_to_burn": 38500,
+    "duration_days": 50,
+    "daily_target_calories": 770,
+    "daily_time_minutes": 77,
+}
+GOAL_JSON = json.dumps(GOAL)
+
+
+@pytest.mark.parametrize("raw_response", [
+    "json" + GOAL_JSON,
+    f"Here is your plan:\n```json\n{GOAL_JSON}\n```\nStay {{consistent}}!",
+    json.dumps({"plan": GOAL, "note": "a } in a string"}) + " hope this helps",
+    '{"goal_name": "draft"} and the full plan: ' + GOAL_JSON,
+    "{x} " * 100 + GOAL_JSON,
+    "{ " * 100 + GOAL_JSON,
+])
+def test_extract_fitness_goal_from_chatty_answers(raw_response: str):
+    assert extract_fitness_goal(raw_response) == GOAL
+
+
+def test_extract_fitness_goal_without_goal():
+    with pytest.raises(ValueError):
+        extract_fitness_goal("{ " * 1000 + "sorry, I cannot help with that")
+
+
+def test_scanner_accepts_text_in_pieces():
+    text = 'Plan: {"quote": "say \\"hi\\" {", "goal": ' + GOAL_JSON + "} trailing { text"
+    scanner = JsonObjectScanner()
+    found = []
+    for i in range(0, len(text), 3):
+        found.extend(scanner.feed(text[i:i + 3]))
+    assert found == [{"quote": 'say "hi" {', "goal": GOAL}]
+    assert scanner.close() == []
+
+
+def test_scanner_finds_objects_in_a_truncated_answer():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('{"answer": ' + GOAL_JSON + ', "notes": [') == []
+    assert scanner.close() == [GOAL]
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.AI import ai_agent
+from app.AI.ai_client import AIClient
+from app.AI.fake_server import create_fake_ai_app
+
+
+def fake_ai_client(transport: httpx.AsyncBaseTransport, **kwargs) -> AIClient:
+    settings = {
+        "connect_timeout": 1, "read_timeout": 1, "max_retries": 2, "backoff_seconds": 0.001, "max_concurrency": 4,
+    }
+    return AIClient(transport=transport, **{**settings, **kwargs})
+
+
+@pytest.fixture(autouse=True)
+def ai_environment(monkeypatch):
+    monkeypatch.setenv("RAPIDAPI_URL", "http://fake-ai/chat")
+    monkeypatch.setenv("RAPIDAPI_KEY", "fake")
+
+
+@pytest.mark.anyio
+async def test_create_custom_agent_against_fake_server(monkeypatch):
+    fake = create_fake_ai_app()
+    monkeypatch.setattr(ai_agent, "ai_client", fake_ai_client(httpx.ASGITransport(app=fake)))
+    raw_response = await ai_agent.create_custom_agent("Plan this goal", goal_description="run a 10k")
+    goal = ai_agent.extract_fitness_goal(raw_response)
+    assert goal["goal_name"] == "run a 10k"
+
+
+@pytest.mark.anyio
+async def test_failed_calls_are_retried_then_reported(monkeypatch):
+    fake = create_fake_ai_app(failure_rate=1)
+    monkeypatch.setattr(ai_agent, "ai_client", fake_ai_client(httpx.ASGITransport(app=fake)))
+    with pytest.raises(HTTPException) as error:
+        await ai_agent.create_custom_agent("Plan this goal", goal_description="run a 10k")
+    assert error.value.status_code == 503
+    assert fake.state.calls == 3
+
+
+@pytest.mark.anyio
+async def test_timeouts_are_retried():
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout("read timed out", request=request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}]})
+
+    client = fake_ai_client(httpx.MockTransport(handler))
+    data = await client.post_json("http://fake-ai/chat", {}, {})
+    assert data["choices"][0]["message"]["content"] == "{}"
+    assert len(attempts) == 2
+
+
+@pytest.mark.anyio
+async def test_outstanding_calls_are_capped():
+    fake = create_fake_ai_app(delay_seconds=0.02)
+    client = fake_ai_client(httpx.ASGITransport(app=fake), max_concurrency=2)
+    payload = {"messages": [{"role": "user", "content": "run"}]}
+    await asyncio.gather(*[client.post_json("http://fake-ai/chat", payload, {}) for _ in range(6)])
+    assert fake.state.calls == 6
+    assert fake.state.max_in_flight == 2
+
+
+@pytest.mark.anyio
+async def test_stream_custom_agent_forwards_tokens(monkeypatch):
+    fake = create_fake_ai_app()
+    monkeypatch.setattr(ai_agent, "ai_client", fake_ai_client(httpx.ASGITransport(app=fake)))
+    tokens = [token async for token in ai_agent.stream_custom_agent("Plan this goal", goal_description="run a 10k")]
+    assert len(tokens) > 1
+    assert ai_agent.extract_fitness_goal("".join(tokens))["goal_name"] == "run a 10k"
+
+
+@pytest.mark.anyio
+async def test_stream_custom_agent_without_upstream_streaming(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}]})
+
+    monkeypatch.setattr(ai_agent, "ai_client", fake_ai_client(httpx.MockTransport(handler)))
+    tokens = [token async for token in ai_agent.stream_custom_agent("Plan this goal", goal_description="run")]
+    assert tokens == ["{}"]
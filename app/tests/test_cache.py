@@ -0,0 +1,55 @@
+import pytest
+
+from app.authentications import security
+from app.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.anyio
+async def test_get_current_user_is_cached(monkeypatch):
+    lookups = []
+
+    async def fake_get_user_by_email(email: str):
+        lookups.append(email)
+        return {"id": 1, "email": email}
+
+    monkeypatch.setattr(security, "get_user_by_email", fake_get_user_by_email)
+    monkeypatch.setattr(security, "user_cache", TTLCache(max_size=10, ttl_seconds=60))
+    token = security.create_access_token("cached@example.com")
+
+    await security.get_current_user(token)
+    user = await security.get_current_user(token)
+    assert user["email"] == "cached@example.com"
+    assert lookups == ["cached@example.com"]
+
+    security.invalidate_cached_user("cached@example.com")
+    await security.get_current_user(token)
+    assert len(lookups) == 2
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+from fastapi import Response
+
+from app.conditional import etag_matches, http_date, is_not_modified, make_etag, second_is_over, set_etag
+
+
+def test_etag_matches():
+    etag = make_etag("workouts", 1, 7)
+    assert etag == '"workouts-1-7"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"workouts-1-6"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_is_not_modified():
+    etag = make_etag("workouts", 1, 7)
+    last_modified = datetime(2025, 10, 1, 12, 30, 15, 500_000)
+    assert http_date(last_modified) == "Wed, 01 Oct 2025 12:30:15 GMT"
+    assert is_not_modified(None, "Wed, 01 Oct 2025 12:30:15 GMT", etag, last_modified)
+    assert not is_not_modified(None, "Wed, 01 Oct 2025 12:30:14 GMT", etag, last_modified)
+    assert not is_not_modified(None, "not a date", etag, last_modified)
+    assert not is_not_modified(None, "Wed, 01 Oct 2025 12:30:15 GMT", etag, None)
+    # If-None-Match wins over If-Modified-Since
+    assert not is_not_modified('"workouts-1-6"', "Wed, 01 Oct 2025 12:30:15 GMT", etag, last_modified)
+
+
+def test_last_modified_waits_for_the_second_to_end():
+    etag = make_etag("workouts", 1, 7)
+    last_modified = datetime(2025, 10, 1, 12, 30, 15, 500_000)
+    assert not second_is_over(last_modified, now=datetime(2025, 10, 1, 12, 30, 15, 900_000))
+    assert second_is_over(last_modified, now=datetime(2025, 10, 1, 12, 30, 16))
+
+    # another write may still land in this second, a date in it matches nothing yet
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert not is_not_modified(None, http_date(now), etag, now)
+    response = Response()
+    set_etag(response, etag, now)
+    assert response.headers["Last-Modified"] == http_date(now)
+    set_etag(response, etag, last_modified)
+    assert response.headers["Last-Modified"] == "Wed, 01 Oct 2025 12:30:15 GMT"
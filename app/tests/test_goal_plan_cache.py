@@ -0,0 +1,56 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.AI.goal_plan_cache import GoalPlanCache, normalize_goal, prompt_version
+
+
+def test_normalize_goal():
+    assert normalize_goal("Lose 5kg!") == "lose 5 kg"
+    assert normalize_goal("  lose 5.0 KILOS ") == "lose 5 kg"
+    assert normalize_goal("Lose 5kg in 2 months") == "lose 5 kg in 2 month"
+    assert normalize_goal("Lose 5kg in 2 months") != normalize_goal("Lose 5kg in 3 months")
+
+
+def test_prompt_version_changes_with_the_prompt():
+    assert prompt_version("plan this") == prompt_version("plan this")
+    assert prompt_version("plan this") != prompt_version("plan that")
+
+
+@pytest.mark.anyio
+async def test_plans_are_reused_from_memory_and_database():
+    cache = GoalPlanCache(memory_size=10, ttl_seconds=60)
+    goal = f"Run {uuid.uuid4().hex[:8]} km"
+    created = []
+
+    async def create():
+        created.append(goal)
+        return {"goal_name": goal}
+
+    assert await cache.get_or_create(goal, "prompt", create) == {"goal_name": goal}
+    assert await cache.get_or_create(goal.upper() + "!", "prompt", create) == {"goal_name": goal}
+    cache.memory.clear()
+    assert await cache.get_or_create(goal, "prompt", create) == {"goal_name": goal}
+    assert created == [goal]
+    assert cache.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+    await cache.get_or_create(goal, "another prompt", create)
+    assert len(created) == 2
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_make_one_plan():
+    cache = GoalPlanCache(memory_size=10, ttl_seconds=60, timeout_seconds=5)
+    goal = f"Swim {uuid.uuid4().hex[:8]} km"
+    created = []
+
+    async def create():
+        created.append(goal)
+        await asyncio.sleep(0.02)
+        return {"goal_name": goal}
+
+    plans = await asyncio.gather(*[cache.get_or_create(goal, "prompt", create) for _ in range(10)])
+    assert plans == [{"goal_name": goal}] * 10
+    assert created == [goal]
+    assert cache.stats()["shared_in_flight"] == 9
@@ -0,0 +1,121 @@
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+
+from app.db.data_version import bump_data_version
+from app.db.database import database, goal_table, user_table
+from app.db.goal_progress import (
+    compute_goal_progress, refresh_goal_progress, started_weeks, week_target_calories, weekly_plan_rows
+)
+from app.db.rollup import apply_rollup_changes
+from app.routers.goals import get_goal_progress
+
+GOAL = {
+    "goal_name": "Run 100 km", "workout_type": "Running", "calories_to_burn": 10_000,
+    "daily_target_calories": 500, "daily_time_minutes": 45, "duration_days": 10, "start_date": date(2025, 10, 1),
+}
+
+
+def test_goal_weeks():
+    assert started_weeks(GOAL, date(2025, 9, 30)) == 0
+    assert started_weeks(GOAL, date(2025, 10, 7)) == 1
+    assert started_weeks(GOAL, date(2025, 10, 8)) == 2
+    assert started_weeks(GOAL, date(2026, 1, 1)) == 2
+    # the second week only has 3 days of the 10
+    assert [week_target_calories(GOAL, week) for week in (1, 2)] == [7000, 3000]
+    assert [row["week"] for row in weekly_plan_rows(1, GOAL)] == [1, 2]
+    # goals stored without a duration or a calorie target have no weeks
+    assert started_weeks({**GOAL, "duration_days": None}, date(2025, 10, 8)) == 0
+    assert started_weeks({**GOAL, "calories_to_burn": None}, date(2025, 10, 8)) == 0
+
+
+@pytest.mark.anyio
+async def test_progress_of_all_goals_in_one_pass():
+    user_id = await database.execute(
+        user_table.insert().values(email=f"progress_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+    running = await database.execute(goal_table.insert().values({**GOAL, "user_id": user_id}))
+    mixed = await database.execute(goal_table.insert().values(
+        {**GOAL, "goal_name": "Move more", "workout_type": "mixed", "start_date": date(2025, 10, 6), "user_id": user_id}
+    ))
+
+    def workout(day: int, workout_type: str = "Running") -> dict:
+        return {"workout_date": date(2025, 10, day), "workout_type": workout_type,
+                "workout_duration": 30, "calories_burned": 4000}
+
+    await apply_rollup_changes(user_id, added=[
+        workout(1), workout(3), workout(6, "Cycling"), workout(9), workout(30)
+    ])
+    progress = {
+        (row["goal_id"], row["week"]): (row["workouts"], row["calories_burned"], row["workout_completed"])
+        for row in await compute_goal_progress(user_id, today=date(2025, 10, 9))
+    }
+    assert progress == {
+        (running, 1): (2, 8000, True),
+        (running, 2): (1, 4000, True),
+        (mixed, 1): (2, 8000, True),
+    }
+    assert await compute_goal_progress(user_id, today=date(2025, 9, 1)) == []
+    assert (await compute_goal_progress(user_id, today=date(2025, 10, 1)))[0]["target_calories"] == 7000
+
+
+    # once both goals are over, a write only recomputes the goals whose window holds its days
+    later = date(2025, 10, 30)
+    assert await compute_goal_progress(user_id, today=later, days={later}) == []
+    changed = await compute_goal_progress(user_id, today=later, days={date(2025, 10, 3)})
+    assert {row["goal_id"] for row in changed} == {running}
+
+
+@pytest.mark.anyio
+async def test_progress_etag_follows_the_refresh_not_the_write():
+    user = SimpleNamespace(id=await database.execute(
+        user_table.insert().values(email=f"progress_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    ))
+    start = date.today() - timedelta(days=3)
+    goal_id = await database.execute(goal_table.insert().values({**GOAL, "start_date": start, "user_id": user.id}))
+    workout = {"workout_date": start, "workout_type": "Running", "workout_duration": 30, "calories_burned": 500}
+    await apply_rollup_changes(user.id, added=[workout])
+    await refresh_goal_progress(user.id)
+
+    response = Response()
+    progress = await get_goal_progress(goal_id, response, user)
+    assert progress.calories_burned == 500
+    etag = response.headers["ETag"]
+    assert (await get_goal_progress(goal_id, Response(), user, if_none_match=etag)).status_code == 304
+
+    # a write whose refresh has not run (in another worker, or failed) leaves the stored weeks and the tag alone
+    await apply_rollup_changes(user.id, added=[workout])
+    await bump_data_version(user.id)
+    assert (await get_goal_progress(goal_id, Response(), user, if_none_match=etag)).status_code == 304
+
+    await refresh_goal_progress(user.id)
+    progress = await get_goal_progress(goal_id, Response(), user, if_none_match=etag)
+    assert progress.calories_burned == 1000
+
+
+@pytest.mark.anyio
+async def test_refresh_without_changes_keeps_the_etag():
+    user = SimpleNamespace(id=await database.execute(
+        user_table.insert().values(email=f"progress_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    ))
+    start = date.today() - timedelta(days=3)
+    goal_id = await database.execute(goal_table.insert().values({**GOAL, "start_date": start, "user_id": user.id}))
+    workout = {"workout_date": start, "workout_type": "Running", "workout_duration": 30, "calories_burned": 500}
+    await apply_rollup_changes(user.id, added=[workout])
+    await refresh_goal_progress(user.id)
+    response = Response()
+    await get_goal_progress(goal_id, response, user)
+    etag = response.headers["ETag"]
+
+    # a workout of another type, the goal counts nothing new
+    await apply_rollup_changes(user.id, added=[{**workout, "workout_type": "Cycling"}])
+    await refresh_goal_progress(user.id)
+    assert (await get_goal_progress(goal_id, Response(), user, if_none_match=etag)).status_code == 304
+
+    await apply_rollup_changes(user.id, added=[workout])
+    await refresh_goal_progress(user.id)
+    progress = await get_goal_progress(goal_id, Response(), user, if_none_match=etag)
+    assert progress.calories_burned == 1000
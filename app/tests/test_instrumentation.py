@@ -0,0 +1,62 @@
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.app_configs.environment_config import config
+from app.db import instrumentation
+from app.db.database import database, user_table
+from app.db.instrumentation import RequestQueries, find_n_plus_one, query_metrics, request_queries
+from app.metrics import MetricsMiddleware, RequestMetrics
+
+
+@pytest.fixture()
+def warnings(caplog):
+    # the app logger does not propagate once logging is configured
+    instrumentation.logger.addHandler(caplog.handler)
+    caplog.set_level(logging.WARNING, logger=instrumentation.logger.name)
+    yield caplog
+    instrumentation.logger.removeHandler(caplog.handler)
+
+
+@pytest.mark.anyio
+async def test_queries_are_timed_and_slow_ones_logged(monkeypatch, warnings):
+    monkeypatch.setattr(config, "DB_SLOW_QUERY_MS", 0)
+    before = query_metrics.operations["fetch_one"].count if "fetch_one" in query_metrics.operations else 0
+    queries = RequestQueries()
+    token = request_queries.set(queries)
+    try:
+        await database.fetch_one(user_table.select().where(user_table.c.email == "nobody@example.com"))
+    finally:
+        request_queries.reset(token)
+
+    assert query_metrics.operations["fetch_one"].count == before + 1
+    assert len(queries.queries) == 1
+    assert "Slow query" in warnings.text
+    assert "'nobody@example.com'" in warnings.text
+
+
+@pytest.mark.anyio
+async def test_repeated_statements_are_reported_per_route(monkeypatch, warnings):
+    monkeypatch.setattr(config, "DB_N_PLUS_ONE_THRESHOLD", 3)
+    registry = RequestMetrics()
+    demo = FastAPI()
+    demo.add_middleware(MetricsMiddleware, registry=registry)
+
+    @demo.get("/users/{count}")
+    async def get_users(count: int):
+        # one query per user, the pattern to catch
+        for user_id in range(count):
+            await database.fetch_one(user_table.select().where(user_table.c.id == user_id))
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=demo), base_url="http://test") as client:
+        await client.get("/users/2")
+        await client.get("/users/4")
+
+    text = registry.render()
+    assert 'http_request_db_queries_total{method="GET",route="/users/{count}"} 6' in text
+    assert 'http_request_n_plus_one_total{method="GET",route="/users/{count}"} 1' in text
+    assert "Possible N+1 queries in GET /users/{count}: 4 of 4" in warnings.text
+    assert not find_n_plus_one(RequestQueries(), "nothing")
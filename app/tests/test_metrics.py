@@ -0,0 +1,44 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.main import app
+from app.metrics import MetricsMiddleware, RequestMetrics
+
+
+@pytest.mark.anyio
+async def test_requests_are_counted_per_route_template():
+    registry = RequestMetrics()
+    demo = FastAPI()
+    demo.add_middleware(MetricsMiddleware, registry=registry)
+
+    @demo.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=demo), base_url="http://test") as client:
+        for item_id in (1, 2, 0):
+            await client.get(f"/items/{item_id}")
+        await client.get("/nowhere/42")
+
+    text = registry.render()
+    assert 'http_responses_total{method="GET",route="/items/{item_id}",status="200"} 2' in text
+    assert 'http_responses_total{method="GET",route="/items/{item_id}",status="404"} 1' in text
+    assert 'http_responses_total{method="GET",route="<unmatched>",status="404"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 3' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in text
+    assert "http_requests_in_flight 0" in text
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/health")
+        response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_responses_total{method="GET",route="/health",status="200"}' in response.text
+    # the scrape itself is in flight while rendering
+    assert "http_requests_in_flight 1" in response.text
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+import pytest
+
+from app.db.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    workout_date = datetime(2025, 10, 1, 7, 30)
+    cursor = encode_cursor(workout_date, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (workout_date, 42)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "", encode_cursor(datetime(2025, 1, 1), 1)[:-4]])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
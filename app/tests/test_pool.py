@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.db.database import database
+from app.db.pool import MeasuredPool, pool_options
+from app.main import app
+
+
+class FakeConnection:
+    """Stands in for a Connection of `databases`, counts how often it is entered"""
+
+    def __init__(self):
+        self.entered = 0
+
+    async def __aenter__(self):
+        self.entered += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.entered -= 1
+
+
+@pytest.mark.anyio
+async def test_pool_waits_then_answers_503():
+    pool = MeasuredPool(max_size=1, timeout=0.05)
+    first, second = FakeConnection(), FakeConnection()
+    await pool.acquire(first)
+    assert pool.stats()["utilization"] == 1
+    # the task holding a connection may enter it again
+    await pool.acquire(first)
+    assert first.entered == 2 and pool.in_use == 1
+    await pool.release(first)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.acquire(second)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+    assert second.entered == 0
+
+    # a waiter gets the connection once it is released
+    waiter = asyncio.create_task(pool.acquire(second))
+    await asyncio.sleep(0.01)
+    assert pool.waiting == 1
+    await pool.release(first)
+    await waiter
+    assert first.entered == 0 and second.entered == 1
+
+    stats = pool.stats()
+    assert stats["in_use"] == 1 and stats["waiting"] == 0
+    assert stats["acquired"] == 2 and stats["timeouts"] == 1
+    assert stats["acquire_wait_max_ms"] >= 10
+    assert "db_pool_acquire_timeouts_total 1" in pool.render()
+
+
+@pytest.mark.anyio
+async def test_queries_and_transactions_hold_one_slot():
+    pool = database.pool
+    acquired = pool.acquired
+    async with database.transaction():
+        await database.fetch_val("SELECT 1")
+        async with database.connection() as connection:
+            await connection.fetch_val("SELECT 1")
+        assert pool.in_use == 1
+        assert [row[0] async for row in database.iterate("SELECT 1")] == [1]
+    assert pool.in_use == 0
+    assert pool.acquired == acquired + 1
+
+
+@pytest.mark.anyio
+async def test_readiness_reports_the_pool():
+    await database.warm_up()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/health/ready")
+        metrics = await client.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] and body["error"] is None
+    assert body["pool"]["in_use"] == 0
+    assert body["pool"]["acquired"] >= 1
+    assert 'db_pool_connections{state="max"}' in metrics.text
+
+
+def test_pool_options_are_for_postgres_only():
+    assert pool_options("sqlite:///data.db") == {}
+    assert set(pool_options("postgresql://app@localhost/app")) == {"min_size", "max_size", "statement_cache_size"}
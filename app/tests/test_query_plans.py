@@ -0,0 +1,151 @@
+"""
+Fail when a query issued by the routers would scan a whole table.
+
+The router helpers run against a recording stand-in for `database`, each query
+they issue is then explained on a SQLite database built by the migrations.
+"""
+import re
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import sqlite
+
+from app.app_configs.environment_config import config
+from app.authentications import security
+from app.db import data_version, goal_progress, rollup, summary_updater, timeseries
+from app.db.migrate import upgrade_database
+from app.db.pagination import encode_cursor
+from app.db.summary_scheduler import summary_scheduler
+from app.models.workouts import UserWorkoutIn
+from app.routers import goals, progress, workouts
+
+# "SCAN workouts" is a full table scan, "SEARCH ..." and "SCAN ... USING (COVERING) INDEX" are not
+FULL_SCAN = re.compile(r"^SCAN (?!.*USING)(?!CONSTANT ROW)")
+CURRENT_USER = SimpleNamespace(id=1, email="plans@example.com")
+ROW_VALUES = {
+    "user_id": CURRENT_USER.id,
+    "workout_date": datetime(2025, 1, 1),
+    "start_date": date(2025, 1, 1),
+    "data_modified_at": datetime(2025, 1, 1),
+    "updated_at": datetime(2025, 1, 1),
+}
+
+
+class Row(dict):
+    """Stands in for a fetched row, unknown columns read as 1"""
+
+    def __missing__(self, key):
+        return 1
+
+    def __getattr__(self, key):
+        return self[key]
+
+    @property
+    def _mapping(self):
+        return self
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.queries = []
+
+    async def fetch_one(self, query, values=None):
+        self.queries.append(query)
+        row = Row.fromkeys(query.exported_columns.keys(), 1)
+        row.update({key: value for key, value in ROW_VALUES.items() if key in row})
+        return row
+
+    async def fetch_all(self, query, values=None):
+        self.queries.append(query)
+        return []
+
+    async def fetch_val(self, query, values=None):
+        self.queries.append(query)
+        return 1
+
+    async def execute(self, query, values=None):
+        self.queries.append(query)
+        return 1
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+@pytest.fixture()
+def explain_engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def recorder(monkeypatch):
+    recording = RecordingDatabase()
+    modules = (workouts, goals, progress, data_version, goal_progress, rollup, summary_updater, timeseries, security)
+    for module in modules:
+        monkeypatch.setattr(module, "database", recording, raising=False)
+    # the background refresh is exercised directly below
+    monkeypatch.setattr(summary_scheduler, "schedule", lambda user_id, rebuild=False, days=(): None)
+    # the canned rows are not valid workouts, skip validating the responses
+    monkeypatch.setattr(config, "FAST_JSON_RESPONSES", True)
+    return recording
+
+
+async def exercise_routers():
+    workout = UserWorkoutIn(
+        workout_name="Plan Run", workout_type="Running", workout_date=date(2025, 1, 1), user_id=CURRENT_USER.id
+    )
+    calls = [
+        security.get_user_by_email(CURRENT_USER.email),
+        workouts.add_workout(workout, CURRENT_USER),
+        workouts.get_all_workouts(Response(), CURRENT_USER),
+        workouts.get_all_workouts(
+            Response(), CURRENT_USER, limit=10, cursor=encode_cursor(datetime(2025, 1, 1), 5),
+            date_from=date(2024, 1, 1), date_to=date(2025, 1, 1), workout_type="Running",
+        ),
+        workouts.get_workout_by_id(1, Response(), CURRENT_USER),
+        workouts.update_workout(1, workout, CURRENT_USER),
+        workouts.delete_workout(1, CURRENT_USER),
+        goals.add_goal("lose 5 kg", CURRENT_USER),
+        goals.get_goals(Response(), CURRENT_USER),
+        goals.get_goal_progress(1, Response(), CURRENT_USER),
+        goal_progress.find_rollup_days(CURRENT_USER.id, date(2025, 1, 1), date(2025, 3, 1)),
+        progress.get_workout_progress_summary(Response(), CURRENT_USER),
+        progress.get_workout_timeseries(
+            Response(), CURRENT_USER, bucket="month", date_from=date(2024, 1, 1), date_to=date(2025, 1, 1), workout_type="Running"
+        ),
+        summary_updater.refresh_summary(CURRENT_USER.id),
+        summary_updater.verify_workout_summary(CURRENT_USER.id),
+        rollup.rebuild_rollup(CURRENT_USER.id),
+    ]
+    for call in calls:
+        try:
+            await call
+        except HTTPException:
+            # the canned rows trip some checks, the queries up to there are recorded
+            pass
+
+
+@pytest.mark.anyio
+async def test_router_queries_use_indexes(recorder, explain_engine):
+    await exercise_routers()
+    explained = [query for query in recorder.queries if not isinstance(query, sqlalchemy.sql.dml.Insert)]
+    assert explained
+
+    dialect = sqlite.dialect(paramstyle="named")
+    full_scans = []
+    with explain_engine.connect() as connection:
+        for query in explained:
+            compiled = query.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+            # without ANALYZE statistics the plan does not depend on the bound values
+            params = dict.fromkeys(compiled.params)
+            plan = connection.execute(sqlalchemy.text(f"EXPLAIN QUERY PLAN {compiled}"), params).fetchall()
+            full_scans += [f"{row[-1]}  <-  {compiled}" for row in plan if FULL_SCAN.match(row[-1])]
+
+    assert not full_scans, "Full table scans:\n" + "\n".join(full_scans)
@@ -0,0 +1,69 @@
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.db.database import database, user_table, workout_daily_rollup_table, workout_table
+from app.db.rollup import apply_rollup_changes, rebuild_rollup
+from app.db.timeseries import find_workout_timeseries
+from app.models.workouts import UserWorkoutIn
+
+
+async def find_rollup(user_id: int) -> list[tuple]:
+    r = workout_daily_rollup_table.c
+    query = workout_daily_rollup_table.select().where(r.user_id == user_id).order_by(r.day, r.workout_type)
+    return [(row["day"], row["workout_type"], row["workouts"], row["duration"], row["calories"])
+            for row in await database.fetch_all(query)]
+
+
+@pytest.mark.anyio
+async def test_rollup_follows_writes_and_matches_rebuild():
+    user_id = await database.execute(
+        user_table.insert().values(email=f"rollup_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+    run = {"workout_date": date(2025, 10, 1), "workout_type": "Running", "workout_duration": 30, "calories_burned": 300}
+    ride = {"workout_date": date(2025, 10, 1), "workout_type": "Cycling", "workout_duration": 40, "calories_burned": 350}
+    late_run = {**run, "workout_date": date(2025, 10, 2)}
+    for i, workout in enumerate([run, run, ride]):
+        await database.execute(workout_table.insert().values({**workout, "workout_name": f"w{i}", "user_id": user_id}))
+
+    await apply_rollup_changes(user_id, added=[run, run, ride])
+    assert await find_rollup(user_id) == [
+        (date(2025, 10, 1), "Cycling", 1, 40, 350),
+        (date(2025, 10, 1), "Running", 2, 60, 600),
+    ]
+
+    # moving the ride to another day, then deleting it, leaves no empty rows behind
+    await apply_rollup_changes(user_id, added=[late_run], removed=[{**ride, "workout_date": datetime(2025, 10, 1)}])
+    await apply_rollup_changes(user_id, removed=[late_run])
+    assert await find_rollup(user_id) == [(date(2025, 10, 1), "Running", 2, 60, 600)]
+
+    # the ride is still in the workouts table, the rebuild brings it back
+    await rebuild_rollup(user_id)
+    assert await find_rollup(user_id) == [
+        (date(2025, 10, 1), "Cycling", 1, 40, 350),
+        (date(2025, 10, 1), "Running", 2, 60, 600),
+    ]
+
+
+@pytest.mark.anyio
+async def test_workouts_without_a_type_are_one_group():
+    user_id = await database.execute(
+        user_table.insert().values(email=f"rollup_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+    untyped = {"workout_date": date(2025, 10, 1), "workout_duration": 30, "calories_burned": 300}
+    for workout_type in ("", " ", None):
+        workout = UserWorkoutIn(workout_name="w", workout_type=workout_type, user_id=user_id, **untyped)
+        assert workout.workout_type is None
+    # rows stored before blank types became None
+    workouts = [{**untyped, "workout_type": ""}, {**untyped, "workout_type": None}]
+    for i, workout in enumerate(workouts):
+        await database.execute(workout_table.insert().values({**workout, "workout_name": f"w{i}", "user_id": user_id}))
+
+    await apply_rollup_changes(user_id, added=workouts)
+    assert await find_rollup(user_id) == [(date(2025, 10, 1), "", 2, 60, 600)]
+    await rebuild_rollup(user_id)
+    assert await find_rollup(user_id) == [(date(2025, 10, 1), "", 2, 60, 600)]
+
+    rows = await find_workout_timeseries(user_id, "day")
+    assert [(row["period_start"], row["workout_type"], row["workouts"]) for row in rows] == [(date(2025, 10, 1), None, 2)]
@@ -25,6 +25,14 @@ def test_hash_password():
     assert security.verify_password(password, hashed_password)
 
 
+@pytest.mark.anyio
+async def test_hash_password_async():
+    """Test the thread offloaded hash_password_async and verify_password_async."""
+    hashed_password = await security.hash_password_async("testpassword")
+    assert await security.verify_password_async("testpassword", hashed_password)
+    assert not await security.verify_password_async("wrongpassword", hashed_password)
+
+
 @pytest.mark.anyio
 async def test_get_user(registered_user:dict):
     """Test the get_user_by_email function."""
@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+import sqlalchemy
+
+from app.db.database import workout_daily_rollup_table, workout_table
+from app.db.migrate import upgrade_database
+from app.db.seed import seed_users
+
+
+def seeded_database(path, **kwargs) -> sqlalchemy.engine.Engine:
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    upgrade_database(engine)
+    seed_users(bind=engine, today=date(2025, 10, 1), **kwargs)
+    return engine
+
+
+def test_seed_is_deterministic_and_rolled_up(tmp_path):
+    first = seeded_database(tmp_path / "first.db", users=3, workouts=40, goals=2, seed=5, batch_size=7)
+    second = seeded_database(tmp_path / "second.db", users=3, workouts=40, goals=2, seed=5)
+    query = workout_table.select().order_by(workout_table.c.id)
+    r = workout_daily_rollup_table.c
+    with first.connect() as a, second.connect() as b:
+        workouts = a.execute(query).all()
+        assert workouts and workouts == b.execute(query).all()
+        rolled_up = a.execute(sqlalchemy.select(sqlalchemy.func.sum(r.workouts), sqlalchemy.func.sum(r.calories))).one()
+        assert tuple(rolled_up) == (len(workouts), sum(workout.calories_burned for workout in workouts))
+
+    # the same seed twice would duplicate the users
+    with pytest.raises(ValueError):
+        seed_users(users=1, seed=5, bind=first)
+    first.dispose()
+    second.dispose()
@@ -0,0 +1,33 @@
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.app_configs.environment_config import config
+from app.db.database import database, user_table, workout_table
+from app.models.workouts import UserWorkoutOut
+from app.serialization import RowEncoder
+
+
+@pytest.mark.anyio
+async def test_fast_path_matches_validated_path(monkeypatch):
+    user_id = await database.execute(
+        user_table.insert().values(email=f"serialize_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+    for i, workout_date in enumerate([datetime(2025, 10, 1), date(2025, 10, 2)]):
+        await database.execute(workout_table.insert().values(
+            user_id=user_id, workout_name=f"w{i}", workout_type="Running", workout_date=workout_date,
+            workout_duration=30 + i, calories_burned=300 + i, notes=None,
+        ))
+    rows = await database.fetch_all(workout_table.select().where(workout_table.c.user_id == user_id))
+    encoder = RowEncoder(UserWorkoutOut)
+    assert encoder.field_getter(rows[0]) is not None
+
+    monkeypatch.setattr(config, "FAST_JSON_RESPONSES", True)
+    fast = [encoder.response(rows).body, encoder.response(rows[0]).body]
+    monkeypatch.setattr(config, "FAST_JSON_RESPONSES", False)
+    validated = [encoder.response(rows).body, encoder.response(rows[0]).body]
+    # same JSON, the DateTime column comes out as a date
+    assert [json.loads(body) for body in fast] == [json.loads(body) for body in validated]
+    assert b'"workout_date":"2025-10-01"' in fast[0]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, delay: float = 0.02, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.calls
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_flight():
+    flight = SingleFlight()
+    upstream = Upstream()
+    results = await asyncio.gather(*[flight.do("lose 5 kg", upstream) for _ in range(20)])
+    assert results == [1] * 20
+    assert upstream.calls == 1
+    assert flight.shared == 19
+    assert not flight.in_flight("lose 5 kg")
+
+    # distinct keys and later calls start their own flight
+    await asyncio.gather(flight.do("lose 5 kg", upstream), flight.do("run 10 km", upstream))
+    assert upstream.calls == 3
+
+
+@pytest.mark.anyio
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    upstream = Upstream(error=ValueError("bad plan"))
+    results = await asyncio.gather(*[flight.do("key", upstream) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert upstream.calls == 1
+
+
+@pytest.mark.anyio
+async def test_timeouts_are_per_caller():
+    flight = SingleFlight()
+    upstream = Upstream(delay=0.05)
+    impatient = asyncio.create_task(flight.do("key", upstream, timeout=0.01))
+    patient = asyncio.create_task(flight.do("key", upstream, timeout=1))
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await patient == 1
+    assert not upstream.cancelled
+
+    # the shared call is dropped once nobody waits for it
+    upstream = Upstream(delay=1)
+    with pytest.raises(asyncio.TimeoutError):
+        await flight.do("key", upstream, timeout=0.01)
+    await asyncio.sleep(0)
+    assert upstream.cancelled
+    assert not flight.in_flight("key")
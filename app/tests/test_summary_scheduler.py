@@ -0,0 +1,144 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.db.summary_scheduler import SummaryScheduler
+
+
+class FakeRefresh:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, user_id: int, rebuild: bool, days=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.calls.append((user_id, rebuild))
+        self.in_flight -= 1
+
+
+@pytest.mark.anyio
+async def test_burst_is_coalesced_into_one_refresh():
+    refresh = FakeRefresh()
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.05)
+    for _ in range(50):
+        scheduler.schedule(1)
+    await scheduler.wait_until_fresh(1)
+    assert refresh.calls == [(1, False)]
+
+
+@pytest.mark.anyio
+async def test_writes_during_a_refresh_run_again_one_at_a_time():
+    refresh = FakeRefresh(delay=0.05)
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.01)
+    scheduler.schedule(1)
+    await asyncio.sleep(0.03)  # first refresh is running
+    for _ in range(10):
+        scheduler.schedule(1)
+    await scheduler.wait_until_fresh(1)
+    assert len(refresh.calls) == 2
+    assert refresh.max_in_flight == 1
+    assert not scheduler.pending(1)
+
+
+@pytest.mark.anyio
+async def test_users_are_refreshed_independently_and_rebuild_is_kept():
+    refresh = FakeRefresh()
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.01)
+    scheduler.schedule(1)
+    scheduler.schedule(1, rebuild=True)
+    scheduler.schedule(2)
+    await scheduler.drain()
+    assert sorted(refresh.calls) == [(1, True), (2, False)]
+
+
+@pytest.mark.anyio
+async def test_wait_until_fresh_skips_the_debounce_window():
+    refresh = FakeRefresh()
+    scheduler = SummaryScheduler(refresh, debounce_seconds=10)
+    scheduler.schedule(1)
+    await asyncio.wait_for(scheduler.wait_until_fresh(1), timeout=1)
+    assert refresh.calls == [(1, False)]
+    # nothing pending, returns straight away
+    await scheduler.wait_until_fresh(1)
+
+
+@pytest.mark.anyio
+async def test_users_are_forgotten_once_fresh():
+    refresh = FakeRefresh()
+    scheduler = SummaryScheduler(refresh, debounce_seconds=10)
+    scheduler.schedule(1)
+    await scheduler.wait_until_fresh(1)
+    await scheduler.drain()
+    assert not scheduler.pending(1) and not scheduler.pending(2)
+    assert scheduler._requested == {} and scheduler._completed == {}
+
+    # counting starts over for the next write
+    scheduler.schedule(1)
+    assert scheduler.pending(1)
+    await scheduler.wait_until_fresh(1)
+    assert refresh.calls == [(1, False), (1, False)]
+
+
+class FlakyRefresh:
+    """Fails its first `failures` calls, records the days of every call"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = []
+
+    async def __call__(self, user_id: int, rebuild: bool, days=None):
+        self.calls.append((user_id, rebuild, days))
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("database went away")
+
+
+@pytest.mark.anyio
+async def test_a_failed_refresh_is_retried_with_its_days():
+    refresh = FlakyRefresh(failures=1)
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.01)
+    scheduler.schedule(1, days=[date(2025, 10, 1)])
+    scheduler.schedule(1, rebuild=True)
+    await scheduler.wait_until_fresh(1)
+    assert refresh.calls == [(1, True, None), (1, True, None)]
+
+    refresh.failures = 3
+    scheduler.schedule(1, days=[date(2025, 10, 2)])
+    await scheduler.wait_until_fresh(1)
+    assert refresh.calls[2:] == [(1, False, {date(2025, 10, 2)})] * 2
+    assert scheduler.failures == 2 and not scheduler.pending(1)
+
+
+@pytest.mark.anyio
+async def test_waiters_do_not_read_a_summary_whose_refresh_gave_up():
+    refresh = FlakyRefresh(failures=3)
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.01, max_attempts=3)
+    scheduler.schedule(1, days=[date(2025, 10, 1)])
+    with pytest.raises(HTTPException) as exc_info:
+        await scheduler.wait_until_fresh(1)
+    assert exc_info.value.status_code == 503
+    assert len(refresh.calls) == 3 and scheduler.pending(1)
+
+    # the next read starts the refresh again, with the days kept
+    await scheduler.wait_until_fresh(1)
+    assert refresh.calls[-1] == (1, False, {date(2025, 10, 1)})
+    assert not scheduler.pending(1)
+
+
+@pytest.mark.anyio
+async def test_a_cancelled_refresh_is_restarted_by_the_next_read():
+    refresh = FakeRefresh(delay=0.05)
+    scheduler = SummaryScheduler(refresh, debounce_seconds=0.01)
+    scheduler.schedule(1)
+    await asyncio.sleep(0.02)  # the refresh is running
+    scheduler._refreshes[1].task.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.pending(1) and 1 not in scheduler._refreshes
+
+    await asyncio.wait_for(scheduler.wait_until_fresh(1), timeout=1)
+    assert refresh.calls == [(1, False)]
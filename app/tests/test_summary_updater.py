@@ -0,0 +1,51 @@
+import uuid
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.db import summary_updater
+from app.db.database import database, user_table, workout_table
+from app.db.summary_updater import (
+    apply_workout_delta, create_summary, find_summary_by_user_id, update_workout_summary,
+)
+
+
+@pytest.mark.anyio
+async def test_first_summary_is_created_once():
+    user_id = await database.execute(
+        user_table.insert().values(email=f"summary_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+    await database.execute(workout_table.insert().values(
+        workout_name="run", workout_type="Running", workout_date=date(2025, 10, 1),
+        workout_duration=30, calories_burned=300, user_id=user_id,
+    ))
+
+    # the second of two concurrent first writes finds the row taken instead of failing
+    assert await create_summary(user_id)
+    assert not await create_summary(user_id)
+
+    await apply_workout_delta(user_id, workouts=1, duration=20, calories=100)
+    summary = await find_summary_by_user_id(user_id)
+    assert (summary["total_workouts"], summary["total_duration"], summary["total_calories_burned"]) == (2, 50, 400)
+
+    # the rebuild replaces the totals with a recount
+    version = summary["version"]
+    summary = await update_workout_summary(user_id)
+    assert (summary["total_workouts"], summary["total_duration"], summary["version"]) == (1, 30, version + 1)
+
+
+@pytest.mark.anyio
+async def test_pool_timeouts_keep_their_status(monkeypatch):
+    user_id = await database.execute(
+        user_table.insert().values(email=f"summary_{uuid.uuid4().hex[:8]}@example.com", password="-")
+    )
+
+    async def pool_exhausted(user_id):
+        raise HTTPException(status_code=503, detail="Database is busy, try again", headers={"Retry-After": "1"})
+
+    monkeypatch.setattr(summary_updater, "count_workout_totals", pool_exhausted)
+    with pytest.raises(HTTPException) as exc_info:
+        await update_workout_summary(user_id)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
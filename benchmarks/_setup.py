@@ -0,0 +1,44 @@
+"""
+Shared setup for the benchmark scripts.
+
+The app reads its configuration at import time, so configure_environment()
+has to run before anything from `app` is imported. Benchmarks use a throwaway
+SQLite file unless BENCH_DATABASE_URL points somewhere else.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def configure_environment() -> str:
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        path = os.path.join(tempfile.mkdtemp(prefix="my_fit_bench_"), "bench.db")
+        database_url = f"sqlite:///{path}"
+    os.environ["ENV_STATE"] = "dev"
+    os.environ["DEV_DATABASE_URL"] = database_url
+    os.environ.setdefault("DEV_SECRET_KEY", "benchmark-secret")
+    return database_url
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def describe(samples: list[float]) -> str:
+    """Format latency samples (seconds) as mean / p50 / p99 in milliseconds"""
+    return "mean {:8.3f} ms  p50 {:8.3f} ms  p99 {:8.3f} ms".format(
+        statistics.fmean(samples) * 1000, percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+    )
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
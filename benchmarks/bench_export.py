@@ -0,0 +1,90 @@
+"""
+Peak Python memory and throughput of GET /workouts/export versus history size.
+
+The ASGI app is called in-process and the body chunks are dropped as they are
+sent, so tracemalloc's peak should not grow with the row count.
+
+    python -m benchmarks.bench_export --sizes 10000 100000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks._setup import configure_environment
+
+configure_environment()
+
+import sqlalchemy
+
+from app.authentications.security import create_access_token
+from app.db.database import database, engine, user_table
+from app.db.migrate import upgrade_database
+from app.main import app
+from benchmarks.bench_summary_writes import seed_user
+
+
+async def export(token: str, export_format: str, compress: bool) -> tuple[int, float, int]:
+    """Call the ASGI app directly, httpx's ASGI transport would buffer the whole body"""
+    query = f"format={export_format}&gzip={str(compress).lower()}"
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/workouts/export", "raw_path": b"/workouts/export", "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    received = 0
+    finished = asyncio.Event()
+    requested = False
+
+    async def receive():
+        # StreamingResponse keeps listening for a disconnect while it streams
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    finished.set()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return received, elapsed, peak
+
+
+async def main(sizes: list[int]):
+    upgrade_database()
+    await database.connect()
+    try:
+        for size in sizes:
+            user_id = seed_user(size)
+            with engine.connect() as connection:
+                email = connection.execute(
+                    sqlalchemy.select(user_table.c.email).where(user_table.c.id == user_id)
+                ).scalar_one()
+            token = create_access_token(email)
+            for export_format, compress in (("ndjson", False), ("csv", False), ("ndjson", True)):
+                received, elapsed, peak = await export(token, export_format, compress)
+                label = export_format + (".gz" if compress else "")
+                print(
+                    f"{size:>8} workouts  {label:<10} {received / 1e6:8.2f} MB sent  "
+                    f"{size / elapsed:10.0f} rows/s  peak {peak / 1e6:6.2f} MB"
+                )
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
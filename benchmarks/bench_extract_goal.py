@@ -0,0 +1,93 @@
+"""
+Speed of extract_fitness_goal over realistic and adversarial model answers.
+
+Every answer of the corpus is parsed by the current single-pass scanner and by
+the regex extraction it replaced (kept below as legacy_extract_fitness_goal).
+Columns are microseconds per call; "miss" means no goal came back.
+
+    python -m benchmarks.bench_extract_goal --repeat 20
+"""
+import argparse
+import json
+import logging
+import re
+import time
+
+from benchmarks._setup import configure_environment
+
+configure_environment()
+
+from app.AI.ai_agent import GOAL_FIELDS, extract_fitness_goal
+
+GOAL = {
+    "goal_name": "lose 5 kg",
+    "workout_type": "mixed",
+    "calories_to_burn": 38500,
+    "duration_days": 50,
+    "daily_target_calories": 770,
+    "daily_time_minutes": 77,
+}
+GOAL_JSON = json.dumps(GOAL, indent=2)
+PROSE = "Consistency beats intensity, so plan rest days {and sleep well} around your sessions. "
+
+
+def build_corpus() -> dict[str, str]:
+    return {
+        "plain json": GOAL_JSON,
+        "json{ prefix": "json" + GOAL_JSON,
+        "code fence": f"Here is your plan:\n```json\n{GOAL_JSON}\n```\nGood luck!",
+        "nested answer": json.dumps({"plan": GOAL, "notes": {"tip": "warm up"}}) + "\nHope this helps",
+        "draft then answer": '{"goal_name": "draft"} Actually, here is the full plan: ' + GOAL_JSON,
+        "chatty 20 KB": PROSE * 230 + GOAL_JSON + PROSE * 10,
+        "5k stray braces": "{x} " * 5_000 + GOAL_JSON,
+        "20k unclosed {": "{" * 20_000 + GOAL_JSON,
+        "20k { no answer": "{ " * 10_000 + "sorry, I cannot help with that",
+        "truncated 50 KB": "{ " + PROSE * 580 + GOAL_JSON + " and then {",
+    }
+
+
+def legacy_extract_fitness_goal(raw_response: str) -> dict:
+    """The regex fallback extract_fitness_goal used before the scanner"""
+    try:
+        return json.loads(raw_response)
+    except json.JSONDecodeError:
+        pass
+    for potential_json in re.findall(r'(\{[\s\S]*?\})', raw_response):
+        try:
+            goal_data = json.loads(potential_json)
+            if all(field in goal_data for field in GOAL_FIELDS):
+                return goal_data
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Response is not valid JSON")
+
+
+def time_call(extract, text: str, repeat: int) -> tuple[float, bool]:
+    found = False
+    start = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            found = extract(text).get("goal_name") == GOAL["goal_name"]
+        except ValueError:
+            found = False
+    return (time.perf_counter() - start) / repeat * 1e6, found
+
+
+def main(repeat: int):
+    # failed extractions log the whole answer
+    logging.disable(logging.CRITICAL)
+    print(f"{'answer':<20} {'size':>8}  {'scanner µs':>12}  {'regex µs':>12}")
+    for name, text in build_corpus().items():
+        scanner, scanner_found = time_call(extract_fitness_goal, text, repeat)
+        legacy, legacy_found = time_call(legacy_extract_fitness_goal, text, repeat)
+        print(
+            f"{name:<20} {len(text):>8}  {scanner:>12.1f}{'' if scanner_found else ' miss':<5}"
+            f"  {legacy:>12.1f}{'' if legacy_found else ' miss'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.repeat)
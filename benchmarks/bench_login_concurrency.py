@@ -0,0 +1,99 @@
+"""
+Latency of GET /workout while POST /token logins run concurrently.
+
+A probe requests GET /workout back to back, first on an idle app and then
+while `--logins` logins (bcrypt verification) are in flight. This runs once
+with the password check off the event loop (the app's behaviour) and once
+with the old blocking call for comparison. With the thread offload, the
+probe's p99 should stay close to the idle one.
+
+    python -m benchmarks.bench_login_concurrency --logins 32
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks._setup import configure_environment, describe
+
+configure_environment()
+
+import httpx
+
+from app.authentications import security
+from app.db.database import database, user_table
+from app.db.migrate import upgrade_database
+from app.main import app
+from benchmarks.bench_summary_writes import seed_user
+
+PASSWORD = "benchmark-password"
+
+
+async def blocking_verify_password(plain_password: str, hashed_password: str) -> bool:
+    """The pre-offload behaviour, bcrypt runs on the event loop"""
+    return security.verify_password(plain_password, hashed_password)
+
+
+async def probe(client: httpx.AsyncClient, token: str, until: asyncio.Event) -> list[float]:
+    timings = []
+    while not until.is_set():
+        start = time.perf_counter()
+        response = await client.get("/workout", params={"limit": 20}, headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run(client: httpx.AsyncClient, email: str, token: str, logins: int) -> tuple[list[float], float]:
+    """Probe GET /workout while `logins` logins are in flight, 0 probes an idle app for a second"""
+    done = asyncio.Event()
+    probe_task = asyncio.create_task(probe(client, token, done))
+    start = time.perf_counter()
+    if logins:
+        responses = await asyncio.gather(*[
+            client.post("/token", data={"username": email, "password": PASSWORD}) for _ in range(logins)
+        ])
+        assert all(response.status_code == 200 for response in responses)
+    else:
+        await asyncio.sleep(1)
+    elapsed = time.perf_counter() - start
+    done.set()
+    return await probe_task, elapsed
+
+
+async def main(logins: int):
+    upgrade_database()
+    await database.connect()
+    try:
+        user_id = seed_user(500)
+        email = f"bench_login_{uuid.uuid4().hex[:8]}@example.com"
+        await database.execute(
+            user_table.update().where(user_table.c.id == user_id).values(
+                email=email, password=security.hash_password(PASSWORD)
+            )
+        )
+        token = security.create_access_token(email)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            idle, _ = await run(client, email, token, 0)
+            print(f"idle                    GET /workout  {describe(idle)}")
+
+            offloaded, elapsed = await run(client, email, token, logins)
+            print(f"{logins:>3} logins, offloaded   GET /workout  {describe(offloaded)}  (logins took {elapsed:.2f} s)")
+
+            verify_password_async = security.verify_password_async
+            security.verify_password_async = blocking_verify_password
+            try:
+                blocking, elapsed = await run(client, email, token, logins)
+            finally:
+                security.verify_password_async = verify_password_async
+            print(f"{logins:>3} logins, blocking    GET /workout  {describe(blocking)}  (logins took {elapsed:.2f} s)")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
@@ -0,0 +1,99 @@
+"""
+Cost of MetricsMiddleware per request, and of rendering GET /metrics.
+
+Requests are driven straight through the ASGI interface, without a server
+or an HTTP client, so the middleware is the only difference between runs:
+
+  bare app    a no-op ASGI app answering 200, with and without the middleware
+  fastapi     a FastAPI app with one templated route, with and without it,
+              the overhead is below the run-to-run noise of a full request
+
+The render is timed with every route of app.main observed under 3 statuses.
+
+    python -m benchmarks.bench_metrics --requests 100000
+"""
+import argparse
+import asyncio
+
+from benchmarks._setup import configure_environment, Timer
+
+configure_environment()
+
+from fastapi import FastAPI
+
+from app.metrics import MetricsMiddleware, RequestMetrics
+
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"ok"}
+
+
+async def bare_app(scope, receive, send):
+    await send(START)
+    await send(BODY)
+
+
+def fastapi_app(with_metrics: bool) -> FastAPI:
+    demo = FastAPI()
+    if with_metrics:
+        demo.add_middleware(MetricsMiddleware, registry=RequestMetrics())
+
+    @demo.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    return demo
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def http_scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+
+async def per_request(apps: list, requests: int, path: str, rounds: int = 5) -> list[float]:
+    """Microseconds per request of each app, best of `rounds` taken in turns"""
+    best = [float("inf")] * len(apps)
+    for _ in range(rounds):
+        for i, app in enumerate(apps):
+            with Timer() as timer:
+                for _ in range(requests):
+                    await app(http_scope(path), receive, send)
+            best[i] = min(best[i], timer.elapsed / requests * 1e6)
+    return best
+
+
+async def main(requests: int):
+    bare, measured = await per_request([bare_app, MetricsMiddleware(bare_app, RequestMetrics())], requests, "/items/1")
+    print(f"bare app   {bare:8.2f} µs  with metrics {measured:8.2f} µs  overhead {measured - bare:6.2f} µs")
+
+    plain, measured = await per_request([fastapi_app(False), fastapi_app(True)], requests // 10, "/items/1")
+    print(f"fastapi    {plain:8.2f} µs  with metrics {measured:8.2f} µs  overhead {measured - plain:6.2f} µs "
+          f"({(measured - plain) / plain:.1%})")
+
+    from app.main import app
+    registry = RequestMetrics()
+    routes = [(route.path, method) for route in app.routes for method in getattr(route, "methods", None) or ["GET"]]
+    for path, method in routes:
+        for status in (200, 304, 404):
+            registry.observe(path, method, status, 0.02)
+    with Timer() as timer:
+        for _ in range(100):
+            text = registry.render()
+    print(f"render     {timer.elapsed / 100 * 1000:8.3f} ms for {len(routes)} routes, {len(text):,} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000, help="requests per run against the bare app")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
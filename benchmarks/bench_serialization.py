@@ -0,0 +1,110 @@
+"""
+Serialization cost of workout lists and the summary, per response path.
+
+Workouts are seeded and read back as database rows once per size, then each
+path turns them into a response body:
+
+  response_model  what FastAPI does for a route returning the rows: validate
+                  every row against list[UserWorkoutOut], dump it to
+                  JSON-compatible Python, encode with the json module
+  validated       RowEncoder with FAST_JSON_RESPONSES=false: the same through
+                  pre-built TypeAdapters
+  fast            RowEncoder: copy the model fields, encode with orjson
+
+The summary row is timed the same way, including the recursive
+convert_datetime_fields pass its route used to make.
+
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import datetime
+
+from benchmarks._setup import configure_environment, Timer
+
+configure_environment()
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.app_configs.environment_config import config
+from app.db.database import database, workout_table
+from app.db.migrate import upgrade_database
+from app.db.summary_updater import update_workout_summary
+from app.models.progress import OverallSummary
+from app.models.workouts import UserWorkoutOut
+from app.serialization import RowEncoder
+from benchmarks.bench_summary_writes import seed_user
+
+
+def convert_datetime_fields(data: dict) -> dict:
+    """The recursive pass GET /workout-summary used to make before encoding"""
+    for key, value in data.items():
+        if isinstance(value, datetime.datetime):
+            data[key] = value.isoformat()
+        elif isinstance(value, list):
+            data[key] = [convert_datetime_fields(item) if isinstance(item, dict) else item for item in value]
+        elif isinstance(value, dict):
+            data[key] = convert_datetime_fields(value)
+    return data
+
+
+async def response_model_body(field, content) -> bytes:
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+def encoder_body(encoder: RowEncoder, content, fast: bool) -> bytes:
+    configured, config.FAST_JSON_RESPONSES = config.FAST_JSON_RESPONSES, fast
+    try:
+        return encoder.response(content).body
+    finally:
+        config.FAST_JSON_RESPONSES = configured
+
+
+async def best_of(repeat: int, make_body) -> tuple[float, int]:
+    """Fastest of `repeat` runs in milliseconds, and the body size"""
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            body = make_body()
+            if asyncio.iscoroutine(body):
+                body = await body
+        timings.append(timer.elapsed)
+    return min(timings) * 1000, len(body)
+
+
+async def main(sizes: list[int], repeat: int):
+    upgrade_database()
+    await database.connect()
+    try:
+        workout_encoder = RowEncoder(UserWorkoutOut)
+        workouts_field = create_model_field("Response_workouts", list[UserWorkoutOut], mode="serialization")
+        summary_encoder = RowEncoder(OverallSummary)
+        summary_field = create_model_field("Response_summary", OverallSummary, mode="serialization")
+
+        print(f"{'workouts':>8}  {'response_model ms':>18}  {'validated ms':>13}  {'fast ms':>8}  {'speedup':>7}  {'bytes':>11}")
+        for size in sizes:
+            user_id = seed_user(size)
+            rows = await database.fetch_all(workout_table.select().where(workout_table.c.user_id == user_id))
+            baseline, size_bytes = await best_of(repeat, lambda rows=rows: response_model_body(workouts_field, rows))
+            validated, _ = await best_of(repeat, lambda rows=rows: encoder_body(workout_encoder, rows, fast=False))
+            fast, _ = await best_of(repeat, lambda rows=rows: encoder_body(workout_encoder, rows, fast=True))
+            print(f"{size:>8}  {baseline:>18.2f}  {validated:>13.2f}  {fast:>8.2f}  {baseline / fast:>6.1f}x  {size_bytes:>11,}")
+
+        summary = dict((await update_workout_summary(user_id))._mapping)
+        baseline, _ = await best_of(
+            repeat * 100, lambda: response_model_body(summary_field, convert_datetime_fields(dict(summary)))
+        )
+        fast, _ = await best_of(repeat * 100, lambda: encoder_body(summary_encoder, summary, fast=True))
+        print(f"summary   response_model {baseline * 1000:.1f} µs  fast {fast * 1000:.1f} µs")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path and size, the fastest counts")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
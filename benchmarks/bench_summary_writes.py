@@ -0,0 +1,94 @@
+"""
+Write latency of the progress summary maintenance versus workout history size.
+
+Every size gets its own user seeded with N workouts, then a series of workout
+inserts is timed twice: once with the incremental delta used by the routers
+(apply_workout_delta) and once with the full rebuild (update_workout_summary)
+for comparison. The delta path should stay flat from 10 to 100k workouts.
+
+    python -m benchmarks.bench_summary_writes --sizes 10 1000 100000
+"""
+import argparse
+import asyncio
+import datetime
+import uuid
+
+from benchmarks._setup import configure_environment, describe, Timer
+
+configure_environment()
+
+from app.db.database import database, engine, user_table, workout_table
+from app.db.migrate import upgrade_database
+from app.db.rollup import rebuild_rollup_sync
+from app.db.summary_updater import apply_workout_delta, update_workout_summary
+
+
+def seed_user(size: int) -> int:
+    """Insert a user with `size` workouts, and their daily rollup, through the sync engine"""
+    start = datetime.datetime(2020, 1, 1)
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            user_table.insert().values(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", password="-")
+        ).inserted_primary_key[0]
+        rows = [
+            {
+                "workout_name": f"seed-{user_id}-{i}",
+                "workout_type": "Running",
+                "workout_duration": 30,
+                "calories_burned": 300,
+                "workout_date": start + datetime.timedelta(days=i // 3),
+                "user_id": user_id,
+            }
+            for i in range(size)
+        ]
+        for offset in range(0, len(rows), 10_000):
+            connection.execute(workout_table.insert(), rows[offset:offset + 10_000])
+    rebuild_rollup_sync(user_id)
+    return user_id
+
+
+async def timed_writes(user_id: int, samples: int, full_rebuild: bool) -> list[float]:
+    timings = []
+    for i in range(samples):
+        values = {
+            "workout_name": f"bench-{uuid.uuid4().hex}",
+            "workout_type": "Running",
+            "workout_duration": 45,
+            "calories_burned": 400,
+            "workout_date": datetime.datetime(2025, 1, 1),
+            "user_id": user_id,
+        }
+        with Timer() as timer:
+            async with database.transaction():
+                await database.execute(workout_table.insert().values(values))
+                if full_rebuild:
+                    await update_workout_summary(user_id)
+                else:
+                    await apply_workout_delta(user_id, workouts=1, duration=45, calories=400)
+        timings.append(timer.elapsed)
+    return timings
+
+
+async def main(sizes: list[int], samples: int, rebuild_samples: int):
+    upgrade_database()
+    await database.connect()
+    try:
+        for size in sizes:
+            user_id = seed_user(size)
+            await update_workout_summary(user_id)
+            delta = await timed_writes(user_id, samples, full_rebuild=False)
+            print(f"{size:>7} workouts  delta   {describe(delta)}")
+            if rebuild_samples:
+                rebuild = await timed_writes(user_id, rebuild_samples, full_rebuild=True)
+                print(f"{size:>7} workouts  rebuild {describe(rebuild)}")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--samples", type=int, default=200, help="timed writes per size on the delta path")
+    parser.add_argument("--rebuild-samples", type=int, default=5, help="timed writes per size on the full rebuild path, 0 to skip")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.samples, args.rebuild_samples))
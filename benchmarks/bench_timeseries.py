@@ -0,0 +1,97 @@
+"""
+GET /workout-summary/timeseries versus bucketing GET /workout on the client.
+
+Every size gets its own user seeded with N workouts. The weekly totals per
+workout type are then fetched twice: from the timeseries endpoint, grouped by
+the database, and by paging through GET /workout (500 per page, following
+X-Next-Cursor) and summing in Python, like a dashboard without the endpoint
+would. Latency and response bytes are per complete series.
+
+    python -m benchmarks.bench_timeseries --sizes 1000 10000 50000
+"""
+import argparse
+import asyncio
+import datetime
+import uuid
+from collections import defaultdict
+
+from benchmarks._setup import configure_environment, describe, Timer
+
+configure_environment()
+
+import httpx
+
+from app.authentications import security
+from app.db.database import database, user_table
+from app.db.migrate import upgrade_database
+from app.main import app
+from benchmarks.bench_summary_writes import seed_user
+
+
+async def from_endpoint(client: httpx.AsyncClient, headers: dict) -> tuple[dict, int]:
+    response = await client.get("/workout-summary/timeseries", params={"bucket": "week"}, headers=headers)
+    response.raise_for_status()
+    series = response.json()
+    totals = {
+        (period_start, workout_type): calories
+        for period_start, workout_type, calories in zip(
+            series["period_start"], series["workout_type"], series["total_calories_burned"]
+        )
+    }
+    return totals, len(response.content)
+
+
+async def from_workout_list(client: httpx.AsyncClient, headers: dict) -> tuple[dict, int]:
+    totals = defaultdict(int)
+    received = 0
+    params = {"limit": 500}
+    while True:
+        response = await client.get("/workout", params=params, headers=headers)
+        response.raise_for_status()
+        received += len(response.content)
+        for workout in response.json():
+            workout_date = datetime.date.fromisoformat(workout["workout_date"][:10])
+            week_start = workout_date - datetime.timedelta(days=workout_date.weekday())
+            totals[(week_start.isoformat(), workout["workout_type"])] += workout["calories_burned"] or 0
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return dict(totals), received
+        params = {"limit": 500, "cursor": cursor}
+
+
+async def timed(fetch, client: httpx.AsyncClient, headers: dict, samples: int) -> tuple[list[float], dict, int]:
+    timings = []
+    for _ in range(samples):
+        with Timer() as timer:
+            totals, received = await fetch(client, headers)
+        timings.append(timer.elapsed)
+    return timings, totals, received
+
+
+async def main(sizes: list[int], samples: int):
+    upgrade_database()
+    await database.connect()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size in sizes:
+                user_id = seed_user(size)
+                email = f"bench_timeseries_{uuid.uuid4().hex[:8]}@example.com"
+                await database.execute(user_table.update().where(user_table.c.id == user_id).values(email=email))
+                headers = {"Authorization": f"Bearer {security.create_access_token(email)}"}
+
+                sql, sql_totals, sql_bytes = await timed(from_endpoint, client, headers, samples)
+                listed, list_totals, list_bytes = await timed(from_workout_list, client, headers, samples)
+                assert sql_totals == list_totals, "the two series differ"
+                print(f"{size:>7} workouts  timeseries   {describe(sql)}  {sql_bytes:>11,} bytes")
+                print(f"{size:>7} workouts  GET /workout {describe(listed)}  {list_bytes:>11,} bytes")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--samples", type=int, default=5, help="timed series per size and path")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.samples))
@@ -0,0 +1,333 @@
+"""
+Load test of the API: throughput and p50/p95/p99 latency per endpoint.
+
+Every virtual user registers, logs in, imports --history workouts and plans a
+goal, then runs the scenarios of VirtualUser (log_workout, browse, login),
+picked by --mix weight, until --duration runs out. Requests are reported under their route, e.g. "GET /workout/{id}".
+
+  inprocess  requests go through httpx.ASGITransport straight into the app
+  uvicorn    the app runs in a uvicorn subprocess, requests go over TCP
+
+POST /goal talks to the fake AI service of app/AI/fake_server.py, mounted
+in-process or run as a second subprocess, --ai-delay sets its latency.
+
+A run can be stored as a baseline and later runs compared against it. An
+endpoint regresses when its p50 or p95 grows by more than --tolerance (and
+by at least a millisecond) or it fails where the baseline did not; the
+comparison then exits with status 1.
+
+    python -m benchmarks.load_test --target inprocess --users 20 --duration 30
+    python -m benchmarks.load_test --save-baseline benchmarks/load_baseline.json
+    python -m benchmarks.load_test --compare benchmarks/load_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+from benchmarks._setup import configure_environment, percentile
+
+configure_environment()
+os.environ["RAPIDAPI_URL"] = "http://fake-ai/chat"
+os.environ["RAPIDAPI_KEY"] = "fake"
+
+import httpx
+
+PASSWORD = "load-test-password"
+WORKOUT_TYPES = ["Running", "Cycling", "Swimming", "Walking", "Rowing"]
+# noise floor of the baseline comparison, in milliseconds
+MIN_REGRESSION_MS = 1.0
+
+
+class Recorder:
+    """Latencies (seconds) and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        endpoint = f"{method} {route}"
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict[str, dict]:
+        return {
+            endpoint: {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+            for endpoint, samples in sorted(self.latencies.items())
+        }
+
+
+class VirtualUser:
+    def __init__(self, number: int, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.number = number
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.email = f"load_{number}_{uuid.uuid4().hex[:8]}@example.com"
+        self.headers: dict[str, str] = {}
+        self.goal_id: int | None = None
+        self.workouts = 0
+
+    async def request(self, method: str, route: str, url: str | None = None, **kwargs) -> httpx.Response:
+        return await self.recorder.request(
+            self.client, method, route, url or route, headers=self.headers, **kwargs
+        )
+
+    def new_workout(self) -> dict:
+        self.workouts += 1
+        return {
+            "workout_name": f"workout {self.workouts}",
+            "workout_type": self.rng.choice(WORKOUT_TYPES),
+            "workout_date": (date.today() - timedelta(days=self.rng.randrange(365))).isoformat(),
+            "workout_duration": self.rng.randrange(15, 90),
+            "calories_burned": self.rng.randrange(100, 900),
+            "user_id": 0,
+        }
+
+    async def sign_up(self, history: int) -> None:
+        await self.request("POST", "/register", json={"email": self.email, "password": PASSWORD})
+        response = await self.request("POST", "/token", data={"username": self.email, "password": PASSWORD})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        if history:
+            await self.request("POST", "/workouts/bulk", json=[self.new_workout() for _ in range(history)])
+        response = await self.request("POST", "/goal", params={"goal": f"user {self.number}: lose 5 kg"})
+        if response.status_code == 201:
+            self.goal_id = response.json()["id"]
+
+    async def log_workout(self) -> None:
+        """workout CRUD, then the reads a client makes after a write"""
+        response = await self.request("POST", "/workout", json=self.new_workout())
+        if response.status_code != 201:
+            return
+        workout = response.json()
+        url = f"/workout/{workout['id']}"
+        await self.request("GET", "/workout/{id}", url)
+        await self.request("PUT", "/workout/{id}", url, json={**workout, "workout_duration": workout["workout_duration"] + 5})
+        await self.request("GET", "/workout-summary")
+        if self.rng.random() < 0.3:
+            await self.request("DELETE", "/workout/{id}", url)
+
+    async def browse(self) -> None:
+        """the dashboard reads"""
+        await self.request("GET", "/workout", params={"limit": 50})
+        await self.request("GET", "/workout-summary")
+        await self.request("GET", "/workout-summary/timeseries", params={"bucket": "week"})
+        await self.request("GET", "/goal")
+        if self.goal_id is not None:
+            await self.request("GET", "/goal/{id}/progress", f"/goal/{self.goal_id}/progress")
+
+    async def login(self) -> None:
+        await self.request("POST", "/token", data={"username": self.email, "password": PASSWORD})
+
+    async def run(self, until: float, weights: dict[str, int]) -> None:
+        scenarios = [getattr(self, name) for name in weights]
+        while time.perf_counter() < until:
+            await self.rng.choices(scenarios, weights=list(weights.values()))[0]()
+
+
+async def drive(client: httpx.AsyncClient, args) -> tuple[dict, float]:
+    sign_ups, recorder = Recorder(), Recorder()
+    users = [VirtualUser(number, client, sign_ups, random.Random(args.seed + number)) for number in range(args.users)]
+    # one at a time, concurrent bulk imports only contend for the SQLite write lock
+    start = time.perf_counter()
+    for user in users:
+        await user.sign_up(args.history)
+    sign_up_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user in users:
+        user.recorder = recorder
+    await asyncio.gather(*(user.run(start + args.duration, args.mix) for user in users))
+    elapsed = time.perf_counter() - start
+    report = {f"{endpoint} (sign-up)": stats for endpoint, stats in sign_ups.report(sign_up_elapsed).items()}
+    return {**report, **recorder.report(elapsed)}, elapsed
+
+
+async def run_inprocess(args) -> tuple[dict, float]:
+    from app.AI import ai_agent
+    from app.AI.ai_client import AIClient
+    from app.AI.fake_server import create_fake_ai_app
+    from app.app_configs.environment_config import config
+    from app.db.database import database
+    from app.db.migrate import upgrade_database
+    from app.db.summary_scheduler import summary_scheduler
+    from app.main import app
+
+    ai_agent.ai_client = AIClient(
+        connect_timeout=config.AI_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=config.AI_READ_TIMEOUT_SECONDS,
+        max_retries=config.AI_MAX_RETRIES,
+        backoff_seconds=config.AI_RETRY_BACKOFF_SECONDS,
+        max_concurrency=config.AI_MAX_CONCURRENCY,
+        transport=httpx.ASGITransport(app=create_fake_ai_app(args.ai_delay)),
+    )
+    # the lifespan of app.main, ASGITransport does not run it
+    upgrade_database()
+    await database.connect()
+    try:
+        # server errors are counted like over TCP instead of raised
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            return await drive(client, args)
+    finally:
+        await summary_scheduler.drain()
+        await ai_agent.ai_client.aclose()
+        await database.disconnect()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, process: asyncio.subprocess.Process, timeout: float = 30) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            if process.returncode is not None:
+                raise RuntimeError(f"{url} exited with status {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout} s")
+
+
+async def run_uvicorn(args) -> tuple[dict, float]:
+    from app.db.migrate import upgrade_database
+
+    # what entrypoint.sh does before starting the workers
+    upgrade_database()
+    ai_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.getcwd(),
+        "FAKE_AI_DELAY_SECONDS": str(args.ai_delay),
+        "RAPIDAPI_URL": f"http://127.0.0.1:{ai_port}/chat",
+    }
+    # run from a scratch directory, the app writes its log file to the working directory
+    options = {"env": env, "cwd": tempfile.mkdtemp(prefix="my_fit_load_"),
+               "stdout": asyncio.subprocess.DEVNULL, "stderr": asyncio.subprocess.DEVNULL}
+    processes = [
+        await asyncio.create_subprocess_exec(sys.executable, "-m", "app.AI.fake_server", "--port", str(ai_port), **options),
+    ]
+    try:
+        processes.append(await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+            "--workers", str(args.workers), "--no-access-log",
+            **options,
+        ))
+        await wait_until_up(f"http://127.0.0.1:{ai_port}/docs", processes[0])
+        await wait_until_up(f"http://127.0.0.1:{app_port}/health", processes[1])
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=60) as client:
+            return await drive(client, args)
+    finally:
+        for process in processes:
+            process.terminate()
+        # signal them all first, then wait for each to exit
+        for process in processes:
+            await asyncio.wait_for(process.wait(), 30)
+
+
+def print_report(endpoints: dict[str, dict], elapsed: float) -> None:
+    print(f"{'endpoint':<44}  {'requests':>8}  {'errors':>6}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}")
+    for endpoint, stats in endpoints.items():
+        print(f"{endpoint:<44}  {stats['requests']:>8}  {stats['errors']:>6}  {stats['rps']:>8.1f}  "
+              f"{stats['p50_ms']:>8.2f}  {stats['p95_ms']:>8.2f}  {stats['p99_ms']:>8.2f}")
+    total = sum(stats["requests"] for endpoint, stats in endpoints.items() if not endpoint.endswith("(sign-up)"))
+    print(f"{total} requests in {elapsed:.1f} s, {total / elapsed:.1f} req/s, sign-ups excluded")
+
+
+def compare(endpoints: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Regressions of a run against a baseline, one line each"""
+    regressions = []
+    for endpoint, base in baseline.items():
+        stats = endpoints.get(endpoint)
+        if stats is None:
+            regressions.append(f"{endpoint}: not exercised by this run")
+            continue
+        if stats["errors"] and not base["errors"]:
+            regressions.append(f"{endpoint}: {stats['errors']} failed requests, none in the baseline")
+        for key in ("p50_ms", "p95_ms"):
+            if stats[key] > base[key] * (1 + tolerance) and stats[key] - base[key] >= MIN_REGRESSION_MS:
+                regressions.append(f"{endpoint}: {key} {stats[key]:.2f} vs {base[key]:.2f} in the baseline")
+    return regressions
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("log_workout", "browse", "login"):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main(args) -> int:
+    runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+    endpoints, elapsed = asyncio.run(runner(args))
+    print_report(endpoints, elapsed)
+
+    run = {
+        "target": args.target, "users": args.users, "duration": args.duration, "history": args.history,
+        "ai_delay": args.ai_delay, "endpoints": endpoints,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(run, file, indent=2)
+            file.write("\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline["target"] != args.target or baseline["users"] != args.users:
+            print(f"note: the baseline ran {baseline['target']} with {baseline['users']} users")
+        regressions = compare(endpoints, baseline["endpoints"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regression against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of scenarios after the sign-ups")
+    parser.add_argument("--history", type=int, default=200, help="workouts each user imports when signing up")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("log_workout=5,browse=4,login=1"),
+                        help="scenario weights, e.g. log_workout=5,browse=4,login=1")
+    parser.add_argument("--ai-delay", type=float, default=0.2, help="seconds the fake AI takes per answer")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare the run against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50/p95 growth over the baseline")
+    sys.exit(main(parser.parse_args()))
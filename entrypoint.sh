@@ -1,4 +1,6 @@
 #!/bin/sh
 # Use the PORT env var or default to 8000
 port="${PORT:-8000}"
+# migrate once here, not in every worker
+python -m app.db.migrate
 exec uvicorn app.main:app --host 0.0.0.0 --port "$port"
\ No newline at end of file